@@ -0,0 +1,43 @@
+"""Add template step cache
+
+Revision ID: a3d7f1b9c5e2
+Revises: f2c6a8e4b0d7
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7f1b9c5e2'
+down_revision: Union[str, None] = 'f2c6a8e4b0d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'template_step_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('extractor_version', sa.Integer(), nullable=False),
+        sa.Column('original_filename', sa.String(), nullable=True),
+        sa.Column('steps', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('step_count', sa.Integer(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('miss_count', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('sha256', 'extractor_version', name='uq_template_step_cache_sha256_version')
+    )
+    op.create_index(op.f('ix_template_step_cache_id'), 'template_step_cache', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_template_step_cache_id'), table_name='template_step_cache')
+    op.drop_table('template_step_cache')
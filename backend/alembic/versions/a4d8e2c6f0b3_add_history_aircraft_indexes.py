@@ -0,0 +1,36 @@
+"""Add aircraft timeline indexes to maintenance_histories
+
+Revision ID: a4d8e2c6f0b3
+Revises: f7c3a9e5b1d8
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e2c6f0b3'
+down_revision: Union[str, None] = 'f7c3a9e5b1d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_maintenance_histories_registration_created_at_id',
+        'maintenance_histories',
+        [sa.text("upper(aircraft_info ->> 'registration')"), 'created_at', 'id']
+    )
+    op.create_index(
+        'ix_maintenance_histories_model_created_at_id',
+        'maintenance_histories',
+        [sa.text("upper(aircraft_info ->> 'model')"), 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_maintenance_histories_model_created_at_id', table_name='maintenance_histories')
+    op.drop_index('ix_maintenance_histories_registration_created_at_id', table_name='maintenance_histories')
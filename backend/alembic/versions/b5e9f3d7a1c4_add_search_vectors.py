@@ -0,0 +1,58 @@
+"""Add full-text search vectors to chats, messages and maintenance histories
+
+Revision ID: b5e9f3d7a1c4
+Revises: a4d8e2c6f0b3
+Create Date: 2026-10-19 23:00:00.000000
+
+The vectors are stored generated columns, so adding them rewrites each
+table once (messages is the largest); run it in a maintenance window.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e9f3d7a1c4'
+down_revision: Union[str, None] = 'a4d8e2c6f0b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chats', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("setweight(to_tsvector('spanish', title), 'A')", persisted=True),
+        nullable=True
+    ))
+    op.add_column('messages', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('spanish', content)", persisted=True),
+        nullable=True
+    ))
+    op.add_column('maintenance_histories', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('spanish', title), 'A')"
+            " || setweight(to_tsvector('spanish', summary), 'B')"
+            " || setweight(jsonb_to_tsvector('spanish', coalesce(maintenance_actions, '[]'), '[\"string\"]'), 'C')",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index('ix_chats_search_vector', 'chats', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_messages_search_vector', 'messages', ['search_vector'], postgresql_using='gin')
+    op.create_index(
+        'ix_maintenance_histories_search_vector', 'maintenance_histories', ['search_vector'], postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_maintenance_histories_search_vector', table_name='maintenance_histories')
+    op.drop_index('ix_messages_search_vector', table_name='messages')
+    op.drop_index('ix_chats_search_vector', table_name='chats')
+    op.drop_column('maintenance_histories', 'search_vector')
+    op.drop_column('messages', 'search_vector')
+    op.drop_column('chats', 'search_vector')
@@ -0,0 +1,41 @@
+"""Add composite indexes for hot chat, message, step and history queries
+
+Revision ID: b7e2c4d9a1f3
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c4d9a1f3'
+down_revision: Union[str, None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # messages WHERE chat_id ORDER BY created_at
+    op.create_index('ix_messages_chat_id_created_at', 'messages', ['chat_id', 'created_at', 'id'])
+
+    # steps WHERE chat_id AND is_completed ORDER BY step_number
+    op.create_index('ix_steps_chat_id_is_completed_step_number', 'steps', ['chat_id', 'is_completed', 'step_number'])
+
+    # chats WHERE user_id ORDER BY created_at
+    op.create_index('ix_chats_user_id_created_at', 'chats', ['user_id', 'created_at'])
+
+    # maintenance_histories WHERE user_id ORDER BY created_at / WHERE chat_id
+    op.create_index('ix_maintenance_histories_user_id_created_at', 'maintenance_histories', ['user_id', 'created_at'])
+    op.create_index('ix_maintenance_histories_chat_id', 'maintenance_histories', ['chat_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_maintenance_histories_chat_id', table_name='maintenance_histories')
+    op.drop_index('ix_maintenance_histories_user_id_created_at', table_name='maintenance_histories')
+    op.drop_index('ix_chats_user_id_created_at', table_name='chats')
+    op.drop_index('ix_steps_chat_id_is_completed_step_number', table_name='steps')
+    op.drop_index('ix_messages_chat_id_created_at', table_name='messages')
@@ -0,0 +1,81 @@
+"""Add procedure template library
+
+Revision ID: b8e4c2a6d0f3
+Revises: a3d7f1b9c5e2
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e4c2a6d0f3'
+down_revision: Union[str, None] = 'a3d7f1b9c5e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Created with the chat template status
+template_status = postgresql.ENUM('PENDING', 'PROCESSING', 'DONE', 'FAILED', name='templatestatus', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'procedure_templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('airplane_model', sa.String(), nullable=True),
+        sa.Column('component_type', sa.String(), nullable=True),
+        sa.Column('division', sa.String(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('previous_version_id', sa.Integer(), nullable=True),
+        sa.Column('is_latest', sa.Boolean(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('file_path', sa.String(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('status', template_status, nullable=False),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('step_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['previous_version_id'], ['procedure_templates.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name', 'version', name='uq_procedure_templates_name_version')
+    )
+    op.create_index(op.f('ix_procedure_templates_id'), 'procedure_templates', ['id'], unique=False)
+    op.create_index('ix_procedure_templates_latest_created_at_id', 'procedure_templates', ['is_latest', 'is_active', 'created_at', 'id'])
+
+    op.create_table(
+        'procedure_template_steps',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('template_id', sa.Integer(), nullable=False),
+        sa.Column('step_number', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=500), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['template_id'], ['procedure_templates.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_procedure_template_steps_id'), 'procedure_template_steps', ['id'], unique=False)
+    op.create_index('ix_procedure_template_steps_template_id_step_number', 'procedure_template_steps', ['template_id', 'step_number'])
+
+    op.add_column('chats', sa.Column('template_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('fk_chats_template_id', 'chats', 'procedure_templates', ['template_id'], ['id'], ondelete='SET NULL')
+    op.create_index(op.f('ix_chats_template_id'), 'chats', ['template_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chats_template_id'), table_name='chats')
+    op.drop_constraint('fk_chats_template_id', 'chats', type_='foreignkey')
+    op.drop_column('chats', 'template_id')
+    op.drop_index('ix_procedure_template_steps_template_id_step_number', table_name='procedure_template_steps')
+    op.drop_index(op.f('ix_procedure_template_steps_id'), table_name='procedure_template_steps')
+    op.drop_table('procedure_template_steps')
+    op.drop_index('ix_procedure_templates_latest_created_at_id', table_name='procedure_templates')
+    op.drop_index(op.f('ix_procedure_templates_id'), table_name='procedure_templates')
+    op.drop_table('procedure_templates')
@@ -0,0 +1,58 @@
+"""Add maintained current step and step progress to chats
+
+Revision ID: c1f5e9a3d7b2
+Revises: b8e4c2a6d0f3
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1f5e9a3d7b2'
+down_revision: Union[str, None] = 'b8e4c2a6d0f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chats', sa.Column('current_step_id', sa.Integer(), nullable=True))
+    op.add_column('chats', sa.Column('completed_steps', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chats', sa.Column('total_steps', sa.Integer(), server_default='0', nullable=False))
+    op.create_foreign_key(
+        'fk_chats_current_step_id_steps', 'chats', 'steps', ['current_step_id'], ['id'], ondelete='SET NULL'
+    )
+
+    # Backfill from existing steps
+    op.execute("""
+        UPDATE chats
+        SET completed_steps = stats.completed_steps,
+            total_steps = stats.total_steps
+        FROM (
+            SELECT chat_id, count(*) FILTER (WHERE is_completed) AS completed_steps, count(*) AS total_steps
+            FROM steps
+            GROUP BY chat_id
+        ) AS stats
+        WHERE stats.chat_id = chats.id
+    """)
+    op.execute("""
+        UPDATE chats
+        SET current_step_id = current.id
+        FROM (
+            SELECT DISTINCT ON (chat_id) chat_id, id
+            FROM steps
+            WHERE NOT is_completed
+            ORDER BY chat_id, step_number
+        ) AS current
+        WHERE current.chat_id = chats.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_constraint('fk_chats_current_step_id_steps', 'chats', type_='foreignkey')
+    op.drop_column('chats', 'total_steps')
+    op.drop_column('chats', 'completed_steps')
+    op.drop_column('chats', 'current_step_id')
@@ -0,0 +1,41 @@
+"""Add keyset pagination indexes for chats, histories and users
+
+Revision ID: c4f8a2e6b9d1
+Revises: b7e2c4d9a1f3
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f8a2e6b9d1'
+down_revision: Union[str, None] = 'b7e2c4d9a1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Listings are ordered on (created_at, id), so the id tiebreaker joins the index
+    op.drop_index('ix_chats_user_id_created_at', table_name='chats')
+    op.create_index('ix_chats_user_id_created_at_id', 'chats', ['user_id', 'created_at', 'id'])
+
+    op.drop_index('ix_maintenance_histories_user_id_created_at', table_name='maintenance_histories')
+    op.create_index('ix_maintenance_histories_user_id_created_at_id', 'maintenance_histories', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_maintenance_histories_created_at_id', 'maintenance_histories', ['created_at', 'id'])
+
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
+
+    op.drop_index('ix_maintenance_histories_created_at_id', table_name='maintenance_histories')
+    op.drop_index('ix_maintenance_histories_user_id_created_at_id', table_name='maintenance_histories')
+    op.create_index('ix_maintenance_histories_user_id_created_at', 'maintenance_histories', ['user_id', 'created_at'])
+
+    op.drop_index('ix_chats_user_id_created_at_id', table_name='chats')
+    op.create_index('ix_chats_user_id_created_at', 'chats', ['user_id', 'created_at'])
@@ -0,0 +1,33 @@
+"""Record when the template status of chats and procedures last changed
+
+Revision ID: c6f0a4e8b2d5
+Revises: b5e9f3d7a1c4
+Create Date: 2026-10-20 00:00:00.000000
+
+Extractions still pending or processing when this runs count from now.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f0a4e8b2d5'
+down_revision: Union[str, None] = 'b5e9f3d7a1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chats', sa.Column(
+        'template_updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False
+    ))
+    op.add_column('procedure_templates', sa.Column(
+        'status_updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False
+    ))
+
+
+def downgrade() -> None:
+    op.drop_column('procedure_templates', 'status_updated_at')
+    op.drop_column('chats', 'template_updated_at')
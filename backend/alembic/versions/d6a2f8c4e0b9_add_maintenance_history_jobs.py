@@ -0,0 +1,52 @@
+"""Add maintenance history generation jobs
+
+Revision ID: d6a2f8c4e0b9
+Revises: c1f5e9a3d7b2
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a2f8c4e0b9'
+down_revision: Union[str, None] = 'c1f5e9a3d7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+history_job_status = sa.Enum('PENDING', 'PROCESSING', 'DONE', 'FAILED', name='historyjobstatus')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'maintenance_history_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('chat_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', history_job_status, nullable=False),
+        sa.Column('history_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['history_id'], ['maintenance_histories.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_maintenance_history_jobs_id'), 'maintenance_history_jobs', ['id'], unique=False)
+    op.create_index(
+        'uq_maintenance_history_jobs_active_chat_id', 'maintenance_history_jobs', ['chat_id'],
+        unique=True, postgresql_where=sa.text("status IN ('PENDING', 'PROCESSING')")
+    )
+    op.create_index('ix_maintenance_history_jobs_chat_id_id', 'maintenance_history_jobs', ['chat_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_maintenance_history_jobs_chat_id_id', table_name='maintenance_history_jobs')
+    op.drop_index('uq_maintenance_history_jobs_active_chat_id', table_name='maintenance_history_jobs')
+    op.drop_index(op.f('ix_maintenance_history_jobs_id'), table_name='maintenance_history_jobs')
+    op.drop_table('maintenance_history_jobs')
+    history_job_status.drop(op.get_bind())
@@ -0,0 +1,55 @@
+"""Add the pending message status; leave failed messages out of the chat counters
+
+Revision ID: d7a1b5f9c3e6
+Revises: c6f0a4e8b2d5
+Create Date: 2026-10-20 01:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a1b5f9c3e6'
+down_revision: Union[str, None] = 'c6f0a4e8b2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # User messages are stored before the AI call, as pending
+    op.execute("ALTER TYPE messagestatus ADD VALUE IF NOT EXISTS 'PENDING' BEFORE 'COMPLETED'")
+
+    # Failed messages used to be counted; recount the chats that have any
+    op.execute("""
+        UPDATE chats
+        SET message_count = coalesce(stats.message_count, 0),
+            last_activity_at = greatest(chats.created_at, stats.last_message_at),
+            last_message_preview = stats.preview
+        FROM (
+            SELECT failed.chat_id,
+                   count(messages.id) AS message_count,
+                   max(messages.created_at) AS last_message_at,
+                   (
+                       SELECT CASE WHEN length(p.text) > 120 THEN left(p.text, 119) || '…' ELSE p.text END
+                       FROM (
+                           SELECT btrim(regexp_replace(latest.content, '\\s+', ' ', 'g')) AS text
+                           FROM messages AS latest
+                           WHERE latest.chat_id = failed.chat_id AND latest.status = 'COMPLETED'
+                           ORDER BY latest.created_at DESC, latest.id DESC
+                           LIMIT 1
+                       ) AS p
+                   ) AS preview
+            FROM (SELECT DISTINCT chat_id FROM messages WHERE status = 'FAILED') AS failed
+            LEFT JOIN messages ON messages.chat_id = failed.chat_id AND messages.status = 'COMPLETED'
+            GROUP BY failed.chat_id
+        ) AS stats
+        WHERE stats.chat_id = chats.id
+    """)
+
+
+def downgrade() -> None:
+    # PostgreSQL cannot drop an enum value; turns still waiting are failed instead
+    op.execute("UPDATE messages SET status = 'FAILED' WHERE status = 'PENDING'")
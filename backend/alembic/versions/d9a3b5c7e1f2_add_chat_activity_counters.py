@@ -0,0 +1,62 @@
+"""Add denormalized message counters and last activity to chats
+
+Revision ID: d9a3b5c7e1f2
+Revises: c4f8a2e6b9d1
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a3b5c7e1f2'
+down_revision: Union[str, None] = 'c4f8a2e6b9d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chats', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chats', sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+    op.add_column('chats', sa.Column('last_message_preview', sa.String(length=200), nullable=True))
+
+    # Backfill from existing messages
+    op.execute("""
+        UPDATE chats
+        SET message_count = stats.message_count,
+            last_activity_at = stats.last_message_at
+        FROM (
+            SELECT chat_id, count(*) AS message_count, max(created_at) AS last_message_at
+            FROM messages
+            GROUP BY chat_id
+        ) AS stats
+        WHERE stats.chat_id = chats.id
+    """)
+    op.execute("""
+        UPDATE chats
+        SET last_message_preview = left(latest.content, 120)
+        FROM (
+            SELECT DISTINCT ON (chat_id) chat_id, content
+            FROM messages
+            ORDER BY chat_id, created_at DESC, id DESC
+        ) AS latest
+        WHERE latest.chat_id = chats.id
+    """)
+    op.execute("UPDATE chats SET last_activity_at = created_at WHERE last_activity_at IS NULL")
+    op.alter_column('chats', 'last_activity_at', nullable=False)
+
+    # The sidebar orders by recent activity instead of creation date
+    op.drop_index('ix_chats_user_id_created_at_id', table_name='chats')
+    op.create_index('ix_chats_user_id_last_activity_at_id', 'chats', ['user_id', 'last_activity_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chats_user_id_last_activity_at_id', table_name='chats')
+    op.create_index('ix_chats_user_id_created_at_id', 'chats', ['user_id', 'created_at', 'id'])
+
+    op.drop_column('chats', 'last_message_preview')
+    op.drop_column('chats', 'last_activity_at')
+    op.drop_column('chats', 'message_count')
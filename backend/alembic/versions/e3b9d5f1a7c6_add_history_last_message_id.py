@@ -0,0 +1,50 @@
+"""Add the last covered message to maintenance histories
+
+Revision ID: e3b9d5f1a7c6
+Revises: d6a2f8c4e0b9
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9d5f1a7c6'
+down_revision: Union[str, None] = 'd6a2f8c4e0b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('maintenance_histories', sa.Column('last_message_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_maintenance_histories_last_message_id_messages', 'maintenance_histories', 'messages',
+        ['last_message_id'], ['id'], ondelete='SET NULL'
+    )
+
+    # Existing histories covered the messages sent before they were generated
+    op.execute("""
+        UPDATE maintenance_histories
+        SET last_message_id = (
+            SELECT max(messages.id)
+            FROM messages
+            WHERE messages.chat_id = maintenance_histories.chat_id
+              AND messages.created_at <= maintenance_histories.created_at AT TIME ZONE 'UTC'
+        )
+    """)
+
+    op.drop_index('ix_maintenance_histories_chat_id', table_name='maintenance_histories')
+    op.create_index(
+        'ix_maintenance_histories_chat_id_created_at_id', 'maintenance_histories', ['chat_id', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_maintenance_histories_chat_id_created_at_id', table_name='maintenance_histories')
+    op.create_index('ix_maintenance_histories_chat_id', 'maintenance_histories', ['chat_id'])
+
+    op.drop_constraint('fk_maintenance_histories_last_message_id_messages', 'maintenance_histories', type_='foreignkey')
+    op.drop_column('maintenance_histories', 'last_message_id')
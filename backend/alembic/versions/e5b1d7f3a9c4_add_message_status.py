@@ -0,0 +1,30 @@
+"""Add status to messages
+
+Revision ID: e5b1d7f3a9c4
+Revises: d9a3b5c7e1f2
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b1d7f3a9c4'
+down_revision: Union[str, None] = 'd9a3b5c7e1f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+message_status = sa.Enum('COMPLETED', 'FAILED', name='messagestatus')
+
+
+def upgrade() -> None:
+    message_status.create(op.get_bind())
+    op.add_column('messages', sa.Column('status', message_status, server_default='COMPLETED', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('messages', 'status')
+    message_status.drop(op.get_bind())
@@ -0,0 +1,35 @@
+"""Add template extraction status to chats
+
+Revision ID: f2c6a8e4b0d7
+Revises: e5b1d7f3a9c4
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8e4b0d7'
+down_revision: Union[str, None] = 'e5b1d7f3a9c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+template_status = sa.Enum('PENDING', 'PROCESSING', 'DONE', 'FAILED', name='templatestatus')
+
+
+def upgrade() -> None:
+    template_status.create(op.get_bind())
+    op.add_column('chats', sa.Column('template_status', template_status, nullable=True))
+    op.add_column('chats', sa.Column('template_error', sa.String(length=500), nullable=True))
+
+    # Templates of existing chats were processed inline at creation time
+    op.execute("UPDATE chats SET template_status = 'DONE' WHERE instruction_template_path IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_column('chats', 'template_error')
+    op.drop_column('chats', 'template_status')
+    template_status.drop(op.get_bind())
@@ -0,0 +1,57 @@
+"""Add the normalized history_parts table
+
+Revision ID: f7c3a9e5b1d8
+Revises: e3b9d5f1a7c6
+Create Date: 2026-10-19 21:00:00.000000
+
+The table starts empty; fill it for existing histories with
+    python -m scripts.backfill_history_parts
+which works in batches and can run while the app is serving.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7c3a9e5b1d8'
+down_revision: Union[str, None] = 'e3b9d5f1a7c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'history_parts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('history_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('part_number', sa.String(length=100), nullable=True),
+        sa.Column('part_name', sa.String(length=200), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('aircraft_model', sa.String(length=100), nullable=True),
+        sa.Column('registration', sa.String(length=50), nullable=True),
+        sa.Column('used_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['history_id'], ['maintenance_histories.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_history_parts_history_id', 'history_parts', ['history_id'])
+    op.create_index(
+        'ix_history_parts_part_number_used_at', 'history_parts', ['part_number', 'used_at'],
+        postgresql_include=['quantity', 'history_id']
+    )
+    op.create_index('ix_history_parts_aircraft_model_used_at', 'history_parts', ['aircraft_model', 'used_at'])
+    op.create_index('ix_history_parts_registration_used_at', 'history_parts', ['registration', 'used_at'])
+    op.create_index('ix_history_parts_user_id_used_at', 'history_parts', ['user_id', 'used_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_history_parts_user_id_used_at', table_name='history_parts')
+    op.drop_index('ix_history_parts_registration_used_at', table_name='history_parts')
+    op.drop_index('ix_history_parts_aircraft_model_used_at', table_name='history_parts')
+    op.drop_index('ix_history_parts_part_number_used_at', table_name='history_parts')
+    op.drop_index('ix_history_parts_history_id', table_name='history_parts')
+    op.drop_table('history_parts')
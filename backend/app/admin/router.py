@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_
+from sqlalchemy.orm import defer
 from typing import List
 
 from app.core.database import get_db
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, split_page
 from app.auth.dependencies import require_admin, get_current_user
 from app.user.user import User, user_assignments
 from app.user.schemas import (
-    UserCreate, UserResponse, UserAdminUpdate, 
+    UserCreate, UserResponse, UserListResponse, UserAdminUpdate, 
     UserAssignmentRequest, UserRole
 )
 from app.core.security import get_password_hash
+from app.assistant.template_cache.template_cache import TemplateStepCache
+from app.assistant.template_cache.schemas import TemplateCacheEntryResponse, TemplateCacheListResponse, TemplateCacheStats
+from app.assistant.template_cache.service import cache_stats, invalidate as invalidate_template_cache
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -67,17 +72,22 @@ async def initialize_first_admin(
     return db_user
 
 
-@router.get("/users", response_model=List[UserResponse])
+@router.get("/users", response_model=UserListResponse)
 async def list_users(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     role: str | None = None,
     division: str | None = None,
     is_active: bool | None = None,
     current_user: User = Depends(require_admin),
     db: AsyncSession = Depends(get_db)
 ):
-    """List all users with optional filters (admin only)"""
+    """
+    List all users with optional filters (admin only), newest first.
+    When more pages exist, the cursor for the next one is returned in
+    `next_cursor` and in the X-Next-Cursor header.
+    """
     query = select(User)
     
     # Apply filters
@@ -88,12 +98,15 @@ async def list_users(
     if is_active is not None:
         query = query.where(User.is_active == is_active)
     
-    query = query.offset(skip).limit(limit).order_by(User.created_at.desc())
-    
-    result = await db.execute(query)
-    users = result.scalars().all()
+    result = await db.execute(keyset_page(query, User.created_at, User.id, cursor, limit))
+    users, next_cursor = split_page(list(result.scalars().all()), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    return users
+    return UserListResponse(
+        users=[UserResponse.model_validate(user) for user in users],
+        next_cursor=next_cursor
+    )
 
 
 @router.post("/users", response_model=UserResponse)
@@ -339,3 +352,76 @@ async def list_divisions(
     divisions = [row[0] for row in result.all()]
     
     return {"divisions": divisions}
+
+
+@router.get("/template-cache", response_model=TemplateCacheListResponse)
+async def list_template_cache(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List cached template extractions (admin only), newest first.
+    When more pages exist, the cursor for the next one is returned in
+    `next_cursor` and in the X-Next-Cursor header.
+    """
+    query = select(TemplateStepCache).options(defer(TemplateStepCache.steps))
+    result = await db.execute(
+        keyset_page(query, TemplateStepCache.created_at, TemplateStepCache.id, cursor, limit)
+    )
+    entries, next_cursor = split_page(list(result.scalars().all()), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return TemplateCacheListResponse(
+        entries=[TemplateCacheEntryResponse.model_validate(entry) for entry in entries],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/template-cache/stats", response_model=TemplateCacheStats)
+async def get_template_cache_stats(
+    current_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Size and hit rate of the template step cache (admin only)"""
+    return await cache_stats(db)
+
+
+@router.delete("/template-cache/{entry_id}")
+async def delete_template_cache_entry(
+    entry_id: int,
+    current_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Invalidate one cached template (admin only); its next upload is extracted again"""
+    deleted = await invalidate_template_cache(db, entry_id=entry_id)
+    
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cache entry not found"
+        )
+    
+    await db.commit()
+    
+    return {"message": "Cache entry deleted", "deleted": deleted}
+
+
+@router.delete("/template-cache")
+async def clear_template_cache(
+    sha256: str | None = None,
+    stale_only: bool = False,
+    current_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Invalidate cached templates (admin only): all of them, those of one
+    document (`sha256`) or only those built by an older extractor (`stale_only`)
+    """
+    deleted = await invalidate_template_cache(db, sha256=sha256, stale_only=stale_only)
+    await db.commit()
+    
+    return {"message": f"Deleted {deleted} cache entries", "deleted": deleted}
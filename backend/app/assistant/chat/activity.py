@@ -0,0 +1,48 @@
+"""
+Chat activity counters
+Keeps the denormalized message_count, last_activity_at and
+last_message_preview columns of Chat in sync with its messages.
+Every function only issues SQL; the caller commits, so counters change
+in the same transaction as the messages themselves.
+"""
+from sqlalchemy import update, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.assistant.chat.chat import Chat
+from app.assistant.message.message import Message, MessageStatus
+
+PREVIEW_LENGTH = 120
+
+
+def message_preview(content: str) -> str:
+    """Single-line, truncated version of a message for the chat list"""
+    preview = " ".join(content.split())
+    if len(preview) > PREVIEW_LENGTH:
+        preview = preview[:PREVIEW_LENGTH - 1] + "…"
+    return preview
+
+
+async def register_messages(db: AsyncSession, chat_id: int, messages: list[Message]) -> None:
+    """
+    Account for newly answered messages (they must already be flushed).
+    Pending and failed messages are not part of the conversation and are
+    skipped. Uses relative updates so concurrent inserts on the same chat do
+    not lose counts.
+    """
+    messages = [msg for msg in messages if msg.status == MessageStatus.COMPLETED]
+    if not messages:
+        return
+    
+    latest = max(messages, key=lambda msg: (msg.created_at, msg.id))
+    await db.execute(
+        update(Chat)
+        .where(Chat.id == chat_id)
+        .values(
+            message_count=Chat.message_count + len(messages),
+            last_message_preview=case(
+                (Chat.last_activity_at <= latest.created_at, message_preview(latest.content)),
+                else_=Chat.last_message_preview
+            ),
+            last_activity_at=func.greatest(Chat.last_activity_at, latest.created_at)
+        )
+        .execution_options(synchronize_session=False)
+    )
@@ -1,10 +1,24 @@
-from sqlalchemy import String, Integer, ForeignKey, DateTime
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Index, Enum, Column, Computed, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
+import enum
 from app.core.database import Base
 
+class TemplateStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
 class Chat(Base):
     __tablename__ = "chats"
+    __table_args__ = (
+        # Serves the chat sidebar: most recently active first, keyset-paginated
+        Index("ix_chats_user_id_last_activity_at_id", "user_id", "last_activity_at", "id"),
+        Index("ix_chats_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -13,9 +27,41 @@ class Chat(Base):
     component_type: Mapped[str | None] = mapped_column(String, nullable=True)
     instruction_template_path: Mapped[str | None] = mapped_column(String, nullable=True)
     instruction_template_filename: Mapped[str | None] = mapped_column(String, nullable=True)
+    template_id: Mapped[int | None] = mapped_column(ForeignKey("procedure_templates.id", ondelete="SET NULL"), nullable=True, index=True)  # Library procedure the chat follows
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
+    # Full-text search (app.search), computed by PostgreSQL on every write; not mapped,
+    # so the ORM never loads it or asks for it back after an INSERT
+    search_vector = Column(TSVECTOR, Computed("setweight(to_tsvector('spanish', title), 'A')", persisted=True))
+    
+    # Step extraction from the template runs in the background (app.assistant.template_jobs)
+    template_status: Mapped[TemplateStatus | None] = mapped_column(Enum(TemplateStatus), nullable=True)  # None when no template
+    template_error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    template_updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Last status change
+    
+    # Denormalized message activity, kept in sync by app.assistant.chat.activity
+    message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    last_activity_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)  # Last message, or creation if empty
+    last_message_preview: Mapped[str | None] = mapped_column(String(200), nullable=True)
+    
+    # Denormalized step progress, kept in sync by app.assistant.step.progress
+    current_step_id: Mapped[int | None] = mapped_column(
+        ForeignKey("steps.id", ondelete="SET NULL", use_alter=True), nullable=True
+    )  # First incomplete step; None when every step is done or there are none
+    completed_steps: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    total_steps: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    
     # Relationships
     messages: Mapped[list["Message"]] = relationship("Message", back_populates="chat", cascade="all, delete-orphan")
-    steps: Mapped[list["Step"]] = relationship("Step", back_populates="chat", cascade="all, delete-orphan", order_by="Step.step_number")
+    steps: Mapped[list["Step"]] = relationship(
+        "Step", back_populates="chat", cascade="all, delete-orphan", order_by="Step.step_number",
+        foreign_keys="Step.chat_id"
+    )
     user: Mapped["User"] = relationship("User", back_populates="chats")
+    
+    @property
+    def progress_percent(self) -> int | None:
+        """Share of completed steps, None when the chat has no steps"""
+        if not self.total_steps:
+            return None
+        return self.completed_steps * 100 // self.total_steps
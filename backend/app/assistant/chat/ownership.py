@@ -0,0 +1,80 @@
+"""
+Chat ownership checks folded into data queries
+Instead of loading the chat first and then its data, handlers add the
+ownership predicate to the data query itself:
+- single-row lookups select the user's chat outer-joined to the row, so "chat
+  not found or not yours" (no row) and "no data" (NULL joined side) come
+  from the same result
+- ordered lists and updates filter on an EXISTS predicate, which keeps their
+  index order; only an empty result needs get_owned_chat to tell a missing
+  chat from a chat without data
+"""
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.assistant.chat.chat import Chat
+from app.assistant.step.step import Step
+
+
+def select_with_owned_chat(chat_id: int, user_id: int, target, onclause, chat_entity=Chat.id):
+    """SELECT (chat_entity, target) for the user's chat, outer-joined to the target rows"""
+    return (
+        select(chat_entity, target)
+        .outerjoin(target, onclause)
+        .where(Chat.id == chat_id, Chat.user_id == user_id)
+    )
+
+
+def unpack_owned_rows(rows) -> list:
+    """Target side of select_with_owned_chat rows; 404 when the chat is not the user's"""
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat not found"
+        )
+    return [row[1] for row in rows if row[1] is not None]
+
+
+def owned_chat_exists(chat_id: int, user_id: int):
+    """EXISTS predicate for the user's chat, evaluated once per statement"""
+    return select(Chat.id).where(Chat.id == chat_id, Chat.user_id == user_id).exists()
+
+
+def lock_owned_chat(chat_id: int, user_id: int):
+    """
+    Like owned_chat_exists, but also locks the chat row (FOR UPDATE) before
+    the statement touches any other row; used by statements that change steps
+    """
+    return (
+        select(Chat.id)
+        .where(Chat.id == chat_id, Chat.user_id == user_id)
+        .with_for_update()
+        .exists()
+    )
+
+
+async def get_owned_chat(db: AsyncSession, chat_id: int, user_id: int) -> Chat:
+    """Load the user's chat or raise 404; the fallback when an owned-filtered query returns nothing"""
+    result = await db.execute(
+        select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
+    )
+    chat = result.scalars().first()
+
+    if not chat:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat not found"
+        )
+    return chat
+
+
+def first_incomplete_step_id():
+    """Correlated subquery: id of the current (first incomplete) step of Chat"""
+    return (
+        select(Step.id)
+        .where(Step.chat_id == Chat.id, Step.is_completed == False)
+        .order_by(Step.step_number)
+        .limit(1)
+        .correlate(Chat)
+        .scalar_subquery()
+    )
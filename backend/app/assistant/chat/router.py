@@ -1,26 +1,51 @@
+import asyncio
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from app.core.database import get_db
+from app.core.timing import StageTimer
+from app.core.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, before_cursor, after_cursor,
+    keyset_page, split_page
+)
 from app.auth.dependencies import get_current_user
 from app.user.user import User
-from app.assistant.chat.chat import Chat
-from app.assistant.chat.schemas import ChatCreate, ChatUpdate, ChatResponse, ChatListResponse, ChatWithMessages
-from app.assistant.message.message import Message, MessageRole
-from app.assistant.message.schemas import MessageCreate, MessageResponse
+from app.assistant.chat.chat import Chat, TemplateStatus
+from app.assistant.chat.activity import register_messages
+from app.assistant.chat.ownership import (
+    select_with_owned_chat, unpack_owned_rows, get_owned_chat
+)
+from app.assistant.chat.schemas import (
+    ChatCreate, ChatUpdate, ChatResponse, ChatListResponse, ChatWithMessages, TemplateStatusResponse
+)
+from app.assistant.message.message import Message, MessageRole, MessageStatus
+from app.assistant.step.step import Step
+from app.assistant.step.bulk import bulk_insert_steps, copy_template_steps
+from app.assistant.procedure.procedure import ProcedureTemplate
+from app.assistant.template_jobs import process_template, expire_stale_template, retry_template
+from app.assistant.template_cache.service import get_cached_steps
+from app.assistant.message.schemas import MessageCreate, MessageResponse, MessagePage
 from app.assistant.service import gemini_service
 
 router = APIRouter(prefix="/chats", tags=["chats"])
 
 @router.post("/", response_model=ChatResponse, status_code=status.HTTP_201_CREATED)
 async def create_chat(
+    background_tasks: BackgroundTasks,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
     chat_data: str = Form(...),
     template: UploadFile | None = File(None)
 ):
-    """Create a new chat for the current user."""
+    """
+    Create a new chat for the current user.
+    A chat started from the template library (`template_id`) gets a copy of
+    the procedure's steps right away. Steps of an uploaded template are
+    extracted in the background; poll GET /chats/{chat_id}/template-status
+    to follow the extraction.
+    """
     from app.core.storage import storage_service
     import json
     
@@ -34,137 +59,210 @@ async def create_chat(
             detail=f"Invalid chat_data: {str(e)}"
         )
     
+    if template and chat_create.template_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Upload a template or choose one from the library, not both"
+        )
+    
+    # Start from a procedure of the template library: its steps are already extracted
+    procedure = None
+    if chat_create.template_id:
+        result = await db.execute(
+            select(ProcedureTemplate).where(
+                ProcedureTemplate.id == chat_create.template_id,
+                ProcedureTemplate.is_active == True
+            )
+        )
+        procedure = result.scalars().first()
+        
+        if not procedure:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Procedure template not found"
+            )
+        if procedure.status != TemplateStatus.DONE:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Procedure template is not ready yet"
+            )
+    
     # Handle template upload if provided
-    template_path = None
-    template_filename = None
+    template_info = None
+    cached_steps = None
     if template:
         template_info = await storage_service.save_instruction_template(
             user_id=current_user.id,
             file=template
         )
-        template_path = template_info["path"]
-        template_filename = template_info["filename"]
+        # A template uploaded before reuses its extracted steps
+        cached_steps = await get_cached_steps(db, template_info["sha256"])
+    
+    template_status = None
+    if procedure:
+        template_status = TemplateStatus.DONE
+    elif template_info:
+        template_status = TemplateStatus.PENDING if cached_steps is None else TemplateStatus.DONE
     
     new_chat = Chat(
         user_id=current_user.id,
         title=chat_create.title,
-        airplane_model=chat_create.airplane_model,
-        component_type=chat_create.component_type,
-        instruction_template_path=template_path,
-        instruction_template_filename=template_filename
+        airplane_model=chat_create.airplane_model or (procedure.airplane_model if procedure else None),
+        component_type=chat_create.component_type or (procedure.component_type if procedure else None),
+        template_id=procedure.id if procedure else None,
+        instruction_template_path=procedure.file_path if procedure else template_info["path"] if template_info else None,
+        instruction_template_filename=procedure.filename if procedure else template_info["filename"] if template_info else None,
+        template_status=template_status
     )
     db.add(new_chat)
+    if procedure:
+        await db.flush()
+        await copy_template_steps(db, procedure.id, new_chat.id)
+    elif cached_steps:
+        await db.flush()
+        await bulk_insert_steps(db, new_chat.id, cached_steps)
     await db.commit()
     await db.refresh(new_chat)
     
-    # If template was uploaded, extract steps
-    if template_path:
-        from app.assistant.template_processor import extract_steps_from_pdf
-        try:
-            steps_data = await extract_steps_from_pdf(template_path)
-            # Create Step records
-            from app.assistant.step.step import Step
-            for step_data in steps_data:
-                step = Step(
-                    chat_id=new_chat.id,
-                    step_number=step_data["step_number"],
-                    title=step_data["title"],
-                    description=step_data.get("description")
-                )
-                db.add(step)
-            await db.commit()
-        except Exception as e:
-            print(f"Error extracting steps: {e}")
-            # Continue even if step extraction fails
-    
-    return ChatResponse(
-        id=new_chat.id,
-        user_id=new_chat.user_id,
-        title=new_chat.title,
-        airplane_model=new_chat.airplane_model,
-        component_type=new_chat.component_type,
-        instruction_template_filename=new_chat.instruction_template_filename,
-        created_at=new_chat.created_at,
-        message_count=0
-    )
+    # Otherwise steps are extracted from the template after the response is sent
+    if template_status == TemplateStatus.PENDING:
+        background_tasks.add_task(
+            process_template, new_chat.id, template_info["path"],
+            template_info["sha256"], template_info["filename"]
+        )
+    
+    return ChatResponse.model_validate(new_chat)
 
 @router.get("/", response_model=ChatListResponse)
 async def list_chats(
+    response: Response,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_db)],
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
 ):
-    """List all chats for the current user."""
-    # Get chats with message count
+    """
+    List the chats of the current user, most recently active first.
+    Pass `next_cursor` back as `cursor` to get the following page.
+    """
     result = await db.execute(
-        select(Chat, func.count(Message.id).label("message_count"))
-        .outerjoin(Message)
-        .where(Chat.user_id == current_user.id)
-        .group_by(Chat.id)
-        .order_by(Chat.created_at.desc())
+        keyset_page(
+            select(Chat).where(Chat.user_id == current_user.id),
+            Chat.last_activity_at, Chat.id, cursor, limit
+        )
+    )
+    
+    chats, next_cursor = split_page(
+        list(result.scalars().all()), limit, key=lambda chat: (chat.last_activity_at, chat.id)
     )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    chats_with_counts = result.all()
-    
-    chat_responses = [
-        ChatResponse(
-            id=chat.id,
-            user_id=chat.user_id,
-            title=chat.title,
-            airplane_model=chat.airplane_model,
-            component_type=chat.component_type,
-            created_at=chat.created_at,
-            message_count=message_count
+    return ChatListResponse(
+        chats=[ChatResponse.model_validate(chat) for chat in chats],
+        next_cursor=next_cursor
+    )
+
+def _to_message_response(msg: Message) -> MessageResponse:
+    """Build the API representation of a message, resolving its image URL"""
+    from app.core.storage import storage_service
+    
+    return MessageResponse(
+        id=msg.id,
+        chat_id=msg.chat_id,
+        role=msg.role,
+        content=msg.content,
+        status=msg.status,
+        created_at=msg.created_at,
+        has_image=msg.has_image,
+        image_filename=msg.image_filename,
+        image_url=storage_service.get_image_url(msg.image_path) if msg.has_image and msg.image_path else None
+    )
+
+async def _fetch_message_page(
+    db: AsyncSession,
+    chat_id: int,
+    user_id: int,
+    limit: int,
+    before: str | None = None,
+    after: str | None = None
+) -> tuple[Chat, MessagePage]:
+    """
+    Fetch the user's chat and one page of its messages using the
+    (created_at, id) keyset. Chat and messages come from a single joined
+    query; the chat is loaded on its own only when the page is empty.
+    Without cursors the latest page is returned. One extra row is read to
+    know whether more messages exist in the direction of travel.
+    """
+    query = (
+        select(Chat, Message)
+        .join(Message, Message.chat_id == Chat.id)
+        .where(Chat.id == chat_id, Chat.user_id == user_id)
+    )
+    
+    if after:
+        # Walk forward from the cursor
+        result = await db.execute(
+            query.where(after_cursor(Message.created_at, Message.id, after))
+            .order_by(Message.created_at.asc(), Message.id.asc())
+            .limit(limit + 1)
         )
-        for chat, message_count in chats_with_counts
-    ]
+        rows = result.all()
+        messages = [message for _, message in rows]
+        has_newer = len(messages) > limit
+        messages = messages[:limit]
+        has_older = True
+    else:
+        # Walk backwards from the cursor (or from the end of the chat)
+        if before:
+            query = query.where(before_cursor(Message.created_at, Message.id, before))
+        result = await db.execute(
+            query.order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(limit + 1)
+        )
+        rows = result.all()
+        messages = [message for _, message in rows]
+        has_older = len(messages) > limit
+        messages = messages[:limit][::-1]
+        has_newer = before is not None
     
-    return ChatListResponse(chats=chat_responses)
+    chat = rows[0][0] if rows else await get_owned_chat(db, chat_id, user_id)
+    return chat, MessagePage(
+        messages=[_to_message_response(msg) for msg in messages],
+        older_cursor=encode_cursor(messages[0].created_at, messages[0].id) if messages and has_older else None,
+        newer_cursor=encode_cursor(messages[-1].created_at, messages[-1].id) if messages else None,
+        has_newer=has_newer
+    )
 
 @router.get("/{chat_id}", response_model=ChatWithMessages)
 async def get_chat(
     chat_id: int,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_db)],
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE)
 ):
-    """Get a specific chat with all its messages."""
-    from app.core.storage import storage_service
+    """
+    Get a specific chat with its messages.
     
-    result = await db.execute(
-        select(Chat).where(Chat.id == chat_id, Chat.user_id == current_user.id)
-    )
-    chat = result.scalars().first()
-    
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
-    
-    # Get messages
-    result = await db.execute(
-        select(Message)
-        .where(Message.chat_id == chat_id)
-        .order_by(Message.created_at.asc())
-    )
-    messages = result.scalars().all()
-    
-    # Convert messages to response format with image URLs
-    message_responses = []
-    for msg in messages:
-        msg_dict = {
-            "id": msg.id,
-            "chat_id": msg.chat_id,
-            "role": msg.role,
-            "content": msg.content,
-            "created_at": msg.created_at,
-            "has_image": msg.has_image,
-            "image_filename": msg.image_filename
-        }
-        
-        # Add image URL if message has image
-        if msg.has_image and msg.image_path:
-            msg_dict["image_url"] = storage_service.get_image_url(msg.image_path)
-        else:
-            msg_dict["image_url"] = None
-            
-        message_responses.append(MessageResponse(**msg_dict))
+    With `limit`, only the latest page of messages is returned together with
+    `older_cursor` to load the rest from `GET /chats/{chat_id}/messages`.
+    """
+    # Ownership check and messages in one query
+    if limit:
+        chat, page = await _fetch_message_page(db, chat_id, current_user.id, limit)
+        message_responses = page.messages
+        older_cursor = page.older_cursor
+    else:
+        result = await db.execute(
+            select(Chat, Message)
+            .join(Message, Message.chat_id == Chat.id)
+            .where(Chat.id == chat_id, Chat.user_id == current_user.id)
+            .order_by(Message.created_at.asc())
+        )
+        rows = result.all()
+        message_responses = [_to_message_response(msg) for _, msg in rows]
+        chat = rows[0][0] if rows else await get_owned_chat(db, chat_id, current_user.id)
+        older_cursor = None
     
     return ChatWithMessages(
         id=chat.id,
@@ -174,9 +272,40 @@ async def get_chat(
         component_type=chat.component_type,
         instruction_template_filename=chat.instruction_template_filename,
         created_at=chat.created_at,
-        messages=message_responses
+        template_status=chat.template_status,
+        current_step_id=chat.current_step_id,
+        completed_steps=chat.completed_steps,
+        total_steps=chat.total_steps,
+        progress_percent=chat.progress_percent,
+        messages=message_responses,
+        older_cursor=older_cursor
     )
 
+@router.get("/{chat_id}/messages", response_model=MessagePage)
+async def list_messages(
+    chat_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    before: str | None = None,
+    after: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """
+    Get a page of messages of a chat, oldest first.
+    
+    - No cursor: latest messages of the chat
+    - `before`: messages older than the cursor
+    - `after`: messages newer than the cursor
+    """
+    if before and after:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either 'before' or 'after', not both"
+        )
+    
+    _, page = await _fetch_message_page(db, chat_id, current_user.id, limit, before=before, after=after)
+    return page
+
 @router.patch("/{chat_id}", response_model=ChatResponse)
 async def update_chat(
     chat_id: int,
@@ -199,23 +328,82 @@ async def update_chat(
     # Update title
     chat.title = chat_update.title
     await db.commit()
-    await db.refresh(chat)
     
-    # Get message count
-    count_result = await db.execute(
-        select(func.count(Message.id)).where(Message.chat_id == chat_id)
+    return ChatResponse.model_validate(chat)
+
+@router.get("/{chat_id}/template-status", response_model=TemplateStatusResponse)
+async def get_template_status(
+    chat_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """
+    Progress of the step extraction for the chat's template. An extraction
+    that stopped without finishing is reported as `failed`; retry it with
+    POST /chats/{chat_id}/template-retry.
+    """
+    await expire_stale_template(db, Chat, chat_id)
+    await db.commit()
+    
+    step_count = (
+        select(func.count(Step.id))
+        .where(Step.chat_id == Chat.id)
+        .correlate(Chat)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(Chat.template_status, Chat.template_error, step_count)
+        .where(Chat.id == chat_id, Chat.user_id == current_user.id)
     )
-    message_count = count_result.scalar()
+    row = result.first()
     
-    return ChatResponse(
-        id=chat.id,
-        user_id=chat.user_id,
-        title=chat.title,
-        airplane_model=chat.airplane_model,
-        component_type=chat.component_type,
-        created_at=chat.created_at,
-        message_count=message_count
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat not found"
+        )
+    
+    template_status, template_error, steps = row
+    return TemplateStatusResponse(
+        chat_id=chat_id,
+        status=template_status,
+        error=template_error,
+        step_count=steps
+    )
+
+@router.post("/{chat_id}/template-retry", response_model=TemplateStatusResponse, status_code=status.HTTP_202_ACCEPTED)
+async def retry_template_extraction(
+    chat_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Extract the steps of the chat's template again after a failed extraction"""
+    from app.core.storage import storage_service
+    
+    result = await db.execute(
+        select(Chat.instruction_template_path, Chat.instruction_template_filename)
+        .where(Chat.id == chat_id, Chat.user_id == current_user.id)
     )
+    chat = result.first()
+    
+    if not chat:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat not found"
+        )
+    
+    template_path, template_filename = chat
+    if not template_path or not await retry_template(db, Chat, chat_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Only a failed extraction can be retried"
+        )
+    sha256 = await storage_service.hash_instruction_template(template_path)
+    await db.commit()
+    
+    background_tasks.add_task(process_template, chat_id, template_path, sha256, template_filename)
+    return TemplateStatusResponse(chat_id=chat_id, status=TemplateStatus.PENDING)
 
 @router.delete("/{chat_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_chat(
@@ -238,86 +426,76 @@ async def delete_chat(
     await db.delete(chat)
     await db.commit()
 
+async def _persist_messages(db: AsyncSession, chat_id: int, messages: list[Message]) -> None:
+    """
+    Store the messages of a turn (and status changes of ones already stored)
+    and update the chat counters in one short transaction. New messages go
+    in a single multi-row INSERT ... RETURNING, and no refresh is needed
+    since every other column is set client-side.
+    """
+    db.add_all(messages)
+    await db.flush()
+    await register_messages(db, chat_id, messages)
+    await db.commit()
+
 @router.post("/{chat_id}/messages", response_model=dict)
 async def send_message(
     chat_id: int,
+    response: Response,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
     content: str = Form(...),
     image: UploadFile | None = File(None)
 ):
-    """Send a message in a chat (with optional image) and get AI response."""
+    """
+    Send a message in a chat (with optional image) and get AI response.
+    
+    Runs as a staged pipeline: the uploaded image is written to disk while the
+    history is read and the prompt context is built, and the AI request starts
+    as soon as its inputs exist. Stage durations are returned in the
+    Server-Timing header.
+    """
     from app.core.storage import storage_service
     from app.assistant.image_processor import image_processor
     
-    # Verify chat exists and belongs to user
-    result = await db.execute(
-        select(Chat).where(Chat.id == chat_id, Chat.user_id == current_user.id)
-    )
-    chat = result.scalars().first()
+    timer = StageTimer()
     
-    if not chat:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chat not found"
+    # Verify chat exists and belongs to user, fetching its current step in the same query
+    with timer.stage("lookup"):
+        result = await db.execute(
+            select_with_owned_chat(chat_id, current_user.id, Step, Step.id == Chat.current_step_id, chat_entity=Chat)
         )
+        rows = result.all()
     
-    # Get message history for context
-    history_result = await db.execute(
-        select(Message)
-        .where(Message.chat_id == chat_id)
-        .order_by(Message.created_at.asc())
-    )
-    history = history_result.scalars().all()
-    
-    # Convert to format expected by Gemini service
-    message_history = [
-        {"role": msg.role.value, "content": msg.content}
-        for msg in history
-    ]
+    current_step = next(iter(unpack_owned_rows(rows)), None)
+    chat = rows[0][0]
     
-    # Handle image upload if present
-    user_image_info = None
+    # Write the uploaded image in the background while the history is read
+    image_task = None
     if image:
-        user_image_info = await storage_service.save_user_image(
-            user_id=current_user.id,
-            chat_id=chat_id,
-            file=image
-        )
+        image_task = asyncio.create_task(timer.measure(
+            "image_save",
+            storage_service.save_user_image(user_id=current_user.id, chat_id=chat_id, file=image)
+        ))
     
-    # Save user message
-    user_message = Message(
-        chat_id=chat_id,
-        role=MessageRole.USER,
-        content=content,
-        has_image=bool(user_image_info),
-        image_path=user_image_info["path"] if user_image_info else None,
-        image_filename=user_image_info["filename"] if user_image_info else None,
-        image_size=user_image_info["size"] if user_image_info else None,
-        image_type=user_image_info["type"] if user_image_info else None
-    )
-    db.add(user_message)
-    await db.commit()
-    await db.refresh(user_message)
+    # Get message history for context (failed turns never reached the AI)
+    with timer.stage("history"):
+        history_result = await db.execute(
+            select(Message.role, Message.content)
+            .where(Message.chat_id == chat_id, Message.status == MessageStatus.COMPLETED)
+            .order_by(Message.created_at.asc())
+        )
+        message_history = [
+            {"role": role.value, "content": message_content}
+            for role, message_content in history_result.all()
+        ]
     
-    # Get AI response
     # Prepare chat context
     chat_context = {}
     if chat.airplane_model:
         chat_context["airplane_model"] = chat.airplane_model
     if chat.component_type:
         chat_context["component_type"] = chat.component_type
-    
-    # Add current step context if available
-    from app.assistant.step.step import Step
-    result_step = await db.execute(
-        select(Step)
-        .where(Step.chat_id == chat_id, Step.is_completed == False)
-        .order_by(Step.step_number)
-        .limit(1)
-    )
-    current_step = result_step.scalars().first()
-    
     if current_step:
         chat_context["current_step"] = {
             "step_number": current_step.step_number,
@@ -325,43 +503,72 @@ async def send_message(
             "description": current_step.description
         }
     
+    user_image_info = await image_task if image_task else None
+    
+    # The user message is stored before the AI call, as pending, so a turn in
+    # flight (or lost to a crash) shows in the chat; it is counted once answered
+    user_message = Message(
+        chat_id=chat_id,
+        role=MessageRole.USER,
+        content=content,
+        status=MessageStatus.PENDING,
+        has_image=bool(user_image_info),
+        image_path=user_image_info["path"] if user_image_info else None,
+        image_filename=user_image_info["filename"] if user_image_info else None,
+        image_size=user_image_info["size"] if user_image_info else None,
+        image_type=user_image_info["type"] if user_image_info else None,
+        created_at=datetime.utcnow()
+    )
+    with timer.stage("persist"):
+        db.add(user_message)
+        # Also ends the read-only transaction, so no connection is held while the AI answers
+        await db.commit()
+    
+    # Start the AI request right away
+    if user_image_info:
+        # Process with Gemini Vision
+        ai_request = gemini_service.chat_with_image(
+            image_path=user_image_info["path"],
+            message=content,
+            history=message_history,
+            chat_context=chat_context
+        )
+    else:
+        # Regular text chat
+        ai_request = gemini_service.chat(
+            message=content,
+            history=message_history,
+            chat_context=chat_context
+        )
     try:
+        ai_response = await timer.measure("llm", ai_request)
+        ai_image_info = None
+        
         if user_image_info:
-            # Process with Gemini Vision
-            ai_response = await gemini_service.chat_with_image(
-                image_path=user_image_info["path"],
-                message=content,
-                history=message_history,
-                chat_context=chat_context
-            )
-            
             # Draw annotations on image
             if ai_response.get("annotations"):
-                annotated_image_bytes = image_processor.draw_annotations(
-                    image_path=user_image_info["path"],
-                    annotations=ai_response["annotations"]
-                )
-                
-                # Save annotated image
-                ai_image_info = await storage_service.save_ai_image(
-                    user_id=current_user.id,
-                    chat_id=chat_id,
-                    image_data=annotated_image_bytes
-                )
-            else:
-                ai_image_info = None
+                with timer.stage("annotate"):
+                    annotated_image_bytes = await asyncio.to_thread(
+                        image_processor.draw_annotations,
+                        image_path=user_image_info["path"],
+                        annotations=ai_response["annotations"]
+                    )
+                    
+                    # Save annotated image
+                    ai_image_info = await storage_service.save_ai_image(
+                        user_id=current_user.id,
+                        chat_id=chat_id,
+                        image_data=annotated_image_bytes
+                    )
             
             ai_response_content = ai_response["text"]
         else:
-            # Regular text chat
-            ai_response_content = await gemini_service.chat(
-                message=content,
-                history=message_history,
-                chat_context=chat_context
-            )
-            ai_image_info = None
+            ai_response_content = ai_response
             
     except Exception as e:
+        # Keep the user message as failed so the retry is visible in the chat
+        user_message.status = MessageStatus.FAILED
+        await db.commit()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error communicating with AI assistant: {str(e)}"
@@ -376,11 +583,14 @@ async def send_message(
         image_path=ai_image_info["path"] if ai_image_info else None,
         image_filename=ai_image_info["filename"] if ai_image_info else None,
         image_size=ai_image_info["size"] if ai_image_info else None,
-        image_type=ai_image_info["type"] if ai_image_info else None
+        image_type=ai_image_info["type"] if ai_image_info else None,
+        created_at=datetime.utcnow()
     )
-    db.add(ai_message)
-    await db.commit()
-    await db.refresh(ai_message)
+    user_message.status = MessageStatus.COMPLETED
+    with timer.stage("persist"):
+        await _persist_messages(db, chat_id, [user_message, ai_message])
+    
+    response.headers["Server-Timing"] = timer.server_timing()
     
     # Return both messages with image URLs
     return {
@@ -5,6 +5,7 @@ class ChatCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
     airplane_model: str | None = Field(None, max_length=100)
     component_type: str | None = Field(None, max_length=100)
+    template_id: int | None = None  # Procedure of the template library to follow
 
 class ChatUpdate(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
@@ -16,14 +17,29 @@ class ChatResponse(BaseModel):
     airplane_model: str | None = None
     component_type: str | None = None
     instruction_template_filename: str | None = None
+    template_id: int | None = None
     created_at: datetime
     message_count: int = 0
+    last_activity_at: datetime | None = None
+    last_message_preview: str | None = None
+    template_status: str | None = None  # pending, processing, done or failed; None without template
+    current_step_id: int | None = None
+    completed_steps: int = 0
+    total_steps: int = 0
+    progress_percent: int | None = None  # None when the chat has no steps
     
     class Config:
         from_attributes = True
 
+class TemplateStatusResponse(BaseModel):
+    chat_id: int
+    status: str | None = None  # None when the chat has no template
+    error: str | None = None
+    step_count: int = 0
+
 class ChatListResponse(BaseModel):
     chats: list[ChatResponse]
+    next_cursor: str | None = None
 
 class ChatWithMessages(BaseModel):
     id: int
@@ -33,7 +49,13 @@ class ChatWithMessages(BaseModel):
     component_type: str | None
     instruction_template_filename: str | None = None
     created_at: datetime
+    template_status: str | None = None
+    current_step_id: int | None = None
+    completed_steps: int = 0
+    total_steps: int = 0
+    progress_percent: int | None = None
     messages: list["MessageResponse"]
+    older_cursor: str | None = None  # Only set when the chat is fetched one page at a time
     
     class Config:
         from_attributes = True
@@ -1,4 +1,5 @@
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Enum, Boolean
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Enum, Boolean, Index, Column, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 import enum
@@ -8,13 +9,27 @@ class MessageRole(str, enum.Enum):
     USER = "user"
     ASSISTANT = "assistant"
 
+class MessageStatus(str, enum.Enum):
+    PENDING = "pending"  # User message stored, waiting for the AI answer
+    COMPLETED = "completed"  # Answered, part of the conversation sent to the AI
+    FAILED = "failed"  # The AI call failed; kept so the user sees what to retry
+
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Serves "messages of a chat in order" without a sort step
+        Index("ix_messages_chat_id_created_at", "chat_id", "created_at", "id"),
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     chat_id: Mapped[int] = mapped_column(ForeignKey("chats.id"), index=True)
     role: Mapped[MessageRole] = mapped_column(Enum(MessageRole), nullable=False)
     content: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[MessageStatus] = mapped_column(
+        Enum(MessageStatus), default=MessageStatus.COMPLETED, server_default=MessageStatus.COMPLETED.name, nullable=False
+    )
     
     # Image fields
     has_image: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
@@ -25,5 +40,9 @@ class Message(Base):
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
+    # Full-text search (app.search), computed by PostgreSQL on every write; not mapped,
+    # so the ORM never loads it or asks for it back after an INSERT
+    search_vector = Column(TSVECTOR, Computed("to_tsvector('spanish', content)", persisted=True))
+    
     # Relationships
     chat: Mapped["Chat"] = relationship("Chat", back_populates="messages")
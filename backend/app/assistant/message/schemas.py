@@ -10,9 +10,17 @@ class MessageResponse(BaseModel):
     chat_id: int
     role: str
     content: str
+    status: str = "completed"
     has_image: bool = False
     image_url: str | None = None
     image_filename: str | None = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+class MessagePage(BaseModel):
+    """A page of messages in chronological order"""
+    messages: list[MessageResponse]
+    older_cursor: str | None = None  # Pass as `before` to load older messages, None at the start of the chat
+    newer_cursor: str | None = None  # Pass as `after` to load messages sent after this page
+    has_newer: bool = False
@@ -0,0 +1,31 @@
+"""
+PDF text extraction workers
+Runs inside the process pool (app.core.process_pool), so this module only
+imports PyPDF2 to keep spawned workers light.
+"""
+import time
+import PyPDF2
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """Number of pages of a PDF"""
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def read_pdf_page_range(pdf_path: str, start: int, stop: int, deadline: float) -> tuple[int, list[str]]:
+    """
+    Extract the text of pages [start, stop), along with the page count of the
+    whole PDF (so the first batch also sizes the document). Stops early once
+    the wall-clock deadline (time.time()) has passed; the caller treats a short
+    batch as a timeout.
+    """
+    texts = []
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        page_count = len(pdf_reader.pages)
+        for page in pdf_reader.pages[start:stop]:
+            if time.time() > deadline:
+                break
+            texts.append(page.extract_text() or "")
+    return page_count, texts
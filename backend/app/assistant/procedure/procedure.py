@@ -0,0 +1,66 @@
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Text, Boolean, Enum, Index, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from datetime import datetime
+from app.core.database import Base
+from app.assistant.chat.chat import TemplateStatus
+
+class ProcedureTemplate(Base):
+    """
+    A maintenance procedure uploaded once to the shared library. Its steps are
+    extracted once and copied into every chat started from it. Uploading a new
+    revision creates a new row with the next version; older versions stay
+    available to the chats that use them.
+    """
+    __tablename__ = "procedure_templates"
+    __table_args__ = (
+        UniqueConstraint("name", "version", name="uq_procedure_templates_name_version"),
+        # Library listing: latest active versions, newest first
+        Index("ix_procedure_templates_latest_created_at_id", "is_latest", "is_active", "created_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(String(200), nullable=False)
+    description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    airplane_model: Mapped[str | None] = mapped_column(String, nullable=True)
+    component_type: Mapped[str | None] = mapped_column(String, nullable=True)
+    division: Mapped[str | None] = mapped_column(String, nullable=True)
+    
+    # Versioning
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
+    previous_version_id: Mapped[int | None] = mapped_column(ForeignKey("procedure_templates.id", ondelete="SET NULL"), nullable=True)
+    is_latest: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+    
+    # Source document and step extraction
+    file_path: Mapped[str] = mapped_column(String, nullable=False)
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    status: Mapped[TemplateStatus] = mapped_column(Enum(TemplateStatus), default=TemplateStatus.PENDING, nullable=False)
+    error: Mapped[str | None] = mapped_column(String(500), nullable=True)
+    status_updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Last status change
+    step_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    
+    created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    steps: Mapped[list["ProcedureTemplateStep"]] = relationship(
+        "ProcedureTemplateStep", back_populates="template", cascade="all, delete-orphan",
+        order_by="ProcedureTemplateStep.step_number"
+    )
+
+class ProcedureTemplateStep(Base):
+    __tablename__ = "procedure_template_steps"
+    __table_args__ = (
+        # Copying a procedure into a chat reads the steps in order
+        Index("ix_procedure_template_steps_template_id_step_number", "template_id", "step_number"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    template_id: Mapped[int] = mapped_column(ForeignKey("procedure_templates.id", ondelete="CASCADE"), nullable=False)
+    step_number: Mapped[int] = mapped_column(Integer, nullable=False)
+    title: Mapped[str] = mapped_column(String(500), nullable=False)
+    description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    
+    # Relationships
+    template: Mapped["ProcedureTemplate"] = relationship("ProcedureTemplate", back_populates="steps")
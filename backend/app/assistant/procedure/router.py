@@ -0,0 +1,299 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response, BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+from sqlalchemy.exc import IntegrityError
+from app.core.database import get_db
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, split_page
+from app.auth.dependencies import get_current_user, require_oficinista_or_admin
+from app.user.user import User
+from app.user.schemas import UserRole
+from app.assistant.chat.chat import TemplateStatus
+from app.assistant.procedure.procedure import ProcedureTemplate, ProcedureTemplateStep
+from app.assistant.procedure.schemas import (
+    ProcedureTemplateUpdate, ProcedureTemplateResponse, ProcedureTemplateListResponse,
+    ProcedureTemplateStepResponse
+)
+from app.assistant.procedure.service import store_template_steps
+from app.assistant.template_cache.service import get_cached_steps
+from app.assistant.template_jobs import process_procedure_template, expire_stale_template, retry_template
+
+router = APIRouter(prefix="/procedure-templates", tags=["procedure-templates"])
+
+async def _get_template(db: AsyncSession, template_id: int) -> ProcedureTemplate:
+    result = await db.execute(select(ProcedureTemplate).where(ProcedureTemplate.id == template_id))
+    template = result.scalars().first()
+
+    if not template:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Procedure template not found"
+        )
+    return template
+
+async def _get_managed_template(db: AsyncSession, template_id: int, current_user: User) -> ProcedureTemplate:
+    """A procedure template the user may change: any for admins, otherwise one of their division"""
+    template = await _get_template(db, template_id)
+
+    if current_user.role != UserRole.ADMINISTRADOR.value and template.division != current_user.division:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only manage procedures of your division"
+        )
+    return template
+
+async def _store_template(
+    db: AsyncSession,
+    background_tasks: BackgroundTasks,
+    current_user: User,
+    file: UploadFile,
+    template: ProcedureTemplate
+) -> ProcedureTemplate:
+    """Save the document of a new template (or version) and get its steps from the cache or a background job"""
+    from app.core.storage import storage_service
+
+    file_info = await storage_service.save_instruction_template(user_id=current_user.id, file=file)
+    cached_steps = await get_cached_steps(db, file_info["sha256"])
+
+    template.file_path = file_info["path"]
+    template.filename = file_info["filename"]
+    template.sha256 = file_info["sha256"]
+    template.status = TemplateStatus.PENDING if cached_steps is None else TemplateStatus.DONE
+    template.created_by = current_user.id
+    db.add(template)
+
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This version of the procedure already exists"
+        )
+
+    if cached_steps:
+        template.step_count = await store_template_steps(db, template.id, cached_steps)
+    await db.commit()
+    await db.refresh(template)
+
+    if template.status == TemplateStatus.PENDING:
+        background_tasks.add_task(
+            process_procedure_template, template.id, template.file_path, template.sha256, template.filename
+        )
+    return template
+
+@router.post("/", response_model=ProcedureTemplateResponse, status_code=status.HTTP_201_CREATED)
+async def create_procedure_template(
+    background_tasks: BackgroundTasks,
+    current_user: Annotated[User, Depends(require_oficinista_or_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    name: str = Form(..., min_length=1, max_length=200),
+    description: str | None = Form(None),
+    airplane_model: str | None = Form(None, max_length=100),
+    component_type: str | None = Form(None, max_length=100),
+    file: UploadFile = File(...)
+):
+    """
+    Upload a procedure to the template library (oficinista or admin).
+    Steps are extracted once, in the background; follow `status` until it is `done`.
+    """
+    result = await db.execute(
+        select(
+            func.max(ProcedureTemplate.version),
+            func.bool_or(ProcedureTemplate.is_active)
+        ).where(ProcedureTemplate.name == name)
+    )
+    last_version, active = result.one()
+    if active:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A procedure with this name already exists; upload a new version instead"
+        )
+
+    template = ProcedureTemplate(
+        name=name,
+        description=description,
+        airplane_model=airplane_model,
+        component_type=component_type,
+        division=current_user.division,
+        # A removed procedure's name can be reused; its versions stay numbered
+        version=(last_version or 0) + 1
+    )
+    return await _store_template(db, background_tasks, current_user, file, template)
+
+@router.post("/{template_id}/versions", response_model=ProcedureTemplateResponse, status_code=status.HTTP_201_CREATED)
+async def create_procedure_template_version(
+    template_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: Annotated[User, Depends(require_oficinista_or_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    description: str | None = Form(None),
+    file: UploadFile = File(...)
+):
+    """
+    Upload a new revision of a procedure (oficinista or admin).
+    Chats started from older versions keep their steps.
+    """
+    previous = await _get_managed_template(db, template_id, current_user)
+
+    if not previous.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Procedure template not found"
+        )
+    if not previous.is_latest:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Only the latest version of a procedure can be revised"
+        )
+
+    template = ProcedureTemplate(
+        name=previous.name,
+        description=description if description is not None else previous.description,
+        airplane_model=previous.airplane_model,
+        component_type=previous.component_type,
+        division=previous.division,
+        version=previous.version + 1,
+        previous_version_id=previous.id
+    )
+    # Committed together with the new version
+    previous.is_latest = False
+    return await _store_template(db, background_tasks, current_user, file, template)
+
+@router.get("/", response_model=ProcedureTemplateListResponse)
+async def list_procedure_templates(
+    response: Response,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)],
+    airplane_model: str | None = None,
+    component_type: str | None = None,
+    division: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """List the latest version of every active procedure, newest first"""
+    query = select(ProcedureTemplate).where(
+        ProcedureTemplate.is_latest == True,
+        ProcedureTemplate.is_active == True
+    )
+    if airplane_model:
+        query = query.where(ProcedureTemplate.airplane_model == airplane_model)
+    if component_type:
+        query = query.where(ProcedureTemplate.component_type == component_type)
+    if division:
+        query = query.where(ProcedureTemplate.division == division)
+
+    result = await db.execute(
+        keyset_page(query, ProcedureTemplate.created_at, ProcedureTemplate.id, cursor, limit)
+    )
+    templates, next_cursor = split_page(list(result.scalars().all()), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return ProcedureTemplateListResponse(
+        templates=[ProcedureTemplateResponse.model_validate(template) for template in templates],
+        next_cursor=next_cursor
+    )
+
+@router.get("/{template_id}", response_model=ProcedureTemplateResponse)
+async def get_procedure_template(
+    template_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """
+    Get a procedure template, any version. An extraction that stopped without
+    finishing is reported as `failed`; retry it with POST /procedure-templates/{template_id}/retry.
+    """
+    await expire_stale_template(db, ProcedureTemplate, template_id)
+    await db.commit()
+    return await _get_template(db, template_id)
+
+@router.post("/{template_id}/retry", response_model=ProcedureTemplateResponse, status_code=status.HTTP_202_ACCEPTED)
+async def retry_procedure_template(
+    template_id: int,
+    background_tasks: BackgroundTasks,
+    current_user: Annotated[User, Depends(require_oficinista_or_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Extract the steps of a procedure again after a failed extraction (oficinista or admin)"""
+    template = await _get_managed_template(db, template_id, current_user)
+
+    if not await retry_template(db, ProcedureTemplate, template_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Only a failed extraction can be retried"
+        )
+    await db.commit()
+    await db.refresh(template)
+
+    background_tasks.add_task(
+        process_procedure_template, template.id, template.file_path, template.sha256, template.filename
+    )
+    return template
+
+@router.get("/{template_id}/steps", response_model=list[ProcedureTemplateStepResponse])
+async def list_procedure_template_steps(
+    template_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Get the extracted steps of a procedure template"""
+    await _get_template(db, template_id)
+
+    result = await db.execute(
+        select(ProcedureTemplateStep)
+        .where(ProcedureTemplateStep.template_id == template_id)
+        .order_by(ProcedureTemplateStep.step_number)
+    )
+    return result.scalars().all()
+
+@router.patch("/{template_id}", response_model=ProcedureTemplateResponse)
+async def update_procedure_template(
+    template_id: int,
+    template_update: ProcedureTemplateUpdate,
+    current_user: Annotated[User, Depends(require_oficinista_or_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """
+    Update the descriptive fields of a procedure template (oficinista or admin,
+    for procedures of their division). Only admins can change the division.
+    """
+    template = await _get_managed_template(db, template_id, current_user)
+    changes = template_update.model_dump(exclude_unset=True)
+
+    if "division" in changes and current_user.role != UserRole.ADMINISTRADOR.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only administrators can move a procedure to another division"
+        )
+
+    for field, value in changes.items():
+        setattr(template, field, value)
+
+    await db.commit()
+    await db.refresh(template)
+
+    return template
+
+@router.delete("/{template_id}")
+async def delete_procedure_template(
+    template_id: int,
+    current_user: Annotated[User, Depends(require_oficinista_or_admin)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """
+    Remove a procedure from the library (oficinista or admin) - soft delete of
+    every version; chats already started from it keep their steps
+    """
+    template = await _get_managed_template(db, template_id, current_user)
+
+    await db.execute(
+        update(ProcedureTemplate)
+        .where(ProcedureTemplate.name == template.name)
+        .values(is_active=False)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    return {"message": "Procedure template deactivated successfully"}
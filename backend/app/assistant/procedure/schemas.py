@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+class ProcedureTemplateUpdate(BaseModel):
+    description: str | None = None
+    airplane_model: str | None = Field(None, max_length=100)
+    component_type: str | None = Field(None, max_length=100)
+    division: str | None = None  # Administrators only
+
+class ProcedureTemplateResponse(BaseModel):
+    id: int
+    name: str
+    description: str | None = None
+    airplane_model: str | None = None
+    component_type: str | None = None
+    division: str | None = None  # Administrators only
+    version: int
+    previous_version_id: int | None = None
+    is_latest: bool
+    is_active: bool
+    filename: str
+    status: str  # pending, processing, done or failed
+    error: str | None = None
+    step_count: int = 0
+    created_by: int | None = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ProcedureTemplateListResponse(BaseModel):
+    templates: list[ProcedureTemplateResponse]
+    next_cursor: str | None = None
+
+class ProcedureTemplateStepResponse(BaseModel):
+    step_number: int
+    title: str
+    description: str | None = None
+    
+    class Config:
+        from_attributes = True
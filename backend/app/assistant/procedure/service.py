@@ -0,0 +1,32 @@
+"""
+Procedure template library
+Procedures are uploaded and extracted once; chats started from one get a
+copy of its steps with a single INSERT ... SELECT. The caller commits.
+"""
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.assistant.procedure.procedure import ProcedureTemplate, ProcedureTemplateStep
+
+
+async def store_template_steps(db: AsyncSession, template_id: int, steps: list[dict]) -> int:
+    """Write the extracted steps of a procedure and record their count"""
+    if steps:
+        await db.execute(
+            insert(ProcedureTemplateStep.__table__),
+            [
+                {
+                    "template_id": template_id,
+                    "step_number": step["step_number"],
+                    "title": step["title"],
+                    "description": step.get("description"),
+                }
+                for step in steps
+            ]
+        )
+    await db.execute(
+        update(ProcedureTemplate)
+        .where(ProcedureTemplate.id == template_id)
+        .values(step_count=len(steps))
+        .execution_options(synchronize_session=False)
+    )
+    return len(steps)
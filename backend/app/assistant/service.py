@@ -211,7 +211,7 @@ Responde directamente y útilmente a lo que el usuario preguntó."""
             )
             
             # Generate response with image
-            response = vision_model.generate_content(
+            response = await vision_model.generate_content_async(
                 [prompt, img],
                 generation_config=generation_config
             )
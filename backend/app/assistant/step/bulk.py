@@ -0,0 +1,80 @@
+"""
+Bulk step writers
+Procedures extracted from templates can have hundreds of steps, so they are
+written with Core executemany / INSERT ... SELECT statements instead of one
+ORM object per row. Each writer also refreshes the step progress of the
+target chat. The caller commits.
+"""
+from datetime import datetime
+from sqlalchemy import insert, select, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.assistant.step.step import Step
+from app.assistant.step.progress import refresh_step_progress
+from app.assistant.procedure.procedure import ProcedureTemplateStep
+
+
+async def bulk_insert_steps(db: AsyncSession, chat_id: int, steps: list[dict]) -> int:
+    """
+    Insert steps given as dicts with step_number, title and optional description.
+    Rows share one parameter set so they are sent as multi-row INSERT ... VALUES batches.
+    """
+    if not steps:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "chat_id": chat_id,
+            "step_number": step["step_number"],
+            "title": step["title"],
+            "description": step.get("description"),
+            "is_completed": False,
+            "created_at": now,
+        }
+        for step in steps
+    ]
+    await db.execute(insert(Step.__table__), rows)
+    await refresh_step_progress(db, chat_id)
+    return len(rows)
+
+
+async def copy_steps(db: AsyncSession, source_chat_id: int, target_chat_id: int) -> int:
+    """Copy the steps of one chat into another, uncompleted, with a single INSERT ... SELECT"""
+    result = await db.execute(
+        insert(Step.__table__).from_select(
+            ["chat_id", "step_number", "title", "description", "is_completed", "created_at"],
+            select(
+                literal(target_chat_id),
+                Step.step_number,
+                Step.title,
+                Step.description,
+                literal(False),
+                literal(datetime.utcnow())
+            )
+            .where(Step.chat_id == source_chat_id)
+            .order_by(Step.step_number)
+        )
+    )
+    await refresh_step_progress(db, target_chat_id)
+    return result.rowcount
+
+
+async def copy_template_steps(db: AsyncSession, template_id: int, chat_id: int) -> int:
+    """Instantiate the steps of a library procedure in a chat with a single INSERT ... SELECT"""
+    result = await db.execute(
+        insert(Step.__table__).from_select(
+            ["chat_id", "step_number", "title", "description", "is_completed", "created_at"],
+            select(
+                literal(chat_id),
+                ProcedureTemplateStep.step_number,
+                ProcedureTemplateStep.title,
+                ProcedureTemplateStep.description,
+                literal(False),
+                literal(datetime.utcnow())
+            )
+            .where(ProcedureTemplateStep.template_id == template_id)
+            .order_by(ProcedureTemplateStep.step_number)
+        )
+    )
+    await refresh_step_progress(db, chat_id)
+    return result.rowcount
@@ -0,0 +1,44 @@
+"""
+Chat step progress
+Keeps the denormalized current_step_id, completed_steps and total_steps
+columns of Chat in sync with its steps, so reading the current step is a
+primary key lookup. Writers lock the chat row before changing its steps
+(see lock_owned_chat), which makes the recount below see every step
+committed by concurrent writers.
+Every function only issues SQL; the caller commits.
+"""
+from sqlalchemy import update, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.assistant.chat.chat import Chat
+from app.assistant.chat.ownership import first_incomplete_step_id
+from app.assistant.step.step import Step
+
+
+def step_progress_statement(chat_id: int):
+    """UPDATE recounting the steps of a chat, returning the new current step number"""
+    return (
+        update(Chat)
+        .where(Chat.id == chat_id)
+        .values(
+            current_step_id=first_incomplete_step_id(),
+            completed_steps=(
+                select(func.count(Step.id))
+                .where(Step.chat_id == Chat.id, Step.is_completed == True)
+                .scalar_subquery()
+            ),
+            total_steps=select(func.count(Step.id)).where(Step.chat_id == Chat.id).scalar_subquery()
+        )
+        .returning(
+            select(Step.step_number).where(Step.id == Chat.current_step_id).scalar_subquery()
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def refresh_step_progress(db: AsyncSession, chat_id: int) -> int | None:
+    """
+    Recount the steps of a chat and move its current step pointer.
+    Returns the step number of the new current step.
+    """
+    result = await db.execute(step_progress_statement(chat_id))
+    return result.scalar()
@@ -1,13 +1,17 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, func
 from app.core.database import get_db
 from app.auth.dependencies import get_current_user
 from app.user.user import User
 from app.assistant.step.step import Step
-from app.assistant.step.schemas import StepResponse, StepListResponse
+from app.assistant.step.schemas import StepResponse, StepListResponse, StepBatchUpdate, StepBatchResponse
 from app.assistant.chat.chat import Chat
+from app.assistant.chat.ownership import (
+    select_with_owned_chat, unpack_owned_rows, owned_chat_exists, lock_owned_chat, get_owned_chat
+)
+from app.assistant.step.progress import refresh_step_progress
 
 router = APIRouter(prefix="/chats/{chat_id}/steps", tags=["steps"])
 
@@ -18,23 +22,18 @@ async def list_steps(
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     """Get all steps for a chat"""
-    # Verify chat belongs to user
-    result = await db.execute(
-        select(Chat).where(Chat.id == chat_id, Chat.user_id == current_user.id)
-    )
-    chat = result.scalars().first()
-    
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
-    
-    # Get all steps
+    # Ownership check and steps in one query
     result = await db.execute(
         select(Step)
-        .where(Step.chat_id == chat_id)
+        .where(Step.chat_id == chat_id, owned_chat_exists(chat_id, current_user.id))
         .order_by(Step.step_number)
     )
     steps = result.scalars().all()
     
+    if not steps:
+        # Not the user's chat, or a chat without steps
+        await get_owned_chat(db, chat_id, current_user.id)
+    
     # Find current step (first incomplete)
     current_step_number = None
     for step in steps:
@@ -55,98 +54,123 @@ async def get_current_step(
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     """Get the current incomplete step"""
-    # Verify chat belongs to user
+    # Ownership check and the chat's current step pointer in one query
     result = await db.execute(
-        select(Chat).where(Chat.id == chat_id, Chat.user_id == current_user.id)
+        select_with_owned_chat(chat_id, current_user.id, Step, Step.id == Chat.current_step_id)
     )
-    chat = result.scalars().first()
-    
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
+    steps = unpack_owned_rows(result.all())
     
-    # Get first incomplete step
-    result = await db.execute(
-        select(Step)
-        .where(Step.chat_id == chat_id, Step.is_completed == False)
-        .order_by(Step.step_number)
-        .limit(1)
-    )
-    step = result.scalars().first()
-    
-    if not step:
+    if not steps:
         return None
     
-    return StepResponse.model_validate(step)
+    return StepResponse.model_validate(steps[0])
 
-@router.patch("/{step_id}/complete", response_model=StepResponse)
-async def complete_step(
+@router.patch("/batch", response_model=StepBatchResponse)
+async def update_steps_batch(
     chat_id: int,
-    step_id: int,
+    batch: StepBatchUpdate,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
-    """Mark a step as completed"""
+    """
+    Complete or uncomplete several steps at once, given by `step_ids` or by a
+    `from_step`/`to_step` range of step numbers.
+    
+    Ownership check and update run as a single UPDATE ... RETURNING
+    statement; the chat's step progress is refreshed right after it.
+    """
     from datetime import datetime
     
-    # Verify chat belongs to user
-    result = await db.execute(
-        select(Chat).where(Chat.id == chat_id, Chat.user_id == current_user.id)
-    )
-    chat = result.scalars().first()
+    by_range = batch.from_step is not None or batch.to_step is not None
+    if (batch.step_ids is None) == (not by_range):
+        raise HTTPException(status_code=400, detail="Provide either step_ids or a from_step/to_step range")
+    if by_range and (batch.from_step is None or batch.to_step is None or batch.from_step > batch.to_step):
+        raise HTTPException(status_code=400, detail="Invalid step range")
     
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
+    if by_range:
+        selection = Step.step_number.between(batch.from_step, batch.to_step)
+    else:
+        selection = Step.id.in_(set(batch.step_ids))
     
-    # Get step
     result = await db.execute(
-        select(Step).where(Step.id == step_id, Step.chat_id == chat_id)
+        update(Step)
+        .where(
+            Step.chat_id == chat_id,
+            selection,
+            # Only steps of a chat owned by the user
+            lock_owned_chat(chat_id, current_user.id)
+        )
+        .values(
+            is_completed=batch.completed,
+            # Steps that were already completed keep their completion time
+            completed_at=func.coalesce(Step.completed_at, datetime.utcnow()) if batch.completed else None
+        )
+        .returning(*Step.__table__.c)
+        .execution_options(synchronize_session=False)
     )
-    step = result.scalars().first()
-    
-    if not step:
+    rows = sorted(result.mappings().all(), key=lambda row: row["step_number"])
+    
+    if not rows or (not by_range and len(rows) != len(set(batch.step_ids))):
+        # Tell a missing chat apart from missing steps, then undo any partial update
+        try:
+            await get_owned_chat(db, chat_id, current_user.id)
+        finally:
+            await db.rollback()
         raise HTTPException(status_code=404, detail="Step not found")
     
-    # Mark as completed
-    step.is_completed = True
-    step.completed_at = datetime.utcnow()
-    
+    current_step_number = await refresh_step_progress(db, chat_id)
     await db.commit()
-    await db.refresh(step)
     
-    return StepResponse.model_validate(step)
+    return StepBatchResponse(
+        steps=[StepResponse.model_validate(dict(row)) for row in rows],
+        updated=len(rows),
+        current_step_number=current_step_number
+    )
 
-@router.patch("/{step_id}/uncomplete", response_model=StepResponse)
-async def uncomplete_step(
+async def _set_step_completed(
+    db: AsyncSession,
     chat_id: int,
     step_id: int,
-    current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
-):
-    """Mark a step as incomplete (go back to previous step)"""
-    # Verify chat belongs to user
-    result = await db.execute(
-        select(Chat).where(Chat.id == chat_id, Chat.user_id == current_user.id)
-    )
-    chat = result.scalars().first()
-    
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
+    user_id: int,
+    completed: bool
+) -> StepResponse:
+    """Update a single step of a chat owned by the user in one UPDATE ... RETURNING, then its progress"""
+    from datetime import datetime
     
-    # Get step
     result = await db.execute(
-        select(Step).where(Step.id == step_id, Step.chat_id == chat_id)
+        update(Step)
+        .where(Step.id == step_id, Step.chat_id == chat_id, lock_owned_chat(chat_id, user_id))
+        .values(is_completed=completed, completed_at=datetime.utcnow() if completed else None)
+        .returning(*Step.__table__.c)
+        .execution_options(synchronize_session=False)
     )
-    step = result.scalars().first()
+    row = result.mappings().first()
     
-    if not step:
+    if not row:
+        await get_owned_chat(db, chat_id, user_id)
         raise HTTPException(status_code=404, detail="Step not found")
     
-    # Mark as incomplete
-    step.is_completed = False
-    step.completed_at = None
-    
+    await refresh_step_progress(db, chat_id)
     await db.commit()
-    await db.refresh(step)
     
-    return StepResponse.model_validate(step)
+    return StepResponse.model_validate(dict(row))
 
+@router.patch("/{step_id}/complete", response_model=StepResponse)
+async def complete_step(
+    chat_id: int,
+    step_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Mark a step as completed"""
+    return await _set_step_completed(db, chat_id, step_id, current_user.id, completed=True)
+
+@router.patch("/{step_id}/uncomplete", response_model=StepResponse)
+async def uncomplete_step(
+    chat_id: int,
+    step_id: int,
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+):
+    """Mark a step as incomplete (go back to previous step)"""
+    return await _set_step_completed(db, chat_id, step_id, current_user.id, completed=False)
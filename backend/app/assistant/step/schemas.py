@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 class StepBase(BaseModel):
@@ -23,3 +23,15 @@ class StepListResponse(BaseModel):
     steps: list[StepResponse]
     total: int
     current_step_number: int | None = None
+
+class StepBatchUpdate(BaseModel):
+    """Select steps either by id or by an inclusive range of step numbers"""
+    completed: bool
+    step_ids: list[int] | None = Field(None, min_length=1, max_length=1000)
+    from_step: int | None = Field(None, ge=1)
+    to_step: int | None = Field(None, ge=1)
+
+class StepBatchResponse(BaseModel):
+    steps: list[StepResponse]  # Updated steps, in order
+    updated: int
+    current_step_number: int | None = None
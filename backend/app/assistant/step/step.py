@@ -1,10 +1,16 @@
-from sqlalchemy import Integer, ForeignKey, String, Boolean, DateTime, Text
+from sqlalchemy import Integer, ForeignKey, String, Boolean, DateTime, Text, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from app.core.database import Base
 
 class Step(Base):
     __tablename__ = "steps"
+    __table_args__ = (
+        # Created with the table (a1b2c3d4e5f6); its index returns the steps of a chat in order
+        UniqueConstraint("chat_id", "step_number", name="uq_chat_step_number"),
+        # Serves the "first incomplete step of a chat" lookup
+        Index("ix_steps_chat_id_is_completed_step_number", "chat_id", "is_completed", "step_number"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     chat_id: Mapped[int] = mapped_column(ForeignKey("chats.id", ondelete="CASCADE"), index=True)
@@ -16,4 +22,4 @@ class Step(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    chat: Mapped["Chat"] = relationship("Chat", back_populates="steps")
+    chat: Mapped["Chat"] = relationship("Chat", back_populates="steps", foreign_keys=[chat_id])
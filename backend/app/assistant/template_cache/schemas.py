@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+class TemplateCacheEntryResponse(BaseModel):
+    id: int
+    sha256: str
+    extractor_version: int
+    original_filename: str | None = None
+    step_count: int
+    hit_count: int
+    miss_count: int
+    created_at: datetime
+    last_hit_at: datetime | None = None
+    
+    class Config:
+        from_attributes = True
+
+class TemplateCacheListResponse(BaseModel):
+    entries: list[TemplateCacheEntryResponse]
+    next_cursor: str | None = None
+
+class TemplateCacheStats(BaseModel):
+    entries: int
+    stale_entries: int  # Built by an older extractor version, never hit again
+    extractor_version: int
+    hits: int
+    misses: int
+    hit_rate: float | None = None  # hits / (hits + misses); None before any upload
@@ -0,0 +1,88 @@
+"""
+Template step cache
+Steps extracted from a template are stored under the SHA-256 of the PDF and
+the extractor version, so uploading the same document again reuses them
+instead of parsing the PDF and calling the AI. Bumping EXTRACTOR_VERSION
+makes every existing entry stale. The caller commits.
+"""
+from datetime import datetime
+from sqlalchemy import select, update, delete, func, case
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.assistant.template_cache.template_cache import TemplateStepCache
+from app.assistant.template_processor import EXTRACTOR_VERSION
+
+
+async def get_cached_steps(db: AsyncSession, sha256: str) -> list[dict] | None:
+    """Return the cached steps of a template and count the hit, or None on a miss"""
+    result = await db.execute(
+        update(TemplateStepCache)
+        .where(
+            TemplateStepCache.sha256 == sha256,
+            TemplateStepCache.extractor_version == EXTRACTOR_VERSION
+        )
+        .values(
+            hit_count=TemplateStepCache.hit_count + 1,
+            last_hit_at=datetime.utcnow()
+        )
+        .returning(TemplateStepCache.steps)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none()
+
+
+async def store_steps(db: AsyncSession, sha256: str, filename: str | None, steps: list[dict]) -> None:
+    """
+    Cache freshly extracted steps. If the same template was extracted
+    concurrently, the first entry is kept and this extraction counts as a miss.
+    """
+    statement = insert(TemplateStepCache).values(
+        sha256=sha256,
+        extractor_version=EXTRACTOR_VERSION,
+        original_filename=filename,
+        steps=steps,
+        step_count=len(steps),
+        hit_count=0,
+        miss_count=1,
+        created_at=datetime.utcnow()
+    )
+    await db.execute(
+        statement.on_conflict_do_update(
+            constraint="uq_template_step_cache_sha256_version",
+            set_={"miss_count": TemplateStepCache.miss_count + 1}
+        )
+    )
+
+
+async def invalidate(db: AsyncSession, entry_id: int | None = None, sha256: str | None = None, stale_only: bool = False) -> int:
+    """Delete cache entries matching the filters; without filters the whole cache is cleared"""
+    statement = delete(TemplateStepCache)
+    if entry_id is not None:
+        statement = statement.where(TemplateStepCache.id == entry_id)
+    if sha256:
+        statement = statement.where(TemplateStepCache.sha256 == sha256)
+    if stale_only:
+        statement = statement.where(TemplateStepCache.extractor_version != EXTRACTOR_VERSION)
+    result = await db.execute(statement)
+    return result.rowcount
+
+
+async def cache_stats(db: AsyncSession) -> dict:
+    """Entry counts and hit rate of the cache, aggregated in one query"""
+    result = await db.execute(
+        select(
+            func.count(TemplateStepCache.id),
+            func.count(case((TemplateStepCache.extractor_version != EXTRACTOR_VERSION, 1))),
+            func.coalesce(func.sum(TemplateStepCache.hit_count), 0),
+            func.coalesce(func.sum(TemplateStepCache.miss_count), 0)
+        )
+    )
+    entries, stale_entries, hits, misses = result.one()
+    return {
+        "entries": entries,
+        "stale_entries": stale_entries,
+        "extractor_version": EXTRACTOR_VERSION,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None
+    }
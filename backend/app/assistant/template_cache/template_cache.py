@@ -0,0 +1,25 @@
+from sqlalchemy import String, Integer, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from app.core.database import Base
+
+class TemplateStepCache(Base):
+    """Steps extracted from a template PDF, keyed by its content hash and the extractor version"""
+    __tablename__ = "template_step_cache"
+    __table_args__ = (
+        UniqueConstraint("sha256", "extractor_version", name="uq_template_step_cache_sha256_version"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    extractor_version: Mapped[int] = mapped_column(Integer, nullable=False)
+    original_filename: Mapped[str | None] = mapped_column(String, nullable=True)
+    steps: Mapped[list] = mapped_column(JSONB, nullable=False)  # [{"step_number", "title", "description"}]
+    step_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    
+    # Usage: hits reuse the entry, misses ran the extractor for this template
+    hit_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    miss_count: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_hit_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,130 @@
+"""
+Template extraction jobs
+Extracting steps from an uploaded template (PDF parsing plus an AI call) runs
+after the upload request has responded, for chat templates and for procedures
+of the template library alike. The job opens its own session, records its
+progress in the owner's status column and stores the result in the template
+cache.
+"""
+import asyncio
+from datetime import timedelta
+from typing import Awaitable, Callable
+from sqlalchemy import update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.assistant.chat.chat import Chat, TemplateStatus
+from app.assistant.procedure.procedure import ProcedureTemplate
+from app.assistant.procedure.service import store_template_steps
+from app.assistant.step.bulk import bulk_insert_steps
+from app.assistant.template_processor import extract_steps_from_pdf
+from app.assistant.template_cache.service import get_cached_steps, store_steps
+
+ERROR_LENGTH = 500
+TIMEOUT_ERROR = "Extraction did not finish in time"
+
+ACTIVE_TEMPLATE_STATUSES = (TemplateStatus.PENDING, TemplateStatus.PROCESSING)
+
+# (status, error, last status change) columns of every model that owns a template
+STATUS_COLUMNS = {
+    Chat: ("template_status", "template_error", "template_updated_at"),
+    ProcedureTemplate: ("status", "error", "status_updated_at"),
+}
+
+
+async def _set_status(db, model, row_id: int, expected: TemplateStatus, new: TemplateStatus, error: str | None = None) -> bool:
+    """Move a row from one template status to another; False if it was not in the expected status"""
+    status_column, error_column, updated_column = STATUS_COLUMNS[model]
+    result = await db.execute(
+        update(model)
+        .where(model.id == row_id, getattr(model, status_column) == expected)
+        .values({status_column: new, error_column: error, updated_column: func.now()})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def expire_stale_template(db: AsyncSession, model, row_id: int) -> None:
+    """
+    Mark an extraction as failed when its worker died (or was restarted) before
+    finishing, so it can be retried. The caller commits.
+    """
+    status_column, error_column, updated_column = STATUS_COLUMNS[model]
+    await db.execute(
+        update(model)
+        .where(
+            model.id == row_id,
+            getattr(model, status_column).in_(ACTIVE_TEMPLATE_STATUSES),
+            getattr(model, updated_column) < func.now() - timedelta(seconds=2 * settings.TEMPLATE_JOB_TIMEOUT)
+        )
+        .values({status_column: TemplateStatus.FAILED, error_column: TIMEOUT_ERROR})
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def retry_template(db: AsyncSession, model, row_id: int) -> bool:
+    """
+    Queue a failed (or stale) extraction again; False if the row is not failed.
+    The caller commits, then runs the job.
+    """
+    await expire_stale_template(db, model, row_id)
+    return await _set_status(db, model, row_id, TemplateStatus.FAILED, TemplateStatus.PENDING)
+
+
+async def _fail(db: AsyncSession, model, row_id: int, error: str) -> None:
+    await _set_status(db, model, row_id, TemplateStatus.PROCESSING, TemplateStatus.FAILED, error=error)
+    await db.commit()
+
+
+async def _run_extraction(
+    model,
+    row_id: int,
+    template_path: str,
+    sha256: str,
+    filename: str | None,
+    save_steps: Callable[[AsyncSession, int, list[dict]], Awaitable[int]]
+) -> None:
+    async with AsyncSessionLocal() as db:
+        # Claim the job so it cannot run twice
+        claimed = await _set_status(db, model, row_id, TemplateStatus.PENDING, TemplateStatus.PROCESSING)
+        await db.commit()
+        if not claimed:
+            return
+
+        # An identical upload may have been extracted since this one was stored
+        steps_data = await get_cached_steps(db, sha256)
+        if steps_data is None:
+            try:
+                steps_data = await asyncio.wait_for(
+                    extract_steps_from_pdf(template_path),
+                    timeout=settings.TEMPLATE_JOB_TIMEOUT
+                )
+            except (Exception, asyncio.CancelledError) as e:
+                # A cancelled job (worker shutdown) is not an Exception, and would
+                # otherwise stay processing until it expires as stale
+                if isinstance(e, TimeoutError):
+                    error = TIMEOUT_ERROR
+                else:
+                    error = str(e)[:ERROR_LENGTH] or type(e).__name__
+                print(f"Error extracting steps for {model.__tablename__} {row_id}: {error}")
+                await asyncio.shield(_fail(db, model, row_id, error))
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                return
+            await store_steps(db, sha256, filename, steps_data)
+
+        # Steps and the final status are committed together; the status update
+        # locks the row, and matches nothing if it was deleted meanwhile
+        if await _set_status(db, model, row_id, TemplateStatus.PROCESSING, TemplateStatus.DONE):
+            await save_steps(db, row_id, steps_data)
+        await db.commit()
+
+
+async def process_template(chat_id: int, template_path: str, sha256: str, filename: str | None = None) -> None:
+    """Extract the steps of a chat's own template into the chat"""
+    await _run_extraction(Chat, chat_id, template_path, sha256, filename, bulk_insert_steps)
+
+
+async def process_procedure_template(template_id: int, template_path: str, sha256: str, filename: str | None = None) -> None:
+    """Extract the steps of a library procedure, once for every chat that will use it"""
+    await _run_extraction(ProcedureTemplate, template_id, template_path, sha256, filename, store_template_steps)
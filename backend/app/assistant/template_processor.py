@@ -1,56 +1,59 @@
 """
 PDF Template Processor
-Extracts maintenance steps from PDF instruction templates using Gemini AI
+Extracts maintenance steps from PDF instruction templates using Gemini AI.
+
+Long manuals are processed map-reduce style: page texts are streamed from
+the process pool into overlapping chunks, steps are extracted from every chunk
+as soon as it is complete, and the partial lists are merged, dropping steps
+repeated across chunk boundaries.
 """
-import PyPDF2
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import deque
 from pathlib import Path
+from typing import AsyncIterator, Optional
 from app.core.config import settings
+from app.core.process_pool import run_in_process, pool_size
+from app.assistant.pdf_text import read_pdf_page_range
 import google.generativeai as genai
 
+logger = logging.getLogger(__name__)
+
 # Configure Gemini
 genai.configure(api_key=settings.GOOGLE_API_KEY)
 
-async def extract_steps_from_pdf(pdf_path: str) -> list[dict]:
-    """
-    Extract structured maintenance steps from a PDF template
-    
-    Args:
-        pdf_path: Path to the PDF file
-        
-    Returns:
-        List of steps with structure: [{"step_number": 1, "title": "...", "description": "..."}]
-    """
-    # Read PDF content
-    pdf_file_path = Path(pdf_path)
-    if not pdf_file_path.exists():
-        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-    
-    # Extract text from PDF
-    text_content = ""
-    with open(pdf_file_path, 'rb') as file:
-        pdf_reader = PyPDF2.PdfReader(file)
-        for page in pdf_reader.pages:
-            text_content += page.extract_text() + "\n"
-    
-    if not text_content.strip():
-        raise ValueError("No text content found in PDF")
-    
-    # Use Gemini to extract structured steps
-    model = genai.GenerativeModel(settings.GEMINI_MODEL)
-    
-    prompt = f"""Analiza el siguiente documento de instrucciones de mantenimiento aeronáutico y extrae los pasos en formato estructurado.
+# Bump whenever the extraction logic or prompt changes, so cached steps are re-extracted
+EXTRACTOR_VERSION = 3
+
+# Chunk sizes are budgeted in tokens, estimated from characters
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = 3000
+CHUNK_OVERLAP_TOKENS = 300
+
+# Pages of the first process pool task, read before the rest is split among the pool
+PAGE_BATCH = 16
+
+# Process-wide limit on concurrent extraction calls
+_llm_slots = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+EXTRACTION_PROMPT = """Analiza el siguiente fragmento (parte {part}) de un documento de instrucciones de mantenimiento aeronáutico y extrae los pasos en formato estructurado.
 
 DOCUMENTO:
-{text_content[:8000]}  # Limit to avoid token limits
+{text}
 
 INSTRUCCIONES:
-1. Identifica todos los pasos del procedimiento de mantenimiento
+1. Identifica todos los pasos del procedimiento de mantenimiento que aparecen en este fragmento
 2. Para cada paso, extrae:
    - Número del paso
    - Título/resumen breve del paso (máximo 100 caracteres)
    - Descripción detallada del paso
+3. Los fragmentos se solapan ligeramente: incluye también los pasos que estén cortados al principio o al final
+4. Si el fragmento no contiene pasos, devuelve una lista vacía
 
-3. Devuelve SOLO un JSON válido con este formato exacto:
+5. Devuelve SOLO un JSON válido con este formato exacto:
 {{
   "steps": [
     {{
@@ -68,54 +71,264 @@ INSTRUCCIONES:
 
 IMPORTANTE: Devuelve SOLO el JSON, sin texto adicional antes o después."""
 
+async def stream_pdf_pages(pdf_path: str) -> AsyncIterator[str]:
+    """
+    Yield the text of every page in order. The first PAGE_BATCH pages are read
+    on their own, so downstream work starts early; the rest is split into one
+    range per pool process, since every task parses the whole PDF again.
+    
+    Raises ValueError when the PDF exceeds TEMPLATE_MAX_PAGES or it cannot be
+    parsed and its text extracted within TEMPLATE_EXTRACTION_TIMEOUT seconds.
+    """
+    # The deadline covers parsing the PDF too; the first batch reads the page count
+    deadline = time.time() + settings.TEMPLATE_EXTRACTION_TIMEOUT
+    timed_out = f"PDF text extraction exceeded {settings.TEMPLATE_EXTRACTION_TIMEOUT} seconds"
+    
+    async def read_batch(start: int, stop: int) -> tuple[int, list[str]]:
+        try:
+            return await asyncio.wait_for(
+                run_in_process(read_pdf_page_range, pdf_path, start, stop, deadline),
+                timeout=max(deadline - time.time(), 0) + 1
+            )
+        except asyncio.TimeoutError:
+            raise ValueError(timed_out)
+    
+    page_count, first_texts = await read_batch(0, PAGE_BATCH)
+    if page_count > settings.TEMPLATE_MAX_PAGES:
+        raise ValueError(f"PDF has {page_count} pages; the maximum is {settings.TEMPLATE_MAX_PAGES}")
+    
+    batch = max(PAGE_BATCH, -(-(page_count - PAGE_BATCH) // pool_size()))
+    in_flight: deque = deque(
+        (min(start + batch, page_count) - start, asyncio.ensure_future(read_batch(start, start + batch)))
+        for start in range(PAGE_BATCH, page_count, batch)
+    )
+    
     try:
-        response = model.generate_content(
-            prompt,
+        # Workers stop early once the deadline has passed
+        if len(first_texts) < min(PAGE_BATCH, page_count):
+            raise ValueError(timed_out)
+        for text in first_texts:
+            yield text
+        
+        while in_flight:
+            expected, future = in_flight.popleft()
+            _, texts = await future
+            if len(texts) < expected:
+                raise ValueError(timed_out)
+            for text in texts:
+                yield text
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+
+class TextChunker:
+    """
+    Incrementally splits page texts into chunks of at most chunk_tokens,
+    cutting at line boundaries. Each chunk starts with the last overlap_tokens
+    of the previous one, so a step cut by a boundary appears whole in at least
+    one chunk.
+    """
+    
+    def __init__(self, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        self.max_chars = chunk_tokens * CHARS_PER_TOKEN
+        self.overlap_chars = overlap_tokens * CHARS_PER_TOKEN
+        self.lines: list[str] = []
+        self.size = 0
+    
+    def add_page(self, text: str) -> list[str]:
+        """Add the text of the next page; returns the chunks it completed"""
+        line_limit = self.max_chars - self.overlap_chars
+        chunks = []
+        for line in text.splitlines():
+            line = line.strip()
+            # Hard-split lines that would not fit in a chunk on their own
+            while len(line) > line_limit:
+                chunks.extend(self._add_line(line[:line_limit]))
+                line = line[line_limit:]
+            if line:
+                chunks.extend(self._add_line(line))
+        return chunks
+    
+    def finish(self) -> list[str]:
+        """Flush the last, partial chunk"""
+        if not self.lines:
+            return []
+        chunk = "\n".join(self.lines)
+        self.lines, self.size = [], 0
+        return [chunk]
+    
+    def _add_line(self, line: str) -> list[str]:
+        chunks = []
+        if self.lines and self.size + len(line) + 1 > self.max_chars:
+            chunks.append("\n".join(self.lines))
+            # Carry the tail of this chunk over as overlap
+            tail: list[str] = []
+            tail_size = 0
+            for previous in reversed(self.lines):
+                if tail_size + len(previous) + 1 > self.overlap_chars:
+                    break
+                tail.insert(0, previous)
+                tail_size += len(previous) + 1
+            self.lines, self.size = tail, tail_size
+        self.lines.append(line)
+        self.size += len(line) + 1
+        return chunks
+
+def split_into_chunks(pages: list[str], **chunk_sizes) -> list[str]:
+    """Split a whole document at once (see TextChunker)"""
+    chunker = TextChunker(**chunk_sizes)
+    chunks = []
+    for page in pages:
+        chunks.extend(chunker.add_page(page))
+    chunks.extend(chunker.finish())
+    return chunks
+
+def _parse_steps(response_text: str) -> list[dict]:
+    """Parse the JSON step list returned by the model, skipping steps without title"""
+    response_text = response_text.strip()
+    
+    # Remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.startswith("```"):
+        response_text = response_text[3:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    response_text = response_text.strip()
+    
+    try:
+        result = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not parse steps from AI response: {e}")
+    if not isinstance(result, dict):
+        raise ValueError("Could not parse steps from AI response: not a JSON object")
+    
+    return [
+        {"title": step["title"], "description": step.get("description")}
+        for step in result.get("steps", [])
+        if step.get("title")
+    ]
+
+async def _extract_chunk(model, text: str, part: int) -> Optional[list[dict]]:
+    """
+    Extract the steps of one chunk, waiting for a free LLM slot. Returns None
+    when the response cannot be parsed, so the other chunks are still used.
+    """
+    async with _llm_slots:
+        response = await model.generate_content_async(
+            EXTRACTION_PROMPT.format(part=part, text=text),
             generation_config=genai.GenerationConfig(
                 temperature=0.1,
                 max_output_tokens=4096,
             )
         )
+    try:
+        return _parse_steps(response.text)
+    except ValueError as e:
+        logger.warning("Chunk %d of the template: %s; response: %.500s", part, e, response.text)
+        return None
+
+def _step_key(step: dict) -> str:
+    """Title normalised for duplicate detection ("3. Retirar panel" == "retirar  panel")"""
+    title = re.sub(r"^\s*(paso\s*)?[\w]{0,3}[.)\-:]\s+", "", step["title"].casefold())
+    return " ".join(title.split())
+
+def _boundary_overlap(previous_keys: list[str], keys: list[str]) -> tuple[int, int]:
+    """
+    Find the longest run of trailing steps of the previous chunk that the
+    current chunk repeats at its start. The current chunk may begin with one
+    extra step cut by the boundary. Returns (skip, length): the first `skip`
+    steps of the current chunk are duplicates, the last `length` of them
+    matching the last `length` steps of the previous chunk.
+    """
+    for length in range(min(len(previous_keys), len(keys)), 0, -1):
+        for offset in (0, 1):
+            if keys[offset:offset + length] == previous_keys[-length:]:
+                return offset + length, length
+    return 0, 0
+
+def merge_chunk_steps(chunk_steps: list[list[dict]]) -> list[dict]:
+    """
+    Concatenate per-chunk steps in document order, dropping the steps repeated
+    in the overlap between consecutive chunks (keeping the more complete
+    description). Steps are then renumbered sequentially, since the PDF may
+    number them 1, 1, 1 or 1.A, 1.B, etc.
+    """
+    merged: list[dict] = []
+    previous_keys: list[str] = []
+    
+    for steps in chunk_steps:
+        keys = [_step_key(step) for step in steps]
+        skip, length = _boundary_overlap(previous_keys, keys)
         
-        # Parse response
-        response_text = response.text.strip()
-        
-        # Remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-        
-        import json
-        result = json.loads(response_text)
+        for position in range(skip - length, skip):
+            kept = merged[len(merged) - skip + position]
+            description = steps[position].get("description") or ""
+            if len(description) > len(kept.get("description") or ""):
+                kept["description"] = description
         
-        steps = result.get("steps", [])
+        merged.extend(dict(step) for step in steps[skip:])
+        # An empty chunk (nothing found, or an unparsable response) keeps the
+        # boundary of the last chunk with steps, so its overlap with the next one is still dropped
+        if keys:
+            previous_keys = keys
+    
+    return [
+        {
+            "step_number": index,
+            "title": step["title"],
+            "description": step.get("description")
+        }
+        for index, step in enumerate(merged, start=1)
+    ]
+
+async def extract_steps_from_pdf(pdf_path: str) -> list[dict]:
+    """
+    Extract structured maintenance steps from a PDF template
+    
+    Args:
+        pdf_path: Path to the PDF file
         
-        # Renumber steps sequentially to avoid duplicates
-        # The PDF might have steps numbered 1, 1, 1 or 1.A, 1.B, etc.
-        # We need sequential integers: 1, 2, 3, ...
-        valid_steps = []
-        for index, step in enumerate(steps, start=1):
-            # Skip if essential fields are missing
-            if not step.get("title"):
-                continue
-            
-            valid_steps.append({
-                "step_number": index,  # Use sequential index
-                "title": step.get("title", f"Paso {index}"),
-                "description": step.get("description")
-            })
+    Returns:
+        List of steps with structure: [{"step_number": 1, "title": "...", "description": "..."}]
+    
+    Raises:
+        FileNotFoundError, ValueError or the Gemini error when no steps can be extracted
+    """
+    # Read PDF content
+    pdf_file_path = Path(pdf_path)
+    if not pdf_file_path.exists():
+        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+    
+    # Stream page text from the process pool and start extracting steps from
+    # every chunk as soon as it is complete
+    model = genai.GenerativeModel(settings.GEMINI_MODEL)
+    chunker = TextChunker()
+    tasks: list[asyncio.Task] = []
+    
+    def schedule(chunks: list[str]) -> None:
+        for chunk in chunks:
+            tasks.append(asyncio.create_task(_extract_chunk(model, chunk, len(tasks) + 1)))
+    
+    try:
+        async for page_text in stream_pdf_pages(str(pdf_file_path)):
+            schedule(chunker.add_page(page_text))
+        schedule(chunker.finish())
         
-        return valid_steps
+        if not tasks:
+            raise ValueError("No text content found in PDF")
         
-    except json.JSONDecodeError as e:
-        print(f"JSON parse error: {e}")
-        print(f"Response text: {response_text}")
-        # Return empty list if parsing fails
-        return []
-    except Exception as e:
-        print(f"Error extracting steps: {e}")
-        return []
+        chunk_steps = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    
+    steps = merge_chunk_steps([chunk or [] for chunk in chunk_steps])
+    
+    if not steps:
+        if any(chunk is None for chunk in chunk_steps):
+            raise ValueError("Could not parse steps from AI response")
+        raise ValueError("No steps found in template")
+    
+    return steps
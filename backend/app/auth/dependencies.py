@@ -76,3 +76,12 @@ async def require_mantenimiento_or_admin(current_user: User = Depends(get_curren
             detail="Mantenimiento or Administrator access required"
         )
     return current_user
+
+async def require_oficinista_or_admin(current_user: User = Depends(get_current_user)):
+    """Require oficinista or administrador role"""
+    if current_user.role not in [UserRole.OFICINISTA.value, UserRole.ADMINISTRADOR.value]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Oficinista or Administrator access required"
+        )
+    return current_user
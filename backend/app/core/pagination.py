@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination helpers
+Cursors are opaque URL-safe tokens that encode the (created_at, id) of a row,
+so pages are fetched with an index range scan instead of OFFSET.
+"""
+import base64
+from datetime import datetime
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a row position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def before_cursor(created_col, id_col, cursor: str):
+    """WHERE clause selecting rows strictly before the cursor position"""
+    created_at, row_id = decode_cursor(cursor)
+    return tuple_(created_col, id_col) < (created_at, row_id)
+
+
+def after_cursor(created_col, id_col, cursor: str):
+    """WHERE clause selecting rows strictly after the cursor position"""
+    created_at, row_id = decode_cursor(cursor)
+    return tuple_(created_col, id_col) > (created_at, row_id)
+
+
+def keyset_page(query, created_col, id_col, cursor: str | None, limit: int):
+    """
+    Order a query newest first on (created_col, id_col), start it after the
+    cursor and fetch one extra row to know whether a next page exists
+    """
+    if cursor:
+        query = query.where(before_cursor(created_col, id_col, cursor))
+    return query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int, key=lambda row: (row.created_at, row.id)) -> tuple[list, str | None]:
+    """Trim the extra row fetched by keyset_page and build the next cursor"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(*key(page[-1]))
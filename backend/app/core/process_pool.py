@@ -0,0 +1,45 @@
+"""
+Process pool for CPU-bound work
+Pure-Python parsing and rendering (PyPDF2, ReportLab) holds the GIL, so
+running it in a thread would still stall the event loop. Such work is sent to
+a per-worker process pool, created on first use and shut down with the app.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from app.core.config import settings
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def pool_size() -> int:
+    """Number of processes in the pool"""
+    return settings.PROCESS_POOL_WORKERS or os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        # Spawned (not forked) children do not inherit the event loop, sockets or locks
+        _pool = ProcessPoolExecutor(
+            max_workers=pool_size(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+async def run_in_process(func, *args, **kwargs):
+    """Run a picklable, module-level function in the pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), partial(func, *args, **kwargs))
+
+
+def shutdown_process_pool() -> None:
+    """Stop the pool processes (called on application shutdown)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
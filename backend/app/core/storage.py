@@ -1,4 +1,6 @@
 import os
+import asyncio
+import hashlib
 import uuid
 import shutil
 from pathlib import Path
@@ -52,9 +54,9 @@ class StorageService:
                 detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024}MB"
             )
         
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Save file and hash its content (identifies re-uploads of the same document)
+        await asyncio.to_thread(file_path.write_bytes, content)
+        sha256 = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
         
         # Store absolute path for Docker volume support
         abs_path = file_path.resolve()
@@ -63,7 +65,8 @@ class StorageService:
             "path": str(abs_path),
             "filename": file.filename,
             "size": len(content),
-            "type": file.content_type
+            "type": file.content_type,
+            "sha256": sha256
         }
     
     @staticmethod
@@ -81,8 +84,7 @@ class StorageService:
         filename = f"ai_{timestamp}_annotated{extension}"
         file_path = chat_dir / filename
         
-        with open(file_path, "wb") as f:
-            f.write(image_data)
+        await asyncio.to_thread(file_path.write_bytes, image_data)
         
         # Store absolute path for Docker volume support
         abs_path = file_path.resolve()
@@ -179,9 +181,9 @@ class StorageService:
                 detail=f"File too large. Maximum size: {MAX_TEMPLATE_SIZE / 1024 / 1024}MB"
             )
         
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Save file and hash its content (identifies re-uploads of the same document)
+        await asyncio.to_thread(file_path.write_bytes, content)
+        sha256 = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
         
         # Store absolute path for Docker volume support
         abs_path = file_path.resolve()
@@ -190,8 +192,15 @@ class StorageService:
             "path": str(abs_path),
             "filename": file.filename,
             "size": len(content),
-            "type": file.content_type
+            "type": file.content_type,
+            "sha256": sha256
         }
+    
+    @staticmethod
+    async def hash_instruction_template(path: str) -> str:
+        """sha256 of a stored template, as computed when it was uploaded"""
+        content = await asyncio.to_thread(Path(path).read_bytes)
+        return await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
 
 # Singleton instance
 storage_service = StorageService()
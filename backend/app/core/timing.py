@@ -0,0 +1,35 @@
+"""
+Request stage timing
+Measures named stages of a request and renders them as a Server-Timing
+header, so the critical path is visible in the browser's network panel.
+"""
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Records how long each named stage of a request takes, in milliseconds"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a block of code"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    async def measure(self, name: str, awaitable):
+        """Time an awaitable; stages running concurrently are measured independently"""
+        with self.stage(name):
+            return await awaitable
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, with the whole request as `total`"""
+        entries = [f"{name};dur={duration:.1f}" for name, duration in self.durations.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
@@ -3,13 +3,16 @@ from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 from app.core.config import settings
+from app.core.process_pool import shutdown_process_pool
 from app.auth.router import router as auth_router
 from app.user.router import router as user_router
 from app.assistant.router import router as assistant_router
 from app.assistant.chat.router import router as chat_router
 from app.assistant.step.router import router as step_router
+from app.assistant.procedure.router import router as procedure_router
 from app.maintenance_history.router import router as maintenance_history_router
 from app.admin.router import router as admin_router
+from app.search.router import router as search_router
 from app.auth.dependencies import get_current_user
 from app.user.user import User
 from typing import Annotated
@@ -26,15 +29,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Search-Truncated", "Server-Timing"],
 )
 
+app.add_event_handler("shutdown", shutdown_process_pool)
+
 app.include_router(auth_router, prefix="/api")
 app.include_router(user_router, prefix="/api")
 app.include_router(assistant_router, prefix="/api")
 app.include_router(chat_router, prefix="/api")
 app.include_router(step_router, prefix="/api")
+app.include_router(procedure_router, prefix="/api")
 app.include_router(maintenance_history_router)
 app.include_router(admin_router, prefix="/api")
+app.include_router(search_router, prefix="/api")
 
 @app.get("/api")
 async def root():
@@ -1,3 +1 @@
-from app.maintenance_history.router import router
-
-__all__ = ["router"]
+# Maintenance history module
@@ -0,0 +1,85 @@
+"""
+Bulk export of maintenance histories as a ZIP of PDFs
+The archive is streamed while it is built: histories are read in keyset
+batches, a batch is rendered concurrently through the PDF cache (process
+pool on a miss, disk hit otherwise) and each PDF is written as a ZIP entry
+as soon as it is its turn. At most one batch of PDFs is held at a time, so
+memory does not grow with the number of histories.
+"""
+import asyncio
+import zipfile
+from typing import AsyncIterator
+from app.core.database import AsyncSessionLocal
+from app.core.pagination import keyset_page, split_page
+from app.maintenance_history.models import MaintenanceHistory
+from app.maintenance_history import pdf_cache
+
+EXPORT_BATCH_SIZE = 16
+
+
+class _ZipSink:
+    """Write-only, unseekable file object; zipfile then writes data descriptors and never seeks back"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_entry_name(history: MaintenanceHistory) -> str:
+    """File name of a history inside the archive"""
+    return f"{history.created_at:%Y%m%d}_{pdf_cache.pdf_filename(history)}"
+
+
+async def stream_histories_zip(query) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP archive with the PDF of every history selected by `query`,
+    newest first. Runs in its own session, since the response is streamed
+    after the request's session is closed. Histories that fail to render are
+    listed in errores.txt instead of aborting the archive.
+    """
+    sink = _ZipSink()
+    failed: list[str] = []
+    cursor = None
+
+    # PDFs are already compressed; storing them keeps the export I/O bound
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        while True:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    keyset_page(query, MaintenanceHistory.created_at, MaintenanceHistory.id, cursor, EXPORT_BATCH_SIZE)
+                )
+                histories, cursor = split_page(list(result.scalars().all()), EXPORT_BATCH_SIZE)
+
+            renders = [asyncio.ensure_future(pdf_cache.get_history_pdf(history)) for history in histories]
+            try:
+                for history, render in zip(histories, renders):
+                    try:
+                        pdf_path = await render
+                        content = await asyncio.to_thread(pdf_path.read_bytes)
+                    except Exception as e:
+                        failed.append(f"{history.id}: {e}")
+                        continue
+                    archive.writestr(export_entry_name(history), content)
+                    yield sink.take()
+            finally:
+                # Client gone: do not leave renders of this batch running
+                for render in renders:
+                    render.cancel()
+
+            if cursor is None:
+                break
+
+        if failed:
+            archive.writestr("errores.txt", "\n".join(failed) + "\n")
+    yield sink.take()
@@ -0,0 +1,84 @@
+"""
+Fleet reports: many maintenance histories rendered into one PDF
+Histories are read with a server-side cursor, ordered by group, and spooled
+to a JSON-lines temp file; the process pool then renders the spool straight
+into a temp PDF file, a few histories at a time. Neither step holds the
+whole report in memory.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from typing import Optional
+from sqlalchemy import func, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.process_pool import run_in_process
+from app.maintenance_history.models import MaintenanceHistory
+from app.maintenance_history.pdf_generator import render_fleet_report_pdf
+
+FLEET_REPORT_ROWS_PER_FETCH = 500
+
+
+def registration_group():
+    """
+    The registration a history is grouped under: single spaces, upper case,
+    NULL when blank; the same normalization as pdf_generator.fleet_group_label
+    """
+    registration = MaintenanceHistory.aircraft_info[literal_column("'registration'")].astext
+    return func.nullif(func.upper(func.btrim(func.regexp_replace(registration, r"\s+", " ", "g"))), "")
+
+
+def fleet_report_query(query, group_by: str):
+    """Columns the report needs, ordered so that each group is contiguous"""
+    query = query.with_only_columns(
+        MaintenanceHistory.id,
+        MaintenanceHistory.title,
+        MaintenanceHistory.summary,
+        MaintenanceHistory.created_at,
+        MaintenanceHistory.aircraft_info,
+        MaintenanceHistory.maintenance_actions,
+        MaintenanceHistory.parts_used
+    )
+    if group_by == "registration":
+        query = query.order_by(registration_group().nulls_last())
+    return query.order_by(MaintenanceHistory.created_at, MaintenanceHistory.id)
+
+
+async def _spool_histories(db: AsyncSession, statement, spool) -> int:
+    """Write the selected histories to the spool as JSON lines; returns how many"""
+    count = 0
+    result = await db.stream(statement.execution_options(yield_per=FLEET_REPORT_ROWS_PER_FETCH))
+    async for partition in result.mappings().partitions():
+        lines = "".join(
+            json.dumps({**row, "created_at": row["created_at"].isoformat()}, ensure_ascii=False) + "\n"
+            for row in partition
+        )
+        await asyncio.to_thread(spool.write, lines)
+        count += len(partition)
+    return count
+
+
+async def build_fleet_report(db: AsyncSession, query, group_by: str, title: str) -> Optional[str]:
+    """
+    Render the histories selected by `query` into a temporary PDF and return
+    its path, or None when there are none. The caller deletes the file.
+    """
+    spool = tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".jsonl", delete=False)
+    try:
+        with spool:
+            count = await _spool_histories(db, fleet_report_query(query, group_by), spool)
+        # Do not keep the read transaction open during the render
+        await db.commit()
+        if not count:
+            return None
+
+        descriptor, output_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(descriptor)
+        try:
+            await run_in_process(render_fleet_report_pdf, spool.name, output_path, title, group_by, count)
+        except BaseException:
+            os.unlink(output_path)
+            raise
+        return output_path
+    finally:
+        os.unlink(spool.name)
@@ -0,0 +1,64 @@
+"""
+Maintenance history generation jobs
+Generating or updating a history is a long AI call, so it runs after the
+request that asked for it has responded. The job opens its own session, records its
+progress in its maintenance_history_jobs row and writes the history and
+the final status in the same transaction.
+"""
+import asyncio
+from sqlalchemy import update
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.maintenance_history.models import MaintenanceHistoryJob, HistoryJobStatus
+from app.maintenance_history.service import generate_history_from_chat
+
+ERROR_LENGTH = 500
+
+
+async def _set_status(db, job_id: int, expected: HistoryJobStatus, new: HistoryJobStatus, **values) -> bool:
+    """Move a job from one status to another; False if it was not in the expected status"""
+    result = await db.execute(
+        update(MaintenanceHistoryJob)
+        .where(MaintenanceHistoryJob.id == job_id, MaintenanceHistoryJob.status == expected)
+        .values(status=new, **values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def _fail(db, job_id: int, error: str) -> None:
+    """Mark a running job as failed, discarding its pending changes"""
+    await db.rollback()
+    await _set_status(db, job_id, HistoryJobStatus.PROCESSING, HistoryJobStatus.FAILED, error=error)
+    await db.commit()
+
+
+async def run_history_job(job_id: int, chat_id: int, user_id: int, full: bool = False) -> None:
+    """Generate or update the maintenance history of a queued job"""
+    async with AsyncSessionLocal() as db:
+        # Claim the job so it cannot run twice
+        claimed = await _set_status(db, job_id, HistoryJobStatus.PENDING, HistoryJobStatus.PROCESSING)
+        await db.commit()
+        if not claimed:
+            return
+
+        try:
+            history = await asyncio.wait_for(
+                generate_history_from_chat(db, chat_id, user_id, full=full),
+                timeout=settings.HISTORY_JOB_TIMEOUT
+            )
+        except (Exception, asyncio.CancelledError) as e:
+            # A cancelled job (worker shutdown) is not an Exception, and would
+            # otherwise stay processing until it expires as stale
+            error = str(e)[:ERROR_LENGTH] or type(e).__name__
+            print(f"Error generating history for chat {chat_id}: {error}")
+            await asyncio.shield(_fail(db, job_id, error))
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+
+        # A job expired as stale meanwhile keeps its status, and its history is dropped
+        if await _set_status(db, job_id, HistoryJobStatus.PROCESSING, HistoryJobStatus.DONE, history_id=history.id):
+            await db.commit()
+        else:
+            await db.rollback()
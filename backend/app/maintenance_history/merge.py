@@ -0,0 +1,75 @@
+"""
+Merging of incremental history updates
+An incremental update only describes the new messages of a chat. Its
+actions and parts are merged into the stored history with fixed rules, so
+the same update always produces the same history:
+- actions are appended in order, skipping ones already recorded
+- parts are matched by part number (or name without one) and their
+  quantities added up; new parts are appended
+- aircraft data only fills fields that were still unknown
+"""
+from typing import Any, Optional
+
+# Quantities are stored in history_parts.quantity (int4); anything larger is
+# a misread by the model, not a real count
+MAX_PART_QUANTITY = 10000
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def merge_actions(existing: Optional[list[dict]], new: Optional[list[dict]]) -> list[dict]:
+    """Append new actions not already recorded (same action and result)"""
+    merged = list(existing or [])
+    seen = {(_normalize(action.get("action")), _normalize(action.get("result"))) for action in merged}
+    for action in new or []:
+        key = (_normalize(action.get("action")), _normalize(action.get("result")))
+        if not key[0] or key in seen:
+            continue
+        seen.add(key)
+        merged.append(action)
+    return merged
+
+
+def _part_key(part: dict) -> str:
+    return _normalize(part.get("part_number")) or _normalize(part.get("part_name"))
+
+
+def part_quantity(part: dict) -> int:
+    """
+    Quantity of a parts_used entry, between 1 and MAX_PART_QUANTITY; 1 when
+    missing or not a number
+    """
+    try:
+        quantity = int(part.get("quantity") or 1)
+    except (TypeError, ValueError, OverflowError):
+        return 1
+    return min(max(quantity, 1), MAX_PART_QUANTITY)
+
+
+def merge_parts(existing: Optional[list[dict]], new: Optional[list[dict]]) -> list[dict]:
+    """Add the quantities of parts used again and append new parts"""
+    merged = [dict(part) for part in existing or []]
+    by_key = {_part_key(part): part for part in merged}
+    for part in new or []:
+        key = _part_key(part)
+        if not key:
+            continue
+        if key in by_key:
+            by_key[key]["quantity"] = min(part_quantity(by_key[key]) + part_quantity(part), MAX_PART_QUANTITY)
+        else:
+            by_key[key] = dict(part, quantity=part_quantity(part))
+            merged.append(by_key[key])
+    return merged
+
+
+def merge_aircraft_info(existing: Optional[dict], new: Optional[dict]) -> Optional[dict]:
+    """Fill unknown aircraft fields from the update; known ones are kept"""
+    if not new:
+        return existing
+    merged = dict(existing or {})
+    for field, value in new.items():
+        if merged.get(field) is None and value is not None:
+            merged[field] = value
+    return merged or None
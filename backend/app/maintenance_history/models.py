@@ -1,11 +1,43 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, Enum, Computed, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.sql import func
 from app.core.database import Base
+import enum
+
+
+class HistoryJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+
+ACTIVE_HISTORY_JOB_STATUSES = (HistoryJobStatus.PENDING, HistoryJobStatus.PROCESSING)
+# Predicate of the active job index, as literal SQL so ON CONFLICT can name it
+# (bound parameters would keep a generic plan from inferring the index)
+ACTIVE_HISTORY_JOB_PREDICATE = "status IN ('PENDING', 'PROCESSING')"
 
 
 class MaintenanceHistory(Base):
     __tablename__ = "maintenance_histories"
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), per user and for admins
+        Index("ix_maintenance_histories_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_maintenance_histories_created_at_id", "created_at", "id"),
+        # History of a chat; the latest one for chats with several from before incremental updates
+        Index("ix_maintenance_histories_chat_id_created_at_id", "chat_id", "created_at", "id"),
+        # Timeline of an aircraft, matched case insensitively (see service.aircraft_field)
+        Index(
+            "ix_maintenance_histories_registration_created_at_id",
+            text("upper(aircraft_info ->> 'registration')"), "created_at", "id"
+        ),
+        Index(
+            "ix_maintenance_histories_model_created_at_id",
+            text("upper(aircraft_info ->> 'model')"), "created_at", "id"
+        ),
+        Index("ix_maintenance_histories_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
 
     id = Column(Integer, primary_key=True, index=True)
     chat_id = Column(Integer, ForeignKey("chats.id", ondelete="CASCADE"), nullable=False)
@@ -15,5 +47,61 @@ class MaintenanceHistory(Base):
     aircraft_info = Column(JSONB, nullable=True)
     maintenance_actions = Column(JSONB, nullable=True)
     parts_used = Column(JSONB, nullable=True)
+    last_message_id = Column(Integer, ForeignKey("messages.id", ondelete="SET NULL"), nullable=True)  # Last message covered
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    # Full-text search (app.search): title, summary and the text of the actions, by weight.
+    # Not mapped, so the ORM never loads it or asks for it back after an INSERT
+    search_vector = Column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('spanish', title), 'A')"
+            " || setweight(to_tsvector('spanish', summary), 'B')"
+            " || setweight(jsonb_to_tsvector('spanish', coalesce(maintenance_actions, '[]'), '[\"string\"]'), 'C')",
+            persisted=True
+        )
+    )
+
+
+class MaintenanceHistoryJob(Base):
+    __tablename__ = "maintenance_history_jobs"
+    __table_args__ = (
+        # At most one pending or running job per chat: concurrent requests coalesce onto it
+        Index(
+            "uq_maintenance_history_jobs_active_chat_id", "chat_id",
+            unique=True, postgresql_where=text(ACTIVE_HISTORY_JOB_PREDICATE)
+        ),
+        Index("ix_maintenance_history_jobs_chat_id_id", "chat_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    chat_id = Column(Integer, ForeignKey("chats.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(Enum(HistoryJobStatus), nullable=False, default=HistoryJobStatus.PENDING)
+    history_id = Column(Integer, ForeignKey("maintenance_histories.id", ondelete="SET NULL"), nullable=True)  # Set when done
+    error = Column(String(500), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class HistoryPart(Base):
+    """One entry of MaintenanceHistory.parts_used, with the aircraft and date of its history"""
+    __tablename__ = "history_parts"
+    __table_args__ = (
+        # Usage of a part number / on an aircraft / per user over a date range
+        Index("ix_history_parts_part_number_used_at", "part_number", "used_at", postgresql_include=["quantity", "history_id"]),
+        Index("ix_history_parts_aircraft_model_used_at", "aircraft_model", "used_at"),
+        Index("ix_history_parts_registration_used_at", "registration", "used_at"),
+        Index("ix_history_parts_user_id_used_at", "user_id", "used_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    history_id = Column(Integer, ForeignKey("maintenance_histories.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)  # Owner of the history, for role scoping
+    position = Column(Integer, nullable=False)  # Order in parts_used
+    part_number = Column(String(100), nullable=True)  # Normalized: single spaces, upper case
+    part_name = Column(String(200), nullable=True)
+    quantity = Column(Integer, nullable=False)
+    aircraft_model = Column(String(100), nullable=True)  # Normalized like part_number
+    registration = Column(String(50), nullable=True)  # Normalized like part_number
+    used_at = Column(DateTime(timezone=True), nullable=False)  # created_at of the history
@@ -0,0 +1,185 @@
+"""
+Normalized parts usage
+Every entry of maintenance_histories.parts_used is mirrored as a row of
+history_parts, with the aircraft and date of its history, so usage can be
+aggregated through indexes instead of unpacking the JSONB of every history.
+Histories write their rows with sync_history_parts (the caller commits);
+deleting a history cascades to them. Histories from before the table are
+filled in by backfill_history_parts.
+"""
+from datetime import date, timedelta
+from typing import Any, Callable, List, Optional
+from sqlalchemy import delete, distinct, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal
+from app.maintenance_history.merge import part_quantity
+from app.maintenance_history.models import MaintenanceHistory, HistoryPart
+from app.user.user import User, user_assignments
+from app.user.schemas import UserRole
+
+BACKFILL_BATCH_SIZE = 500
+
+PART_NUMBER_LENGTH = 100
+PART_NAME_LENGTH = 200
+AIRCRAFT_MODEL_LENGTH = 100
+REGISTRATION_LENGTH = 50
+
+
+def normalize_code(value: Any, length: int) -> Optional[str]:
+    """Part numbers, models and registrations are compared with single spaces, in upper case"""
+    normalized = " ".join(str(value or "").split()).upper()[:length]
+    return normalized or None
+
+
+def history_part_rows(history) -> List[dict]:
+    """history_parts rows of a history (or of a row with the same attributes)"""
+    aircraft_info = history.aircraft_info if isinstance(history.aircraft_info, dict) else {}
+    parts = history.parts_used if isinstance(history.parts_used, list) else []
+    rows = []
+    for position, part in enumerate(parts, 1):
+        if not isinstance(part, dict):
+            continue
+        part_number = normalize_code(part.get("part_number"), PART_NUMBER_LENGTH)
+        part_name = " ".join(str(part.get("part_name") or "").split())[:PART_NAME_LENGTH] or None
+        if not part_number and not part_name:
+            continue
+        rows.append({
+            "history_id": history.id,
+            "user_id": history.user_id,
+            "position": position,
+            "part_number": part_number,
+            "part_name": part_name,
+            "quantity": part_quantity(part),
+            "aircraft_model": normalize_code(aircraft_info.get("model"), AIRCRAFT_MODEL_LENGTH),
+            "registration": normalize_code(aircraft_info.get("registration"), REGISTRATION_LENGTH),
+            "used_at": history.created_at,
+        })
+    return rows
+
+
+async def _replace_parts(db: AsyncSession, history_ids: List[int], rows: List[dict]) -> None:
+    await db.execute(delete(HistoryPart).where(HistoryPart.history_id.in_(history_ids)))
+    if rows:
+        await db.execute(insert(HistoryPart.__table__), rows)
+
+
+async def sync_history_parts(db: AsyncSession, history: MaintenanceHistory) -> int:
+    """Rewrite the history_parts rows of a flushed history; returns how many it has"""
+    rows = history_part_rows(history)
+    await _replace_parts(db, [history.id], rows)
+    return len(rows)
+
+
+async def backfill_history_parts(
+    batch_size: int = BACKFILL_BATCH_SIZE,
+    after_id: int = 0,
+    on_batch: Optional[Callable[[int, int], None]] = None
+) -> int:
+    """
+    Rebuild the history_parts rows of every history with id > after_id, in
+    batches of histories walked by id, one transaction per batch, so it can
+    run while the app is serving and be resumed where it stopped.
+    on_batch(processed, last_id) is called after each batch.
+    Returns the number of histories processed.
+    """
+    processed = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(
+                    MaintenanceHistory.id,
+                    MaintenanceHistory.user_id,
+                    MaintenanceHistory.aircraft_info,
+                    MaintenanceHistory.parts_used,
+                    MaintenanceHistory.created_at
+                )
+                .where(MaintenanceHistory.id > after_id)
+                .order_by(MaintenanceHistory.id)
+                .limit(batch_size)
+            )
+            histories = result.all()
+            if not histories:
+                return processed
+
+            await _replace_parts(
+                db,
+                [history.id for history in histories],
+                [row for history in histories for row in history_part_rows(history)]
+            )
+            await db.commit()
+
+        processed += len(histories)
+        after_id = histories[-1].id
+        if on_batch:
+            on_batch(processed, after_id)
+
+
+def scoped_parts_query(user: User, *columns):
+    """SELECT columns over the history_parts rows of the histories a user can see"""
+    query = select(*columns).select_from(HistoryPart)
+
+    if user.role == UserRole.ADMINISTRADOR.value:
+        return query
+
+    if user.role == UserRole.OFICINISTA.value:
+        return query.join(
+            user_assignments,
+            HistoryPart.user_id == user_assignments.c.operario_id
+        ).where(user_assignments.c.oficinista_id == user.id)
+
+    return query.where(HistoryPart.user_id == user.id)
+
+
+def _usage_group(group_by: str):
+    if group_by == "part":
+        # Parts recorded without a number are grouped by name
+        return func.coalesce(HistoryPart.part_number, func.upper(HistoryPart.part_name))
+    if group_by == "model":
+        return HistoryPart.aircraft_model
+    if group_by == "registration":
+        return HistoryPart.registration
+    return func.to_char(func.date_trunc("month", HistoryPart.used_at), "YYYY-MM")
+
+
+async def get_parts_usage(
+    db: AsyncSession,
+    user: User,
+    group_by: str = "part",
+    part_number: Optional[str] = None,
+    airplane_model: Optional[str] = None,
+    registration: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = 100
+) -> List[dict]:
+    """
+    Quantity of parts used and number of histories using them, per part,
+    aircraft model, registration or month, largest first
+    """
+    group = _usage_group(group_by).label("group")
+    columns = [
+        group,
+        func.sum(HistoryPart.quantity).label("total_quantity"),
+        func.count(distinct(HistoryPart.history_id)).label("history_count"),
+    ]
+    if group_by == "part":
+        columns.append(func.min(HistoryPart.part_name).label("part_name"))
+
+    query = scoped_parts_query(user, *columns)
+    if part_number:
+        query = query.where(HistoryPart.part_number == normalize_code(part_number, PART_NUMBER_LENGTH))
+    if airplane_model:
+        query = query.where(HistoryPart.aircraft_model == normalize_code(airplane_model, AIRCRAFT_MODEL_LENGTH))
+    if registration:
+        query = query.where(HistoryPart.registration == normalize_code(registration, REGISTRATION_LENGTH))
+    if date_from:
+        query = query.where(HistoryPart.used_at >= date_from)
+    if date_to:
+        query = query.where(HistoryPart.used_at < date_to + timedelta(days=1))
+
+    result = await db.execute(
+        query.group_by(group)
+        .order_by(func.sum(HistoryPart.quantity).desc(), group)
+        .limit(limit)
+    )
+    return [dict(row) for row in result.mappings().all()]
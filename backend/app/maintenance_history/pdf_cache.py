@@ -0,0 +1,81 @@
+"""
+Rendered PDF cache for maintenance history exports
+A history is rendered once per version: files are named after the history
+id, its updated_at and the generator version, so an edited history or a
+new layout gets a new file, and the same name doubles as the ETag of the
+export. Rendering runs in the process pool; only the latest version of each
+history is kept (with and without photos).
+"""
+import asyncio
+import os
+import uuid
+from pathlib import Path
+from app.core.config import settings
+from app.core.process_pool import run_in_process
+from app.maintenance_history.models import MaintenanceHistory
+from app.maintenance_history.pdf_generator import GENERATOR_VERSION, render_maintenance_history_pdf
+
+CACHE_DIR = Path(settings.PDF_CACHE_PATH)
+# Downsampled evidence photos, named after the content of the originals
+IMAGE_DIR = CACHE_DIR / "images"
+
+
+def pdf_cache_key(history: MaintenanceHistory, with_images: bool = False) -> str:
+    """Identifies one rendering of a history"""
+    key = f"{history.id}-{history.updated_at:%Y%m%d%H%M%S%f}-v{GENERATOR_VERSION}"
+    return f"{key}-img" if with_images else key
+
+
+def pdf_filename(history: MaintenanceHistory) -> str:
+    """Download name of the PDF of a history"""
+    safe_title = "".join(c for c in history.title if c.isalnum() or c in (' ', '-', '_')).rstrip()
+    safe_title = safe_title.replace(' ', '_')[:50]  # Limit length
+    return f"informe_{safe_title}_{history.id}.pdf"
+
+
+def _store(history: MaintenanceHistory, path: Path, content: bytes) -> None:
+    """Write atomically (concurrent renders of the same version are harmless) and drop older versions"""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    temp_path.write_bytes(content)
+    os.replace(temp_path, path)
+
+    current = f"history_{pdf_cache_key(history)}"
+    for old_path in CACHE_DIR.glob(f"history_{history.id}-*.pdf"):
+        if not old_path.name.startswith(current):
+            old_path.unlink(missing_ok=True)
+
+
+async def get_history_pdf(history: MaintenanceHistory, images: list[dict] | None = None) -> Path:
+    """
+    Path of the rendered PDF of a history, rendering it on a cache miss.
+    With `images` (chat photos as {"path", "caption"}) the PDF includes
+    them, as downsampled copies kept in IMAGE_DIR.
+    """
+    path = CACHE_DIR / f"history_{pdf_cache_key(history, bool(images))}.pdf"
+    if await asyncio.to_thread(path.exists):
+        return path
+
+    content = await run_in_process(
+        render_maintenance_history_pdf,
+        title=history.title,
+        summary=history.summary,
+        created_at=history.created_at,
+        aircraft_info=history.aircraft_info,
+        maintenance_actions=history.maintenance_actions,
+        parts_used=history.parts_used,
+        images=images or None,
+        image_dir=str(IMAGE_DIR)
+    )
+    await asyncio.to_thread(_store, history, path, content)
+    return path
+
+
+def _discard(history_id: int) -> None:
+    for path in CACHE_DIR.glob(f"history_{history_id}-*.pdf"):
+        path.unlink(missing_ok=True)
+
+
+async def discard_history_pdfs(history_id: int) -> None:
+    """Remove the cached renderings of a deleted history"""
+    await asyncio.to_thread(_discard, history_id)
@@ -2,10 +2,18 @@
 PDF Generator for Maintenance History Reports
 Uses ReportLab to create professional PDF documents
 """
+import hashlib
+import json
+import os
+import tempfile
+import uuid
 from io import BytesIO
+from pathlib import Path
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
+from xml.sax.saxutils import escape
 
+from reportlab import rl_config
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -15,6 +23,22 @@ from reportlab.platypus import (
     PageBreak, KeepTogether
 )
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+from reportlab.platypus import Image as PDFImage
+from PIL import Image, ImageOps
+
+# Bump when the layout changes, so cached exports are rendered again
+GENERATOR_VERSION = 2
+
+# Longer parts lists are split into several tables
+PARTS_ROWS_PER_TABLE = 40
+
+# Evidence photos are embedded as JPEG copies no larger than this (about
+# 200 dpi at the full text width), whatever the size of the upload
+EVIDENCE_MAX_PIXELS = 1280
+EVIDENCE_JPEG_QUALITY = 75
+
+# Write image streams as binary; ASCII85 makes every embedded photo 25% larger
+rl_config.useA85 = 0
 
 
 class MaintenanceHistoryPDFGenerator:
@@ -157,49 +181,84 @@ class MaintenanceHistoryPDFGenerator:
         
         elements.append(Paragraph("🔩 Piezas Utilizadas", self.styles['SectionHeader']))
         
-        # Create table data
-        table_data = [['Pieza', 'Número de Parte', 'Cantidad']]
-        
-        for part in parts:
-            table_data.append([
-                part.get('part_name', 'N/A'),
-                part.get('part_number', 'N/A'),
-                str(part.get('quantity', 'N/A'))
-            ])
-        
-        # Create table
-        table = Table(table_data, colWidths=[7*cm, 6*cm, 3*cm])
-        table.setStyle(TableStyle([
-            # Header row styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5282')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            
-            # Data rows styling
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-            ('ALIGN', (0, 1), (1, -1), 'LEFT'),
-            ('ALIGN', (2, 1), (2, -1), 'CENTER'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
+        elements.extend(self._parts_tables(parts))
+        elements.append(Spacer(1, 0.5*cm))
+    
+    def _parts_tables(self, parts: List[Dict[str, Any]]) -> List[Table]:
+        """
+        Parts as tables of at most PARTS_ROWS_PER_TABLE rows, each repeating
+        its header on every page; one huge table is slow to lay out
+        """
+        tables = []
+        for start in range(0, len(parts), PARTS_ROWS_PER_TABLE):
+            table_data = [['Pieza', 'Número de Parte', 'Cantidad']]
             
-            # All cells
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            for part in parts[start:start + PARTS_ROWS_PER_TABLE]:
+                table_data.append([
+                    part.get('part_name', 'N/A'),
+                    part.get('part_number', 'N/A'),
+                    str(part.get('quantity', 'N/A'))
+                ])
             
-            # Alternating row colors
-            *[('BACKGROUND', (0, i), (-1, i), colors.white) 
-              for i in range(1, len(table_data)) if i % 2 == 0]
-        ]))
+            # Create table
+            table = Table(table_data, colWidths=[7*cm, 6*cm, 3*cm], repeatRows=1)
+            table.setStyle(TableStyle([
+                # Header row styling
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5282')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('FONTSIZE', (0, 0), (-1, 0), 12),
+                
+                # Data rows styling
+                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+                ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+                ('ALIGN', (0, 1), (1, -1), 'LEFT'),
+                ('ALIGN', (2, 1), (2, -1), 'CENTER'),
+                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+                ('FONTSIZE', (0, 1), (-1, -1), 10),
+                
+                # All cells
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('LEFTPADDING', (0, 0), (-1, -1), 10),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+                ('TOPPADDING', (0, 0), (-1, -1), 8),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+                
+                # Alternating row colors
+                *[('BACKGROUND', (0, i), (-1, i), colors.white) 
+                  for i in range(1, len(table_data)) if i % 2 == 0]
+            ]))
+            tables.append(table)
+        return tables
+    
+    def _add_evidence_section(
+        self,
+        elements: List,
+        images: Optional[List[Dict[str, Any]]],
+        image_dir: str
+    ):
+        """Add the chat photos, each as a downsampled copy embedded once however often it appears"""
+        prepared = []
+        for image in images or []:
+            path = prepare_evidence_image(image['path'], image_dir)
+            if path:
+                prepared.append((path, image.get('caption')))
+        if not prepared:
+            return
         
-        elements.append(table)
-        elements.append(Spacer(1, 0.5*cm))
+        elements.append(Paragraph("📷 Evidencias Fotográficas", self.styles['SectionHeader']))
+        
+        for path, caption in prepared:
+            # A JPEG given by file name is passed through to the PDF, and
+            # ReportLab writes each file name only once
+            picture = PDFImage(path, width=16*cm, height=10*cm, kind='proportional')
+            block = [picture]
+            if caption:
+                block.append(Paragraph(f"<i>{escape(caption)}</i>", self.styles['Footer']))
+            block.append(Spacer(1, 0.4*cm))
+            elements.append(KeepTogether(block))
     
     def _add_footer(self, canvas, doc):
         """Add page footer"""
@@ -226,7 +285,9 @@ class MaintenanceHistoryPDFGenerator:
         created_at: datetime,
         aircraft_info: Optional[Dict[str, Any]] = None,
         maintenance_actions: Optional[List[Dict[str, Any]]] = None,
-        parts_used: Optional[List[Dict[str, Any]]] = None
+        parts_used: Optional[List[Dict[str, Any]]] = None,
+        images: Optional[List[Dict[str, Any]]] = None,
+        image_dir: Optional[str] = None
     ) -> BytesIO:
         """
         Generate PDF document for maintenance history
@@ -238,6 +299,9 @@ class MaintenanceHistoryPDFGenerator:
             aircraft_info: Aircraft information dictionary
             maintenance_actions: List of maintenance actions
             parts_used: List of parts used
+            images: Chat photos to include, as {"path", "caption"} dicts
+            image_dir: Where downsampled copies of the photos are kept
+                (a temporary folder for this render when not given)
         
         Returns:
             BytesIO: PDF file in memory
@@ -266,7 +330,13 @@ class MaintenanceHistoryPDFGenerator:
         self._add_parts_used_section(elements, parts_used)
         
         # Build PDF
-        doc.build(elements, onFirstPage=self._add_footer, onLaterPages=self._add_footer)
+        if images and not image_dir:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                self._add_evidence_section(elements, images, temp_dir)
+                doc.build(elements, onFirstPage=self._add_footer, onLaterPages=self._add_footer)
+        else:
+            self._add_evidence_section(elements, images, image_dir)
+            doc.build(elements, onFirstPage=self._add_footer, onLaterPages=self._add_footer)
         
         # Get PDF from buffer
         buffer.seek(0)
@@ -279,7 +349,9 @@ def generate_maintenance_history_pdf(
     created_at: datetime,
     aircraft_info: Optional[Dict[str, Any]] = None,
     maintenance_actions: Optional[List[Dict[str, Any]]] = None,
-    parts_used: Optional[List[Dict[str, Any]]] = None
+    parts_used: Optional[List[Dict[str, Any]]] = None,
+    images: Optional[List[Dict[str, Any]]] = None,
+    image_dir: Optional[str] = None
 ) -> BytesIO:
     """
     Convenience function to generate maintenance history PDF
@@ -291,16 +363,252 @@ def generate_maintenance_history_pdf(
         aircraft_info: Aircraft information dictionary
         maintenance_actions: List of maintenance actions
         parts_used: List of parts used
+        images: Chat photos to include, as {"path", "caption"} dicts
+        image_dir: Where downsampled copies of the photos are kept
     
     Returns:
         BytesIO: PDF file in memory
     """
-    generator = MaintenanceHistoryPDFGenerator()
-    return generator.generate_pdf(
+    return get_generator().generate_pdf(
         title=title,
         summary=summary,
         created_at=created_at,
         aircraft_info=aircraft_info,
         maintenance_actions=maintenance_actions,
-        parts_used=parts_used
+        parts_used=parts_used,
+        images=images,
+        image_dir=image_dir
+    )
+
+
+def prepare_evidence_image(source_path: str, image_dir: str) -> Optional[str]:
+    """
+    Path of a downsampled, re-encoded JPEG copy of a photo, named after the
+    content of the original so identical photos share one copy (and one
+    embedded image). Returns None when the photo is missing, unreadable or
+    too large to decode safely.
+    """
+    try:
+        content = Path(source_path).read_bytes()
+    except OSError:
+        return None
+    
+    digest = hashlib.sha256(content).hexdigest()
+    path = Path(image_dir) / f"{digest}-{EVIDENCE_MAX_PIXELS}-q{EVIDENCE_JPEG_QUALITY}.jpg"
+    if path.exists():
+        return str(path)
+    
+    try:
+        with Image.open(BytesIO(content)) as original:
+            # JPEGs are decoded at a reduced scale that is still large enough
+            original.draft("RGB", (EVIDENCE_MAX_PIXELS, EVIDENCE_MAX_PIXELS))
+            picture = ImageOps.exif_transpose(original)
+            if picture.mode in ("RGBA", "LA", "P"):
+                # JPEG has no transparency; flatten on white
+                picture = picture.convert("RGBA")
+                background = Image.new("RGB", picture.size, "white")
+                background.paste(picture, mask=picture.getchannel("A"))
+                picture = background
+            elif picture.mode != "RGB":
+                picture = picture.convert("RGB")
+            picture.thumbnail((EVIDENCE_MAX_PIXELS, EVIDENCE_MAX_PIXELS), Image.Resampling.LANCZOS)
+            
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+            picture.save(temp_path, "JPEG", quality=EVIDENCE_JPEG_QUALITY, optimize=True)
+            os.replace(temp_path, path)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        # Truncated or corrupt files raise OSError or ValueError; images far
+        # over PIL's pixel limit raise DecompressionBombError
+        return None
+    return str(path)
+
+
+_generator: Optional[MaintenanceHistoryPDFGenerator] = None
+
+
+def get_generator() -> MaintenanceHistoryPDFGenerator:
+    """Generator of this process; its stylesheet is built once and reused"""
+    global _generator
+    if _generator is None:
+        _generator = MaintenanceHistoryPDFGenerator()
+    return _generator
+
+
+def render_maintenance_history_pdf(**history_fields) -> bytes:
+    """
+    Render a maintenance history PDF to bytes. Module-level and free of app
+    imports so it can run in the process pool.
+    """
+    return generate_maintenance_history_pdf(**history_fields).getvalue()
+
+
+# Fleet reports: many histories in one document
+
+FLEET_GROUPINGS = ("registration", "month")
+
+# Flowables kept queued ahead of the layout, for keepWithNext lookahead
+FLEET_LOOKAHEAD = 8
+
+
+class _FlowableFeed(list):
+    """
+    Flowable list that refills itself from an iterator of flowable lists.
+    ReportLab consumes the list from the front and checks len() before each
+    flowable, so only a few histories are laid out in memory at a time.
+    """
+    
+    def __init__(self, source: Iterator[List]):
+        super().__init__()
+        self._source = source
+    
+    def __len__(self):
+        while list.__len__(self) < FLEET_LOOKAHEAD:
+            chunk = next(self._source, None)
+            if chunk is None:
+                break
+            self.extend(chunk)
+        return list.__len__(self)
+
+
+def fleet_group_label(history: Dict[str, Any], group_by: str) -> str:
+    """Heading of the group a history belongs to"""
+    if group_by == "registration":
+        # Normalized like the report's ordering (see fleet_report.registration_group)
+        registration = (history.get('aircraft_info') or {}).get('registration')
+        return " ".join(str(registration or "").split()).upper() or "Sin matrícula"
+    return history['created_at'].strftime("%Y-%m")
+
+
+class FleetReportPDFGenerator(MaintenanceHistoryPDFGenerator):
+    """Render many maintenance histories, grouped, into one PDF file"""
+    
+    def _setup_custom_styles(self):
+        super()._setup_custom_styles()
+        
+        self.styles.add(ParagraphStyle(
+            name='GroupHeader',
+            parent=self.styles['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#1a365d'),
+            spaceAfter=16,
+            fontName='Helvetica-Bold'
+        ))
+        
+        self.styles.add(ParagraphStyle(
+            name='HistoryTitle',
+            parent=self.styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#2c5282'),
+            spaceBefore=12,
+            spaceAfter=4,
+            keepWithNext=1,
+            fontName='Helvetica-Bold'
+        ))
+    
+    def _history_flowables(self, history: Dict[str, Any]) -> List:
+        """Flowables of one history inside a fleet report"""
+        aircraft_info = history.get('aircraft_info') or {}
+        details = [history['created_at'].strftime("%d/%m/%Y %H:%M")]
+        if aircraft_info.get('registration'):
+            details.append(f"Matrícula {escape(str(aircraft_info['registration']))}")
+        if aircraft_info.get('model'):
+            details.append(f"Modelo {escape(str(aircraft_info['model']))}")
+        
+        elements = [
+            Paragraph(escape(history['title']), self.styles['HistoryTitle']),
+            Paragraph(f"<i>{' · '.join(details)}</i>", self.styles['BodyText']),
+            Paragraph(escape(history['summary']), self.styles['JustifiedBody']),
+        ]
+        actions = [
+            {key: escape(str(value)) if value is not None else None for key, value in action.items()}
+            for action in history.get('maintenance_actions') or []
+            if isinstance(action, dict)
+        ]
+        self._add_maintenance_actions_section(elements, actions)
+        parts = [part for part in history.get('parts_used') or [] if isinstance(part, dict)]
+        self._add_parts_used_section(elements, parts)
+        return elements
+    
+    def _report_flowables(
+        self,
+        histories: Iterator[Dict[str, Any]],
+        title: str,
+        group_by: str,
+        history_count: int
+    ) -> Iterator[List]:
+        """Cover, then each history preceded by its group heading when the group changes"""
+        yield [
+            Paragraph(escape(title), self.styles['CustomTitle']),
+            Paragraph(
+                f"<i>{history_count} históricos · generado el {datetime.now().strftime('%d/%m/%Y %H:%M')}</i>",
+                self.styles['Footer']
+            ),
+        ]
+        
+        group = None
+        for history in histories:
+            label = fleet_group_label(history, group_by)
+            if label != group:
+                group = label
+                yield [PageBreak(), Paragraph(escape(label), self.styles['GroupHeader'])]
+            yield self._history_flowables(history)
+    
+    def generate_report(
+        self,
+        histories: Iterator[Dict[str, Any]],
+        output_path: str,
+        title: str,
+        group_by: str,
+        history_count: int
+    ) -> int:
+        """
+        Render histories, already ordered by group, straight into a file.
+        Returns the number of pages.
+        """
+        doc = SimpleDocTemplate(
+            output_path,
+            pagesize=A4,
+            rightMargin=2*cm,
+            leftMargin=2*cm,
+            topMargin=2.5*cm,
+            bottomMargin=2.5*cm,
+            title=title,
+            author="Plane Assistant"
+        )
+        doc.build(
+            _FlowableFeed(self._report_flowables(histories, title, group_by, history_count)),
+            onFirstPage=self._add_footer,
+            onLaterPages=self._add_footer
+        )
+        return doc.page
+
+
+def read_spooled_histories(spool_path: str) -> Iterator[Dict[str, Any]]:
+    """Histories from a JSON-lines spool file, one at a time"""
+    with open(spool_path, encoding="utf-8") as spool:
+        for line in spool:
+            history = json.loads(line)
+            history['created_at'] = datetime.fromisoformat(history['created_at'])
+            yield history
+
+
+def render_fleet_report_pdf(
+    spool_path: str,
+    output_path: str,
+    title: str,
+    group_by: str,
+    history_count: int
+) -> int:
+    """
+    Render a fleet report from a spool file into output_path and return its
+    page count. Module-level and free of app imports so it can run in the
+    process pool.
+    """
+    return FleetReportPDFGenerator().generate_report(
+        read_spooled_histories(spool_path),
+        output_path,
+        title=title,
+        group_by=group_by,
+        history_count=history_count
     )
@@ -1,67 +1,119 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, BackgroundTasks, Header
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-from typing import List
+import os
+from typing import Literal
+from datetime import date, datetime
 from app.core.database import get_db
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.auth.dependencies import get_current_user, require_mantenimiento_or_admin
-from app.user.user import User, user_assignments
-from app.user.schemas import UserRole
+from app.user.user import User
 from app.maintenance_history import service
 from app.maintenance_history.schemas import (
     MaintenanceHistoryResponse,
+    MaintenanceHistoryListResponse,
     GenerateHistoryRequest,
-    GenerateHistoryResponse
+    HistoryJobResponse,
+    PartUsageResponse,
+    HistorySummaryResponse,
+    AircraftTimelineResponse,
+    HistoryItemsResponse
 )
-from app.maintenance_history.models import MaintenanceHistory
-from app.maintenance_history import pdf_generator
+from app.maintenance_history.models import MaintenanceHistory, ACTIVE_HISTORY_JOB_STATUSES
+from app.maintenance_history.jobs import run_history_job
+from app.maintenance_history import pdf_cache, export, tabular_export, fleet_report, parts
 
 router = APIRouter(prefix="/api", tags=["maintenance_histories"])
 
+# Suggested polling interval for generation jobs
+HISTORY_JOB_POLL_SECONDS = 2
+
 
 @router.post(
     "/chats/{chat_id}/generate-history",
-    response_model=GenerateHistoryResponse,
-    status_code=status.HTTP_201_CREATED
+    response_model=HistoryJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
 )
 async def generate_maintenance_history(
     chat_id: int,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    full: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_mantenimiento_or_admin)
 ):
     """
-    Generate maintenance history from chat conversation using AI
+    Queue the generation of the maintenance history of a chat using AI
     Only mantenimiento and admin can generate histories
+    
+    A chat that already has a history gets it updated with the messages sent
+    since it was last generated; `full=true` regenerates it from the whole
+    conversation.
+    
+    Returns the generation job; poll GET /api/history-jobs/{job_id} until its
+    status is `done` (the history is in `history_id`) or `failed`. Repeated
+    requests while a job is running return that same job.
     """
     try:
-        history = await service.generate_history_from_chat(
+        job, created = await service.enqueue_history_job(
             db=db,
             chat_id=chat_id,
             user_id=current_user.id
         )
-        return GenerateHistoryResponse(
-            history_id=history.id,
-            message="Histórico generado exitosamente"
-        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
-    except Exception as e:
+    await db.commit()
+    
+    if created:
+        background_tasks.add_task(run_history_job, job.id, chat_id, current_user.id, full)
+    
+    response.headers["Location"] = f"/api/history-jobs/{job.id}"
+    response.headers["Retry-After"] = str(HISTORY_JOB_POLL_SECONDS)
+    return job
+
+
+@router.get(
+    "/history-jobs/{job_id}",
+    response_model=HistoryJobResponse
+)
+async def get_history_job(
+    job_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the status of a maintenance history generation job
+    """
+    job = await service.get_history_job(
+        db=db,
+        job_id=job_id,
+        user_id=current_user.id
+    )
+    await db.commit()
+    if not job:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al generar histórico: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trabajo no encontrado"
         )
+    if job.status in ACTIVE_HISTORY_JOB_STATUSES:
+        response.headers["Retry-After"] = str(HISTORY_JOB_POLL_SECONDS)
+    return job
 
 
 @router.get(
     "/histories",
-    response_model=List[MaintenanceHistoryResponse]
+    response_model=MaintenanceHistoryListResponse
 )
 async def get_maintenance_histories(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -70,42 +122,261 @@ async def get_maintenance_histories(
     - Administrador: sees all histories
     - Oficinista: sees histories from assigned operarios
     - Mantenimiento: sees only own histories
+    
+    Results are newest first. When more pages exist, the cursor for the next
+    one is returned in `next_cursor` and in the X-Next-Cursor header.
+    """
+    histories, next_cursor = await service.get_histories_page(
+        db=db,
+        user=current_user,
+        cursor=cursor,
+        limit=limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return MaintenanceHistoryListResponse(
+        histories=[MaintenanceHistoryResponse.model_validate(history) for history in histories],
+        next_cursor=next_cursor
+    )
+
+
+@router.get(
+    "/histories/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/zip": {}}}}
+)
+async def export_maintenance_histories(
+    registration: str | None = None,
+    airplane_model: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export the PDFs of many maintenance histories as a single ZIP archive
+    Visible histories follow the same rules as GET /api/histories, narrowed
+    by aircraft registration or model and by creation date (inclusive).
+    
+    The archive is streamed as the PDFs are rendered (or read from the PDF
+    cache), so large exports start at once and use constant memory.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from debe ser anterior a date_to"
+        )
+    
+    query = service.filter_histories_query(
+        service.scoped_histories_query(current_user),
+        registration=registration,
+        airplane_model=airplane_model,
+        date_from=date_from,
+        date_to=date_to
+    )
+    filename = f"historicos_{datetime.utcnow():%Y%m%d_%H%M%S}.zip"
+    return StreamingResponse(
+        export.stream_histories_zip(query),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get(
+    "/histories/export/{dataset}",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in tabular_export.EXPORT_FORMATS.values()}}}
+)
+async def export_maintenance_histories_table(
+    dataset: Literal["histories", "actions", "parts"],
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    registration: str | None = None,
+    airplane_model: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Export maintenance histories as a table for spreadsheets and BI tools
+    - histories: one row per history, with its aircraft info
+    - actions: one row per maintenance action
+    - parts: one row per part used
+    
+    Visible histories and filters are the same as GET /api/histories/export.
+    Rows are streamed in chunks, oldest first, as CSV, NDJSON or Parquet.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from debe ser anterior a date_to"
+        )
+    if format == "parquet" and not tabular_export.parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="La exportación Parquet no está disponible en este servidor"
+        )
+    
+    query = service.filter_histories_query(
+        service.scoped_histories_query(current_user),
+        registration=registration,
+        airplane_model=airplane_model,
+        date_from=date_from,
+        date_to=date_to
+    )
+    filename = f"historicos_{dataset}_{datetime.utcnow():%Y%m%d_%H%M%S}.{format}"
+    return StreamingResponse(
+        tabular_export.stream_dataset(query, dataset, format),
+        media_type=tabular_export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get(
+    "/histories/fleet-report",
+    response_class=FileResponse,
+    responses={200: {"content": {"application/pdf": {}}}}
+)
+async def export_fleet_report(
+    group_by: Literal["registration", "month"] = "registration",
+    registration: str | None = None,
+    airplane_model: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """
-    if current_user.role == UserRole.ADMINISTRADOR.value:
-        # Admin sees all histories
-        result = await db.execute(
-            select(MaintenanceHistory)
-            .order_by(MaintenanceHistory.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-        )
-        histories = result.scalars().all()
-        
-    elif current_user.role == UserRole.OFICINISTA.value:
-        # Oficinista sees histories from assigned operarios
-        result = await db.execute(
-            select(MaintenanceHistory)
-            .join(
-                user_assignments,
-                MaintenanceHistory.user_id == user_assignments.c.operario_id
-            )
-            .where(user_assignments.c.oficinista_id == current_user.id)
-            .order_by(MaintenanceHistory.created_at.desc())
-            .offset(skip)
-            .limit(limit)
-        )
-        histories = result.scalars().all()
-        
-    else:
-        # Mantenimiento sees only own histories
-        histories = await service.get_histories_by_user(
+    Export many maintenance histories as a single PDF report
+    Histories are grouped by aircraft registration or by month; visible
+    histories and filters are the same as GET /api/histories/export.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from debe ser anterior a date_to"
+        )
+    
+    query = service.filter_histories_query(
+        service.scoped_histories_query(current_user),
+        registration=registration,
+        airplane_model=airplane_model,
+        date_from=date_from,
+        date_to=date_to
+    )
+    try:
+        report_path = await fleet_report.build_fleet_report(
             db=db,
-            user_id=current_user.id,
-            skip=skip,
-            limit=limit
+            query=query,
+            group_by=group_by,
+            title="Informe de flota"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al generar PDF: {str(e)}"
+        )
+    
+    if not report_path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No hay históricos para el informe"
+        )
+    
+    filename = f"informe_flota_{datetime.utcnow():%Y%m%d_%H%M%S}.pdf"
+    return FileResponse(
+        report_path,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+        background=BackgroundTask(os.unlink, report_path)
+    )
+
+
+@router.get(
+    "/parts/usage",
+    response_model=PartUsageResponse
+)
+async def get_parts_usage(
+    group_by: Literal["part", "model", "registration", "month"] = "part",
+    part_number: str | None = None,
+    airplane_model: str | None = None,
+    registration: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Aggregate the parts used in maintenance histories
+    Returns the total quantity and the number of histories per part, aircraft
+    model, registration or month, largest first, over the histories visible
+    to the user (same rules as GET /api/histories). Part numbers, models and
+    registrations are matched ignoring case and extra spaces.
+    
+    Example: how many of part X were used on A320s this quarter:
+    ?group_by=part&part_number=X&airplane_model=A320&date_from=2026-07-01&date_to=2026-09-30
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from debe ser anterior a date_to"
         )
     
-    return histories
+    rows = await parts.get_parts_usage(
+        db=db,
+        user=current_user,
+        group_by=group_by,
+        part_number=part_number,
+        airplane_model=airplane_model,
+        registration=registration,
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit
+    )
+    return PartUsageResponse(group_by=group_by, rows=rows)
+
+
+@router.get(
+    "/aircraft/timeline",
+    response_model=AircraftTimelineResponse
+)
+async def get_aircraft_timeline(
+    response: Response,
+    registration: str | None = None,
+    airplane_model: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Maintenance timeline of an aircraft, by registration and/or model
+    (case insensitive), over the histories visible to the user (same rules
+    as GET /api/histories).
+    
+    Rows are summaries with the number of actions and parts; expand one with
+    GET /api/histories/{history_id}/items. Results are newest first. When
+    more pages exist, the cursor for the next one is returned in
+    `next_cursor` and in the X-Next-Cursor header.
+    """
+    if not registration and not airplane_model:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indica la matrícula o el modelo del avión"
+        )
+    
+    histories, next_cursor = await service.get_aircraft_timeline(
+        db=db,
+        user=current_user,
+        registration=registration,
+        airplane_model=airplane_model,
+        cursor=cursor,
+        limit=limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return AircraftTimelineResponse(histories=histories, next_cursor=next_cursor)
 
 
 @router.get(
@@ -133,6 +404,32 @@ async def get_maintenance_history(
     return history
 
 
+@router.get(
+    "/histories/{history_id}/items",
+    response_model=HistoryItemsResponse
+)
+async def get_maintenance_history_items(
+    history_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the actions and parts of a maintenance history visible to the user
+    (the lazy expansion of an aircraft timeline row)
+    """
+    items = await service.get_history_items(
+        db=db,
+        user=current_user,
+        history_id=history_id
+    )
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Histórico no encontrado"
+        )
+    return items
+
+
 @router.get(
     "/chats/{chat_id}/history",
     response_model=MaintenanceHistoryResponse
@@ -180,21 +477,32 @@ async def delete_maintenance_history(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Histórico no encontrado"
         )
+    await pdf_cache.discard_history_pdfs(history_id)
     return None
 
 
 @router.get(
     "/histories/{history_id}/pdf",
-    response_class=StreamingResponse
+    response_class=FileResponse,
+    responses={304: {"description": "The cached copy identified by If-None-Match is current"}}
 )
 async def export_history_pdf(
     history_id: int,
+    include_images: bool = False,
+    if_none_match: str | None = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Export maintenance history as PDF
     All authenticated users can export histories they have access to
+    
+    With `include_images=true` the photos of the chat (the technician's and
+    the annotated ones) are added, downsampled and embedded once each.
+    
+    The PDF is rendered once per version of the history and served from a
+    disk cache afterwards. Its ETag changes with the history, so clients can
+    revalidate with If-None-Match and get 304 Not Modified.
     """
     # Get the history
     history = await service.get_history_by_id(
@@ -209,35 +517,28 @@ async def export_history_pdf(
             detail="Histórico no encontrado"
         )
     
-    try:
-        # Generate PDF
-        pdf_buffer = pdf_generator.generate_maintenance_history_pdf(
-            title=history.title,
-            summary=history.summary,
-            created_at=history.created_at,
-            aircraft_info=history.aircraft_info,
-            maintenance_actions=history.maintenance_actions,
-            parts_used=history.parts_used
-        )
-        
-        # Create safe filename
-        safe_title = "".join(c for c in history.title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        safe_title = safe_title.replace(' ', '_')[:50]  # Limit length
-        filename = f"informe_{safe_title}_{history_id}.pdf"
-        
-        # Return PDF as streaming response
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
+    images = await service.get_history_images(db, history) if include_images else []
+    
+    etag = f'"{pdf_cache.pdf_cache_key(history, bool(images))}"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
     
+    try:
+        pdf_path = await pdf_cache.get_history_pdf(history, images)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al generar PDF: {str(e)}"
         )
-
-
+    
+    filename = pdf_cache.pdf_filename(history)
+    
+    return FileResponse(
+        pdf_path,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            **cache_headers
+        }
+    )
@@ -39,6 +39,7 @@ class MaintenanceHistoryResponse(BaseModel):
     aircraft_info: Optional[Dict[str, Any]] = None
     maintenance_actions: Optional[List[Dict[str, Any]]] = None
     parts_used: Optional[List[Dict[str, Any]]] = None
+    last_message_id: Optional[int] = None  # Last chat message covered by the history
     created_at: datetime
     updated_at: datetime
 
@@ -46,12 +47,65 @@ class MaintenanceHistoryResponse(BaseModel):
         from_attributes = True
 
 
+class MaintenanceHistoryListResponse(BaseModel):
+    histories: List[MaintenanceHistoryResponse]
+    next_cursor: Optional[str] = None
+
+
 class GenerateHistoryRequest(BaseModel):
     """Request to generate maintenance history from chat"""
     pass
 
 
-class GenerateHistoryResponse(BaseModel):
-    """Response after generating history"""
-    history_id: int
-    message: str
+class HistoryJobResponse(BaseModel):
+    """Status of a maintenance history generation job"""
+    id: int
+    chat_id: int
+    status: str  # pending, processing, done or failed
+    history_id: Optional[int] = None  # Set when the job is done
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PartUsageRow(BaseModel):
+    """Parts usage of one group"""
+    group: Optional[str] = None  # Part number (or name), aircraft model, registration or month (YYYY-MM)
+    part_name: Optional[str] = None  # Only when grouping by part
+    total_quantity: int
+    history_count: int
+
+
+class PartUsageResponse(BaseModel):
+    """Aggregated parts usage"""
+    group_by: str
+    rows: List[PartUsageRow]
+
+
+class HistorySummaryResponse(BaseModel):
+    """Maintenance history without its actions and parts (aircraft timeline rows)"""
+    id: int
+    chat_id: int
+    user_id: int
+    title: str
+    summary: str
+    aircraft_info: Optional[Dict[str, Any]] = None
+    action_count: int
+    part_count: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class AircraftTimelineResponse(BaseModel):
+    histories: List[HistorySummaryResponse]
+    next_cursor: Optional[str] = None
+
+
+class HistoryItemsResponse(BaseModel):
+    """Actions and parts of a maintenance history"""
+    id: int
+    maintenance_actions: Optional[List[Dict[str, Any]]] = None
+    parts_used: Optional[List[Dict[str, Any]]] = None
@@ -1,12 +1,23 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, select
+from sqlalchemy import desc, select, update, func, and_, true, literal_column, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, timedelta
 from typing import List, Optional
-from app.maintenance_history.models import MaintenanceHistory
+from app.maintenance_history.models import (
+    MaintenanceHistory, MaintenanceHistoryJob, HistoryJobStatus, ACTIVE_HISTORY_JOB_STATUSES,
+    ACTIVE_HISTORY_JOB_PREDICATE
+)
 from app.maintenance_history.schemas import MaintenanceHistoryCreate
+from app.maintenance_history.merge import merge_actions, merge_parts, merge_aircraft_info
+from app.maintenance_history.parts import sync_history_parts
+from app.maintenance_history.tabular_export import json_array
 from app.assistant.chat.chat import Chat
-from app.assistant.message.message import Message
+from app.assistant.message.message import Message, MessageRole, MessageStatus
 from app.core.config import settings
+from app.core.pagination import DEFAULT_PAGE_SIZE, keyset_page, split_page
+from app.user.user import User, user_assignments
+from app.user.schemas import UserRole
 import google.generativeai as genai
 import json
 
@@ -15,67 +26,140 @@ import json
 genai.configure(api_key=settings.GOOGLE_API_KEY)
 
 
-async def generate_history_from_chat(
+MIN_HISTORY_MESSAGES = 2
+NOT_ENOUGH_MESSAGES = "El chat debe tener al menos 1 intercambio (2 mensajes) para generar un histórico"
+STALE_JOB_ERROR = "Generation did not finish in time"
+
+
+async def _expire_stale_jobs(db: AsyncSession, *criteria) -> None:
+    """Mark the matching active jobs as failed when their worker died before finishing"""
+    await db.execute(
+        update(MaintenanceHistoryJob)
+        .where(
+            *criteria,
+            MaintenanceHistoryJob.status.in_(ACTIVE_HISTORY_JOB_STATUSES),
+            MaintenanceHistoryJob.updated_at < func.now() - timedelta(seconds=2 * settings.HISTORY_JOB_TIMEOUT)
+        )
+        .values(status=HistoryJobStatus.FAILED, error=STALE_JOB_ERROR)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def enqueue_history_job(
     db: AsyncSession,
     chat_id: int,
     user_id: int
-) -> MaintenanceHistory:
+) -> tuple[MaintenanceHistoryJob, bool]:
     """
-    Generate maintenance history from chat using AI
+    Queue the generation of a chat's maintenance history.
+    Returns the job and whether it was created; a request for a chat that
+    already has a pending or running job gets that job instead, across
+    workers, through the partial unique index on active jobs.
+    The caller commits, and runs the job when it was created.
     """
-    # Get chat and messages
-    chat_result = await db.execute(
-        select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
+    result = await db.execute(
+        select(Chat.id, func.count(Message.id))
+        .outerjoin(Message, and_(Message.chat_id == Chat.id, Message.status == MessageStatus.COMPLETED))
+        .where(Chat.id == chat_id, Chat.user_id == user_id)
+        .group_by(Chat.id)
     )
-    chat = chat_result.scalar_one_or_none()
+    row = result.first()
     
-    if not chat:
+    if not row:
         raise ValueError("Chat not found")
+    if row[1] < MIN_HISTORY_MESSAGES:
+        raise ValueError(NOT_ENOUGH_MESSAGES)
     
-    messages_result = await db.execute(
-        select(Message).where(Message.chat_id == chat_id).order_by(Message.created_at)
-    )
-    messages = messages_result.scalars().all()
-    
-    if len(messages) < 2:
-        raise ValueError("El chat debe tener al menos 1 intercambio (2 mensajes) para generar un histórico")
+    # A job whose worker died would hold the slot of its chat forever
+    await _expire_stale_jobs(db, MaintenanceHistoryJob.chat_id == chat_id)
     
-    # Build conversation text
-    conversation = "\n\n".join([
-        f"{'USUARIO' if msg.role == 'user' else 'ASISTENTE'}: {msg.content}"
-        for msg in messages
-    ])
+    result = await db.execute(
+        pg_insert(MaintenanceHistoryJob)
+        .values(chat_id=chat_id, user_id=user_id, status=HistoryJobStatus.PENDING)
+        .on_conflict_do_nothing(
+            index_elements=[MaintenanceHistoryJob.chat_id],
+            index_where=text(ACTIVE_HISTORY_JOB_PREDICATE)
+        )
+        .returning(MaintenanceHistoryJob.id)
+    )
+    job_id = result.scalar()
+    created = job_id is not None
     
-    # Create AI prompt
-    prompt = f"""Analiza esta conversación de mantenimiento aeronáutico y genera un histórico estructurado.
+    query = select(MaintenanceHistoryJob)
+    if created:
+        query = query.where(MaintenanceHistoryJob.id == job_id)
+    else:
+        # The active job, or the one it became if it finished since the insert
+        query = (
+            query.where(MaintenanceHistoryJob.chat_id == chat_id)
+            .order_by(MaintenanceHistoryJob.id.desc())
+            .limit(1)
+        )
+    result = await db.execute(query)
+    return result.scalar_one(), created
 
-CONVERSACIÓN:
-{conversation}
 
-Genera un JSON con la siguiente estructura exacta:
-{{
+async def get_history_job(
+    db: AsyncSession,
+    job_id: int,
+    user_id: int
+) -> Optional[MaintenanceHistoryJob]:
+    """
+    Get a history generation job of a user. A job whose worker died is
+    returned as failed, so pollers stop; the caller commits.
+    """
+    await _expire_stale_jobs(
+        db, MaintenanceHistoryJob.id == job_id, MaintenanceHistoryJob.user_id == user_id
+    )
+    result = await db.execute(
+        select(MaintenanceHistoryJob).where(
+            MaintenanceHistoryJob.id == job_id,
+            MaintenanceHistoryJob.user_id == user_id
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+HISTORY_JSON_FORMAT = """{
   "title": "Título breve del mantenimiento (máximo 100 caracteres)",
   "summary": "Resumen ejecutivo de 2-3 líneas explicando qué se hizo",
-  "aircraft_info": {{
+  "aircraft_info": {
     "model": "Modelo de aeronave (o null si no se menciona)",
     "registration": "Matrícula (o null si no se menciona)",
     "operator": "Operador (o null si no se menciona)"
-  }},
+  },
   "maintenance_actions": [
-    {{
+    {
       "action": "Descripción clara de la acción realizada",
       "result": "Resultado de la acción",
       "date": "Fecha si se menciona, null si no"
-    }}
+    }
   ],
   "parts_used": [
-    {{
+    {
       "part_name": "Nombre de la pieza",
       "part_number": "Número de parte si se menciona",
       "quantity": 1
-    }}
+    }
   ]
-}}
+}"""
+
+
+def _conversation_text(messages: List[Message]) -> str:
+    return "\n\n".join([
+        f"{'USUARIO' if msg.role == 'user' else 'ASISTENTE'}: {msg.content}"
+        for msg in messages
+    ])
+
+
+def _full_history_prompt(messages: List[Message]) -> str:
+    return f"""Analiza esta conversación de mantenimiento aeronáutico y genera un histórico estructurado.
+
+CONVERSACIÓN:
+{_conversation_text(messages)}
+
+Genera un JSON con la siguiente estructura exacta:
+{HISTORY_JSON_FORMAT}
 
 REGLAS IMPORTANTES:
 1. Solo incluye información que se mencione EXPLÍCITAMENTE en la conversación
@@ -85,11 +169,39 @@ REGLAS IMPORTANTES:
 5. Solo incluye piezas que realmente se mencionen que fueron utilizadas
 6. Responde SOLO con el JSON, sin texto adicional"""
 
-    # Call Gemini AI
+
+def _incremental_history_prompt(history: MaintenanceHistory, messages: List[Message]) -> str:
+    current = json.dumps({
+        "title": history.title,
+        "summary": history.summary,
+        "aircraft_info": history.aircraft_info,
+        "maintenance_actions": history.maintenance_actions or [],
+        "parts_used": history.parts_used or [],
+    }, ensure_ascii=False)
+    return f"""Actualiza un histórico de mantenimiento aeronáutico con los mensajes nuevos de la conversación.
+
+HISTÓRICO ACTUAL:
+{current}
+
+MENSAJES NUEVOS:
+{_conversation_text(messages)}
+
+Genera un JSON con la siguiente estructura exacta:
+{HISTORY_JSON_FORMAT}
+
+REGLAS IMPORTANTES:
+1. "title" y "summary" describen el mantenimiento completo: el histórico actual más los mensajes nuevos
+2. "maintenance_actions" y "parts_used" contienen SOLO lo que aparece en los mensajes nuevos, sin repetir lo del histórico actual
+3. "aircraft_info" solo con datos mencionados en los mensajes nuevos
+4. Solo incluye información que se mencione EXPLÍCITAMENTE; si no se menciona algo, usa null o lista vacía []
+5. Responde SOLO con el JSON, sin texto adicional"""
+
+
+async def _ask_history_json(prompt: str) -> dict:
+    """Call Gemini and parse the JSON history it answers with"""
     model = genai.GenerativeModel(settings.GEMINI_MODEL)
-    response = model.generate_content(prompt)
+    response = await model.generate_content_async(prompt)
     
-    # Parse JSON response
     try:
         # Extract JSON from response
         response_text = response.text.strip()
@@ -102,43 +214,241 @@ REGLAS IMPORTANTES:
             response_text = response_text[:-3]
         response_text = response_text.strip()
         
-        history_data = json.loads(response_text)
+        return json.loads(response_text)
     except json.JSONDecodeError as e:
         raise ValueError(f"Error al parsear la respuesta de IA: {str(e)}")
+
+
+async def generate_history_from_chat(
+    db: AsyncSession,
+    chat_id: int,
+    user_id: int,
+    full: bool = False
+) -> MaintenanceHistory:
+    """
+    Generate maintenance history from chat using AI.
+    
+    A chat keeps a single history. When it already has one, only the
+    messages after the last one it covers are sent together with the stored
+    history, and the answer is merged into it (see merge.py); `full`
+    regenerates it from the whole conversation instead.
+    The history is flushed, not committed; the caller commits.
+    """
+    history = await get_history_by_chat(db, chat_id, user_id)
+    incremental = history is not None and history.last_message_id is not None and not full
     
-    # Create maintenance history
-    history = MaintenanceHistory(
-        chat_id=chat_id,
-        user_id=user_id,
-        title=history_data.get("title", "Histórico de Mantenimiento"),
-        summary=history_data.get("summary", ""),
-        aircraft_info=history_data.get("aircraft_info"),
-        maintenance_actions=history_data.get("maintenance_actions", []),
-        parts_used=history_data.get("parts_used", [])
+    query = (
+        select(Message)
+        .join(Chat, Chat.id == Message.chat_id)
+        .where(
+            Message.chat_id == chat_id,
+            Message.status == MessageStatus.COMPLETED,
+            Chat.user_id == user_id
+        )
+        .order_by(Message.created_at, Message.id)
     )
+    if incremental:
+        query = query.where(Message.id > history.last_message_id)
+    messages_result = await db.execute(query)
+    messages = messages_result.scalars().all()
     
-    db.add(history)
-    await db.commit()
-    await db.refresh(history)
+    if incremental:
+        if not messages:
+            # Nothing new since the last update
+            return history
+        
+        update_data = await _ask_history_json(_incremental_history_prompt(history, messages))
+        history.title = update_data.get("title") or history.title
+        history.summary = update_data.get("summary") or history.summary
+        history.aircraft_info = merge_aircraft_info(history.aircraft_info, update_data.get("aircraft_info"))
+        history.maintenance_actions = merge_actions(history.maintenance_actions, update_data.get("maintenance_actions"))
+        history.parts_used = merge_parts(history.parts_used, update_data.get("parts_used"))
+    else:
+        if len(messages) < MIN_HISTORY_MESSAGES:
+            raise ValueError(NOT_ENOUGH_MESSAGES)
+        
+        history_data = await _ask_history_json(_full_history_prompt(messages))
+        if history is None:
+            history = MaintenanceHistory(chat_id=chat_id, user_id=user_id)
+            db.add(history)
+        history.title = history_data.get("title", "Histórico de Mantenimiento")
+        history.summary = history_data.get("summary", "")
+        history.aircraft_info = history_data.get("aircraft_info")
+        history.maintenance_actions = history_data.get("maintenance_actions", [])
+        history.parts_used = history_data.get("parts_used", [])
+    
+    history.last_message_id = max(msg.id for msg in messages)
+    await db.flush()
+    await sync_history_parts(db, history)
     
     return history
 
 
-async def get_histories_by_user(
+def scoped_histories_query(user: User):
+    """
+    Base query for the histories a user is allowed to see:
+    - Administrador: all histories
+    - Oficinista: histories from assigned operarios
+    - Mantenimiento: only own histories
+    """
+    query = select(MaintenanceHistory)
+    
+    if user.role == UserRole.ADMINISTRADOR.value:
+        return query
+    
+    if user.role == UserRole.OFICINISTA.value:
+        return query.join(
+            user_assignments,
+            MaintenanceHistory.user_id == user_assignments.c.operario_id
+        ).where(user_assignments.c.oficinista_id == user.id)
+    
+    return query.where(MaintenanceHistory.user_id == user.id)
+
+
+def aircraft_field(name: str):
+    """
+    upper(aircraft_info ->> name), with the key inlined in the SQL (not a
+    bound parameter) so the planner matches the expression indexes
+    """
+    return func.upper(MaintenanceHistory.aircraft_info[literal_column(f"'{name}'")].astext)
+
+
+def filter_histories_query(
+    query,
+    registration: Optional[str] = None,
+    airplane_model: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+):
+    """
+    Narrow a histories query by aircraft (registration or model, case
+    insensitive) and by creation date (both ends inclusive)
+    """
+    if registration:
+        query = query.where(aircraft_field("registration") == registration.upper())
+    if airplane_model:
+        query = query.where(aircraft_field("model") == airplane_model.upper())
+    if date_from:
+        query = query.where(MaintenanceHistory.created_at >= date_from)
+    if date_to:
+        query = query.where(MaintenanceHistory.created_at < date_to + timedelta(days=1))
+    return query
+
+
+async def get_histories_page(
     db: AsyncSession,
-    user_id: int,
-    skip: int = 0,
-    limit: int = 100
-) -> List[MaintenanceHistory]:
-    """Get all maintenance histories for a user"""
+    user: User,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[List[MaintenanceHistory], Optional[str]]:
+    """Get one page of the histories visible to a user, newest first, and the next cursor"""
+    if user.role == UserRole.OFICINISTA.value:
+        query = oficinista_page_candidates_query(user, cursor, limit)
+    else:
+        query = scoped_histories_query(user)
+    
     result = await db.execute(
-        select(MaintenanceHistory)
-        .where(MaintenanceHistory.user_id == user_id)
-        .order_by(desc(MaintenanceHistory.created_at))
-        .offset(skip)
-        .limit(limit)
+        keyset_page(query, MaintenanceHistory.created_at, MaintenanceHistory.id, cursor, limit)
     )
-    return result.scalars().all()
+    return split_page(list(result.scalars().all()), limit)
+
+
+def oficinista_page_candidates_query(user: User, cursor: Optional[str], limit: int):
+    """
+    Histories that can appear on an oficinista's next page.
+    Reads at most one page per assigned operario through the
+    (user_id, created_at, id) index, so the final merge only sorts
+    operarios x page size rows regardless of how deep the cursor is.
+    """
+    operarios = (
+        select(user_assignments.c.operario_id)
+        .where(user_assignments.c.oficinista_id == user.id)
+        .subquery()
+    )
+    per_operario = keyset_page(
+        select(MaintenanceHistory.id)
+        .where(MaintenanceHistory.user_id == operarios.c.operario_id),
+        MaintenanceHistory.created_at, MaintenanceHistory.id, cursor, limit
+    ).lateral()
+    
+    return select(MaintenanceHistory).where(
+        MaintenanceHistory.id.in_(
+            select(per_operario.c.id).select_from(operarios).join(per_operario, true())
+        )
+    )
+
+
+def aircraft_timeline_query(
+    user: User,
+    registration: Optional[str],
+    airplane_model: Optional[str],
+    cursor: Optional[str],
+    limit: int
+):
+    """
+    One keyset page of timeline summaries: the histories of an aircraft
+    read newest first through its expression index, with the actions and
+    parts only counted
+    """
+    query = filter_histories_query(
+        scoped_histories_query(user),
+        registration=registration,
+        airplane_model=airplane_model
+    ).with_only_columns(
+        MaintenanceHistory.id,
+        MaintenanceHistory.chat_id,
+        MaintenanceHistory.user_id,
+        MaintenanceHistory.title,
+        MaintenanceHistory.summary,
+        MaintenanceHistory.aircraft_info,
+        func.coalesce(func.jsonb_array_length(json_array(MaintenanceHistory.maintenance_actions)), 0).label("action_count"),
+        func.coalesce(func.jsonb_array_length(json_array(MaintenanceHistory.parts_used)), 0).label("part_count"),
+        MaintenanceHistory.created_at,
+        MaintenanceHistory.updated_at
+    )
+    return keyset_page(query, MaintenanceHistory.created_at, MaintenanceHistory.id, cursor, limit)
+
+
+async def get_aircraft_timeline(
+    db: AsyncSession,
+    user: User,
+    registration: Optional[str] = None,
+    airplane_model: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[List[dict], Optional[str]]:
+    """
+    One page of the histories of an aircraft (by registration and/or model)
+    visible to a user, newest first, and the next cursor.
+    The actions and parts of each are fetched with get_history_items.
+    """
+    result = await db.execute(
+        aircraft_timeline_query(user, registration, airplane_model, cursor, limit)
+    )
+    return split_page(
+        [dict(row) for row in result.mappings().all()],
+        limit,
+        key=lambda row: (row["created_at"], row["id"])
+    )
+
+
+async def get_history_items(
+    db: AsyncSession,
+    user: User,
+    history_id: int
+) -> Optional[dict]:
+    """Actions and parts of a history visible to a user (the expansion of a timeline row)"""
+    result = await db.execute(
+        scoped_histories_query(user)
+        .where(MaintenanceHistory.id == history_id)
+        .with_only_columns(
+            MaintenanceHistory.id,
+            MaintenanceHistory.maintenance_actions,
+            MaintenanceHistory.parts_used
+        )
+    )
+    row = result.mappings().one_or_none()
+    return dict(row) if row else None
 
 
 async def get_history_by_id(
@@ -156,17 +466,54 @@ async def get_history_by_id(
     return result.scalar_one_or_none()
 
 
+async def get_history_images(
+    db: AsyncSession,
+    history: MaintenanceHistory
+) -> List[dict]:
+    """
+    Photos of the conversation a history covers, oldest first, as
+    {"path", "caption"}: the technician's uploads and the annotated copies
+    returned by the assistant
+    """
+    query = (
+        select(Message.role, Message.image_path, Message.created_at)
+        .where(
+            Message.chat_id == history.chat_id,
+            Message.status == MessageStatus.COMPLETED,
+            Message.has_image == True,
+            Message.image_path.is_not(None)
+        )
+        .order_by(Message.created_at, Message.id)
+    )
+    if history.last_message_id:
+        query = query.where(Message.id <= history.last_message_id)
+    
+    result = await db.execute(query)
+    return [
+        {
+            "path": row.image_path,
+            "caption": (
+                "Foto del técnico" if row.role == MessageRole.USER else "Imagen anotada por el asistente"
+            ) + f" - {row.created_at:%d/%m/%Y %H:%M}"
+        }
+        for row in result.all()
+    ]
+
+
 async def get_history_by_chat(
     db: AsyncSession,
     chat_id: int,
     user_id: int
 ) -> Optional[MaintenanceHistory]:
-    """Get maintenance history for a specific chat"""
+    """Get maintenance history for a specific chat (the latest, for chats from before one history per chat)"""
     result = await db.execute(
-        select(MaintenanceHistory).where(
+        select(MaintenanceHistory)
+        .where(
             MaintenanceHistory.chat_id == chat_id,
             MaintenanceHistory.user_id == user_id
         )
+        .order_by(MaintenanceHistory.created_at.desc(), MaintenanceHistory.id.desc())
+        .limit(1)
     )
     return result.scalar_one_or_none()
 
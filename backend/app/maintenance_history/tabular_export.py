@@ -0,0 +1,195 @@
+"""
+Tabular export of maintenance histories (CSV, NDJSON, Parquet)
+The JSONB fields are flattened in SQL into one of three datasets:
+- histories: one row per history, with its aircraft info
+- actions: one row per entry of maintenance_actions
+- parts: one row per entry of parts_used
+Rows are read through a server-side cursor and encoded chunk by chunk
+(Parquet as one row group per chunk), so memory is bounded by the chunk
+size, not by the size of the export.
+"""
+import asyncio
+import csv
+import io
+import json
+from typing import AsyncIterator
+from sqlalchemy import DateTime, Integer, case, column, func, true, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.database import AsyncSessionLocal
+from app.maintenance_history.models import MaintenanceHistory
+
+EXPORT_ROWS_PER_CHUNK = 5000
+
+EXPORT_DATASETS = ("histories", "actions", "parts")
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    """Parquet export needs the optional pyarrow package"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _aircraft_field(name: str):
+    return MaintenanceHistory.aircraft_info[name].astext
+
+
+def json_array(col):
+    """The column when it holds a JSON array, NULL otherwise (NULL, JSON null, or a stray object)"""
+    return case((func.jsonb_typeof(col) == "array", col))
+
+
+def _history_columns() -> list:
+    return [
+        MaintenanceHistory.id.label("history_id"),
+        MaintenanceHistory.created_at,
+        _aircraft_field("registration").label("registration"),
+        _aircraft_field("model").label("aircraft_model"),
+    ]
+
+
+def dataset_query(query, dataset: str):
+    """
+    Turn a (scoped, filtered) select of MaintenanceHistory into the rows of
+    a dataset, ordered by history
+    """
+    if dataset == "histories":
+        return query.with_only_columns(
+            *_history_columns(),
+            MaintenanceHistory.updated_at,
+            _aircraft_field("operator").label("operator"),
+            MaintenanceHistory.chat_id,
+            MaintenanceHistory.user_id,
+            MaintenanceHistory.title,
+            MaintenanceHistory.summary,
+            func.coalesce(func.jsonb_array_length(json_array(MaintenanceHistory.maintenance_actions)), 0).label("action_count"),
+            func.coalesce(func.jsonb_array_length(json_array(MaintenanceHistory.parts_used)), 0).label("part_count"),
+        ).order_by(MaintenanceHistory.created_at, MaintenanceHistory.id)
+
+    source = MaintenanceHistory.maintenance_actions if dataset == "actions" else MaintenanceHistory.parts_used
+    item = (
+        func.jsonb_array_elements(json_array(source))
+        .table_valued(column("value", JSONB), with_ordinality="position")
+        .render_derived()
+        .lateral()
+    )
+    if dataset == "actions":
+        fields = [
+            item.c.value["action"].astext.label("action"),
+            item.c.value["result"].astext.label("result"),
+            item.c.value["date"].astext.label("date"),
+        ]
+    else:
+        fields = [
+            item.c.value["part_name"].astext.label("part_name"),
+            item.c.value["part_number"].astext.label("part_number"),
+            item.c.value["quantity"].astext.label("quantity"),
+        ]
+    return (
+        query.with_only_columns(*_history_columns(), type_coerce(item.c.position, Integer).label("position"), *fields)
+        .join(item, true())
+        .order_by(MaintenanceHistory.created_at, MaintenanceHistory.id, item.c.position)
+    )
+
+
+class _ParquetSink:
+    """Write-only file object that hands out what pyarrow has written so far"""
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._position += len(data)
+        return self._buffer.write(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer = io.BytesIO()
+        return data
+
+
+def _arrow_schema(statement):
+    """Explicit Parquet schema, so chunks whose first rows are NULL keep the column types"""
+    import pyarrow as pa
+
+    fields = []
+    for name, col in statement.selected_columns.items():
+        if isinstance(col.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(col.type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _csv_chunk(rows: list) -> bytes:
+    out = io.StringIO()
+    csv.writer(out).writerows(
+        [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+        for row in rows
+    )
+    return out.getvalue().encode()
+
+
+def _ndjson_chunk(rows: list[dict]) -> bytes:
+    return "".join(json.dumps(row, default=str, ensure_ascii=False) + "\n" for row in rows).encode()
+
+
+async def stream_dataset(query, dataset: str, export_format: str) -> AsyncIterator[bytes]:
+    """
+    Yield the rows of a dataset encoded as `export_format`. Runs in its own
+    session (the response is streamed after the request's session is
+    closed) and reads with a server-side cursor.
+    """
+    statement = dataset_query(query, dataset).execution_options(yield_per=EXPORT_ROWS_PER_CHUNK)
+    names = list(statement.selected_columns.keys())
+
+    if export_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _arrow_schema(statement)
+        sink = _ParquetSink()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    elif export_format == "csv":
+        yield _csv_chunk([names])
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement)
+        async for partition in result.partitions():
+            if export_format == "csv":
+                yield _csv_chunk(partition)
+            elif export_format == "ndjson":
+                yield _ndjson_chunk([dict(zip(names, row)) for row in partition])
+            else:
+                batch = pa.RecordBatch.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(zip(*partition), schema)],
+                    schema=schema
+                )
+                # Encoding and compression run in C++ without the GIL
+                await asyncio.to_thread(writer.write_batch, batch)
+                yield sink.take()
+
+    if export_format == "parquet":
+        writer.close()
+        yield sink.take()
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Literal
+
+from app.core.database import get_db
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.auth.dependencies import get_current_user
+from app.user.user import User
+from app.search import service
+from app.search.schemas import SearchResponse
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Literal["chat", "message", "history"] | None = None,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Full-text search (Spanish) over chat titles, messages and maintenance
+    histories (title, summary and actions), visible to the user:
+    - Administrador: everything
+    - Oficinista: data of assigned operarios
+    - Mantenimiento: own data
+    
+    `q` accepts web search syntax: words, "exact phrases", OR and -excluded.
+    Filter by `kind` to search only chats, messages or histories.
+    
+    Results are best match first, with the matching fragments in `headline`.
+    When more pages exist, the cursor for the next one is returned in
+    `next_cursor` (and the X-Next-Cursor header).
+    
+    Limit: only the newest 2000 matches of each kind (SEARCH_MAX_MATCHES) are
+    ranked and paged; older matches are never returned. When a search has
+    more, `truncated` is true (and the X-Search-Truncated header is `true`):
+    refine `q` or filter by `kind` to reach older results.
+    """
+    results, next_cursor, truncated = await service.search(
+        db=db,
+        user=current_user,
+        text=q,
+        kinds=(kind,) if kind else service.SEARCH_KINDS,
+        cursor=cursor,
+        limit=limit
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if truncated:
+        response.headers["X-Search-Truncated"] = "true"
+    
+    return SearchResponse(results=results, next_cursor=next_cursor, truncated=truncated)
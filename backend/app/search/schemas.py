@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class SearchResult(BaseModel):
+    """A chat, message or maintenance history matching a search"""
+    kind: str  # chat, message or history
+    id: int
+    chat_id: int
+    title: str  # Chat title, or history title
+    headline: str  # Matching fragments, HTML-escaped, terms wrapped in <mark></mark>
+    rank: float
+    created_at: datetime
+
+
+class SearchResponse(BaseModel):
+    """One page of search results"""
+    results: list[SearchResult]
+    next_cursor: str | None = None
+    # Matches past SEARCH_MAX_MATCHES of some kind were not ranked
+    truncated: bool = False
@@ -0,0 +1,221 @@
+"""
+Full-text search over chats, messages and maintenance histories
+Each table has a stored tsvector column (Spanish configuration) computed by
+PostgreSQL on every write and indexed with GIN, so matching is an index
+lookup however many messages there are. Matches are ranked with ts_rank;
+the texts are read and highlighted (ts_headline re-parses them) for the
+rows of the page only, HTML-escaped so that only the <mark> highlights are
+markup. Pages are keyset cursors on (rank, kind, id).
+"""
+import base64
+from typing import List, Optional
+from fastapi import HTTPException, status
+from sqlalchemy import REAL, and_, case, cast, column, func, literal, select, tuple_, union_all
+from sqlalchemy import text as sql_text
+from sqlalchemy.dialects.postgresql import JSONB, REGCONFIG
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.pagination import DEFAULT_PAGE_SIZE
+from app.assistant.chat.chat import Chat
+from app.assistant.message.message import Message, MessageStatus
+from app.maintenance_history.models import MaintenanceHistory
+from app.maintenance_history.tabular_export import json_array
+from app.user.user import User, user_assignments
+from app.user.schemas import UserRole
+
+SEARCH_CONFIG = "spanish"
+SEARCH_KINDS = ("chat", "message", "history")
+# Matches ranked per kind, newest first; bounds the work of very common terms.
+# Searches with more matches are reported as truncated
+SEARCH_MAX_MATCHES = 2000
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=\" … \""
+
+
+def encode_search_cursor(rank: float, kind: str, row_id: int) -> str:
+    """Encode a result position as an opaque cursor"""
+    raw = f"{rank!r}|{kind}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, str, int]:
+    """Decode a cursor produced by encode_search_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        rank, kind, row_id = raw.split("|")
+        if kind not in SEARCH_KINDS:
+            raise ValueError(kind)
+        return float(rank), kind, int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _scoped(query, owner_col, user: User):
+    """
+    Restrict a query to rows owned by the users whose data a user can see:
+    all for administradores, assigned operarios for oficinistas, own otherwise
+    """
+    if user.role == UserRole.ADMINISTRADOR.value:
+        return query
+    
+    if user.role == UserRole.OFICINISTA.value:
+        return query.join(
+            user_assignments,
+            owner_col == user_assignments.c.operario_id
+        ).where(user_assignments.c.oficinista_id == user.id)
+    
+    return query.where(owner_col == user.id)
+
+
+def search_tsquery(text: str):
+    """tsquery of a search in web search syntax: words, "phrases", OR, -excluded"""
+    return func.websearch_to_tsquery(cast(literal(SEARCH_CONFIG), REGCONFIG), text)
+
+
+def search_matches(user: User, tsquery, kinds: tuple = SEARCH_KINDS) -> list:
+    """
+    One SELECT per kind of the rows matching tsquery, with the same columns:
+    kind, id, chat_id, rank and created_at (texts are read for the page only)
+    """
+    selects = []
+    if "chat" in kinds:
+        selects.append(_scoped(
+            select(
+                literal("chat").label("kind"),
+                Chat.id,
+                Chat.id.label("chat_id"),
+                func.ts_rank(Chat.__table__.c.search_vector, tsquery).label("rank"),
+                Chat.created_at
+            ).where(Chat.__table__.c.search_vector.op("@@")(tsquery)),
+            Chat.user_id, user
+        ))
+    if "message" in kinds:
+        messages = select(
+            literal("message").label("kind"),
+            Message.id,
+            Message.chat_id,
+            func.ts_rank(Message.__table__.c.search_vector, tsquery).label("rank"),
+            Message.created_at
+        ).where(Message.__table__.c.search_vector.op("@@")(tsquery), Message.status == MessageStatus.COMPLETED)
+        if user.role != UserRole.ADMINISTRADOR.value:
+            messages = messages.where(Message.chat_id.in_(_scoped(select(Chat.id), Chat.user_id, user)))
+        selects.append(messages)
+    if "history" in kinds:
+        selects.append(_scoped(
+            select(
+                literal("history").label("kind"),
+                MaintenanceHistory.id,
+                MaintenanceHistory.chat_id,
+                func.ts_rank(MaintenanceHistory.__table__.c.search_vector, tsquery).label("rank"),
+                # Chats and messages store naive UTC timestamps
+                func.timezone("UTC", MaintenanceHistory.created_at).label("created_at")
+            ).where(MaintenanceHistory.__table__.c.search_vector.op("@@")(tsquery)),
+            MaintenanceHistory.user_id, user
+        ))
+    return selects
+
+
+def escape_html(text):
+    """SQL expression of a text with &, < and > escaped for HTML"""
+    return func.replace(func.replace(func.replace(text, "&", "&amp;"), "<", "&lt;"), ">", "&gt;")
+
+
+def search_query(
+    user: User,
+    text: str,
+    kinds: tuple = SEARCH_KINDS,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+):
+    """
+    One page of the chats, messages and histories visible to a user that
+    match `text`, best first, with one extra row to know whether a next
+    page exists. Only the newest SEARCH_MAX_MATCHES matches of each kind
+    are ranked; `truncated` tells whether any kind had more.
+    """
+    config = cast(literal(SEARCH_CONFIG), REGCONFIG)
+    tsquery = search_tsquery(text)
+    # One match past the limit per kind shows whether the kind was cut short
+    matches = union_all(*(
+        match.add_columns(func.row_number().over(order_by=match.selected_columns.id.desc()).label("position"))
+        .order_by(match.selected_columns.id.desc())
+        .limit(SEARCH_MAX_MATCHES + 1)
+        for match in search_matches(user, tsquery, kinds)
+    )).cte("matches")
+    truncated = select(matches.c.id).where(matches.c.position > SEARCH_MAX_MATCHES).exists()
+
+    page = select(
+        matches.c.kind, matches.c.id, matches.c.chat_id, matches.c.rank, matches.c.created_at
+    ).where(matches.c.position <= SEARCH_MAX_MATCHES)
+    if cursor:
+        rank, kind, row_id = decode_search_cursor(cursor)
+        page = page.where(
+            tuple_(matches.c.rank, matches.c.kind, matches.c.id) < tuple_(cast(rank, REAL), kind, row_id)
+        )
+    page = (
+        page.order_by(matches.c.rank.desc(), matches.c.kind.desc(), matches.c.id.desc())
+        .limit(limit + 1)
+        .subquery("page")
+    )
+
+    # Text of the actions of a history, for its headline
+    action = (
+        func.jsonb_array_elements(json_array(MaintenanceHistory.maintenance_actions))
+        .table_valued(column("value", JSONB))
+        .render_derived()
+    )
+    actions_text = (
+        select(func.string_agg(func.concat_ws(". ", action.c.value["action"].astext, action.c.value["result"].astext), ". "))
+        .scalar_subquery()
+    )
+    headline_text = case(
+        (page.c.kind == "message", Message.content),
+        (page.c.kind == "history", func.concat_ws(". ", MaintenanceHistory.summary, actions_text)),
+        else_=Chat.title
+    )
+    return (
+        select(
+            page.c.kind,
+            page.c.id,
+            page.c.chat_id,
+            func.coalesce(MaintenanceHistory.title, Chat.title).label("title"),
+            func.ts_headline(config, escape_html(headline_text), tsquery, HEADLINE_OPTIONS).label("headline"),
+            page.c.rank,
+            page.c.created_at,
+            truncated.label("truncated")
+        )
+        .select_from(page)
+        .join(Chat, Chat.id == page.c.chat_id)
+        .outerjoin(Message, and_(page.c.kind == "message", Message.id == page.c.id))
+        .outerjoin(MaintenanceHistory, and_(page.c.kind == "history", MaintenanceHistory.id == page.c.id))
+        .order_by(page.c.rank.desc(), page.c.kind.desc(), page.c.id.desc())
+    )
+
+
+async def search(
+    db: AsyncSession,
+    user: User,
+    text: str,
+    kinds: tuple = SEARCH_KINDS,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> tuple[List[dict], Optional[str], bool]:
+    """
+    Search the data visible to a user; returns one page of results, the next
+    cursor and whether matches past SEARCH_MAX_MATCHES (of any kind) were left out
+    """
+    # Whether an index or a newest-first scan is cheaper depends on how common
+    # the terms are, so never let the prepared statement fall back to a
+    # generic plan that cannot see them
+    await db.execute(sql_text("SET LOCAL plan_cache_mode = force_custom_plan"))
+    result = await db.execute(search_query(user, text, kinds, cursor, limit))
+    rows = [dict(row) for row in result.mappings().all()]
+    truncated = bool(rows) and rows[0]["truncated"]
+    if len(rows) <= limit:
+        return rows, None, truncated
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_search_cursor(last["rank"], last["kind"], last["id"]), truncated
@@ -42,6 +42,10 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class UserListResponse(BaseModel):
+    users: list[UserResponse]
+    next_cursor: str | None = None
+
 class UserAssignmentRequest(BaseModel):
     """Request to assign operarios to an oficinista"""
     operario_ids: list[int]
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Boolean, DateTime, Table, Column, ForeignKey
+from sqlalchemy import String, Boolean, DateTime, Table, Column, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -14,6 +14,10 @@ user_assignments = Table(
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Serves the admin user list, keyset-paginated on (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     username: Mapped[str] = mapped_column(String, unique=True, index=True)
@@ -0,0 +1,34 @@
+"""
+Backfill of the history_parts table
+Rebuilds the normalized parts rows of existing maintenance histories in
+batches (one transaction each), so it can run while the app is serving.
+Re-running it is harmless; --after-id resumes from the last id printed.
+
+Usage (from the backend folder):
+    python -m scripts.backfill_history_parts [--batch-size N] [--after-id ID]
+"""
+import argparse
+import asyncio
+
+import app.main  # noqa: F401  Registers every model before the mappers are configured
+from app.core.database import engine
+from app.maintenance_history.parts import BACKFILL_BATCH_SIZE, backfill_history_parts
+
+
+def report(processed: int, last_id: int) -> None:
+    print(f"{processed} histories processed (last id {last_id})")
+
+
+async def main(batch_size: int, after_id: int) -> None:
+    engine.echo = False
+    processed = await backfill_history_parts(batch_size=batch_size, after_id=after_id, on_batch=report)
+    await engine.dispose()
+    print(f"done: {processed} histories")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument("--after-id", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.after_id))
@@ -0,0 +1,110 @@
+"""
+Bulk step insertion benchmark
+Writes the same procedure with one ORM object per step (the previous
+create_chat path) and with bulk_insert_steps, then copies it with copy_steps,
+reporting statements and wall time for each.
+
+Usage (from the backend folder, against a migrated database):
+    python -m scripts.bench_bulk_steps [steps] [rounds]
+
+The benchmark user and chats are deleted at the end.
+"""
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+from sqlalchemy import delete
+
+from app.main import app  # noqa: F401  (configures every mapper)
+from app.core import database
+from app.assistant.chat.chat import Chat
+from app.assistant.step.step import Step
+from app.assistant.step.bulk import bulk_insert_steps, copy_steps
+from app.user.user import User
+from scripts.bench_send_message import StatementTimer
+
+
+def make_procedure(size: int) -> list[dict]:
+    return [
+        {
+            "step_number": number,
+            "title": f"Paso {number}: inspeccionar componente",
+            "description": "Verificar estado, fijaciones y posibles fugas. " * 4,
+        }
+        for number in range(1, size + 1)
+    ]
+
+
+async def orm_insert(db, chat_id: int, steps: list[dict]) -> None:
+    for step_data in steps:
+        db.add(Step(
+            chat_id=chat_id,
+            step_number=step_data["step_number"],
+            title=step_data["title"],
+            description=step_data.get("description")
+        ))
+    await db.commit()
+
+
+async def bulk_insert(db, chat_id: int, steps: list[dict]) -> None:
+    await bulk_insert_steps(db, chat_id, steps)
+    await db.commit()
+
+
+async def run(timer: StatementTimer, user_id: int, label: str, write, rounds: int) -> list[int]:
+    """Run a writer on fresh chats and print its statements and time per procedure"""
+    chat_ids, statements, elapsed = [], [], []
+    for _ in range(rounds):
+        async with database.AsyncSessionLocal() as db:
+            chat = Chat(user_id=user_id, title=f"Benchmark {label}")
+            db.add(chat)
+            await db.commit()
+            chat_ids.append(chat.id)
+
+            timer.reset()
+            started = time.perf_counter()
+            await write(db, chat.id)
+            elapsed.append((time.perf_counter() - started) * 1000)
+            statements.append(timer.count)
+
+    print(f"{label:<12} statements {statistics.mean(statements):>6.0f}   "
+          f"time {statistics.mean(elapsed):>8.2f} ms (median {statistics.median(elapsed):.2f} ms)")
+    return chat_ids
+
+
+async def main(size: int, rounds: int) -> None:
+    database.engine.echo = False
+    timer = StatementTimer(database.engine)
+    procedure = make_procedure(size)
+
+    async with database.AsyncSessionLocal() as db:
+        name = f"bench_{uuid.uuid4().hex[:8]}"
+        user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+
+    print(f"{size} steps per procedure, {rounds} rounds")
+    try:
+        await run(timer, user.id, "orm", lambda db, chat_id: orm_insert(db, chat_id, procedure), rounds)
+        sources = await run(timer, user.id, "bulk", lambda db, chat_id: bulk_insert(db, chat_id, procedure), rounds)
+
+        async def copy(db, chat_id):
+            await copy_steps(db, sources[0], chat_id)
+            await db.commit()
+
+        await run(timer, user.id, "copy", copy, rounds)
+    finally:
+        async with database.AsyncSessionLocal() as db:
+            await db.execute(delete(Chat).where(Chat.user_id == user.id))
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
+        await database.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    ))
@@ -0,0 +1,113 @@
+"""
+Fleet report benchmark
+Renders a fleet report of synthetic histories from a spool file, as the API
+does, and the same report built the usual way (every flowable in one list,
+rendered into a BytesIO), each in a fresh process, and reports time, pages,
+size and peak RSS (total, and on top of what the imports take).
+
+Usage (from the backend folder):
+    python -m scripts.bench_fleet_report [histories]
+"""
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate
+
+from app.maintenance_history.pdf_generator import (
+    FleetReportPDFGenerator, read_spooled_histories, render_fleet_report_pdf
+)
+
+DEFAULT_HISTORIES = 5000
+REGISTRATIONS = 40
+
+
+def make_spool(path: Path, count: int) -> None:
+    """Write synthetic histories, ordered by registration, as the API spools them"""
+    rng = random.Random(42)
+    start = datetime(2023, 1, 1)
+    histories = []
+    for index in range(count):
+        parts = rng.choice([0, 3, 8, 15, 120])
+        histories.append({
+            "id": index + 1,
+            "title": f"Inspección {index + 1}: tren de aterrizaje & frenos",
+            "summary": "Se inspeccionó el tren principal, se sustituyeron los frenos y se verificó el par de apriete. " * 2,
+            "created_at": (start + timedelta(hours=7 * index)).isoformat(),
+            "aircraft_info": {"model": "A320", "registration": f"EC-{index % REGISTRATIONS:03d}", "operator": "Operador"},
+            "maintenance_actions": [
+                {"action": f"Acción {step}: revisar <componente> {step}", "result": "Correcto", "date": None}
+                for step in range(rng.randint(2, 8))
+            ],
+            "parts_used": [
+                {"part_name": f"Pieza {part}", "part_number": f"PN-{part:05d}", "quantity": part % 4 + 1}
+                for part in range(parts)
+            ],
+        })
+    histories.sort(key=lambda history: (history["aircraft_info"]["registration"], history["created_at"]))
+    with path.open("w", encoding="utf-8") as spool:
+        for history in histories:
+            spool.write(json.dumps(history, ensure_ascii=False) + "\n")
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_spooled(spool_path: str, output_path: str, count: int) -> tuple[float, int, float, float]:
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    pages = render_fleet_report_pdf(spool_path, output_path, "Informe de flota", "registration", count)
+    return time.perf_counter() - started, pages, baseline, _peak_rss_mb()
+
+
+def run_in_memory(spool_path: str, output_path: str, count: int) -> tuple[float, int, float, float]:
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    generator = FleetReportPDFGenerator()
+    elements = [
+        flowable
+        for chunk in generator._report_flowables(read_spooled_histories(spool_path), "Informe de flota", "registration", count)
+        for flowable in chunk
+    ]
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2.5*cm, bottomMargin=2.5*cm)
+    doc.build(elements, onFirstPage=generator._add_footer, onLaterPages=generator._add_footer)
+    Path(output_path).write_bytes(buffer.getvalue())
+    return time.perf_counter() - started, doc.page, baseline, _peak_rss_mb()
+
+
+def in_fresh_process(func, *args):
+    """Run func in a new process, so its peak RSS is its own"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(func, *args).result()
+
+
+def main(count: int) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        spool_path = Path(folder) / "histories.jsonl"
+        make_spool(spool_path, count)
+        print(f"histories:        {count} ({spool_path.stat().st_size / 2**20:.1f} MiB spooled)")
+
+        for label, func in (("spooled to file", run_spooled), ("in memory", run_in_memory)):
+            output_path = Path(folder) / f"{func.__name__}.pdf"
+            seconds, pages, baseline, peak_rss = in_fresh_process(func, str(spool_path), str(output_path), count)
+            size = output_path.stat().st_size / 2**20
+            print(
+                f"{label + ':':<18}{seconds:7.1f} s, {pages} pages, {size:.1f} MiB, "
+                f"peak RSS {peak_rss:.0f} MiB (+{peak_rss - baseline:.0f} MiB over the imports)"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_HISTORIES)
@@ -0,0 +1,88 @@
+"""
+Evidence photo benchmark for history PDFs
+Renders a history with camera-sized photos embedded as uploaded (the naive
+way) and as downsampled copies (cold, then with the copies already made),
+and reports PDF size and render time, in total and per included image.
+Half of the photo references repeat an earlier photo, as when the same
+picture is uploaded twice or shown again annotated.
+
+Usage (from the backend folder):
+    python -m scripts.bench_history_pdf_images [photos]
+"""
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from PIL import Image
+
+from app.maintenance_history import pdf_generator
+
+DEFAULT_PHOTOS = 6
+PHOTO_SIZE = (4032, 3024)
+
+HISTORY = {
+    "title": "Sustitución de frenos del tren principal",
+    "summary": "Se sustituyeron los frenos del tren principal y se verificó el par de apriete.",
+    "created_at": datetime(2026, 1, 1, 10, 0),
+    "aircraft_info": {"model": "A320", "registration": "EC-ABC", "operator": "Operador"},
+    "maintenance_actions": [{"action": f"Acción {step}", "result": "Correcto"} for step in range(6)],
+    "parts_used": [{"part_name": f"Pieza {part}", "part_number": f"PN-{part}", "quantity": 1} for part in range(8)],
+}
+
+
+def make_photos(folder: Path, count: int) -> list[str]:
+    """Write camera-sized JPEGs with enough detail to compress like real photos"""
+    paths = []
+    for index in range(count):
+        noise = Image.effect_noise((PHOTO_SIZE[0] // 4, PHOTO_SIZE[1] // 4), 40 + index)
+        photo = Image.merge("RGB", (
+            noise,
+            Image.linear_gradient("L").resize(noise.size),
+            noise.rotate(90, expand=False),
+        )).resize(PHOTO_SIZE)
+        path = folder / f"photo_{index}.jpg"
+        photo.save(path, "JPEG", quality=92)
+        paths.append(str(path))
+    return paths
+
+
+def render(images: list[dict], image_dir: str | None) -> tuple[float, int]:
+    started = time.perf_counter()
+    content = pdf_generator.generate_maintenance_history_pdf(**HISTORY, images=images, image_dir=image_dir).getvalue()
+    return time.perf_counter() - started, len(content)
+
+
+def main(count: int) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        photos = make_photos(Path(folder), count)
+        # Every photo once, then the first half again
+        images = [{"path": path, "caption": f"Foto {index}"} for index, path in enumerate(photos + photos[:count // 2])]
+        uploaded = sum(Path(path).stat().st_size for path in photos) / 2**20
+        print(f"photos:           {count} unique, {len(images)} included, {uploaded:.1f} MiB uploaded")
+
+        base_seconds, base_size = render([], None)
+        print(f"{'no photos:':<18}{base_seconds * 1000:7.0f} ms {base_size / 2**10:9.0f} KiB")
+
+        # Originals passed straight through, as embedding the uploads would do
+        prepare = pdf_generator.prepare_evidence_image
+        pdf_generator.prepare_evidence_image = lambda path, image_dir: path
+        try:
+            naive = render(images, None)
+        finally:
+            pdf_generator.prepare_evidence_image = prepare
+
+        image_dir = str(Path(folder) / "copies")
+        runs = [("as uploaded", naive), ("downsampled", render(images, image_dir)), ("copies reused", render(images, image_dir))]
+        for label, (seconds, size) in runs:
+            per_image_ms = (seconds - base_seconds) * 1000 / len(images)
+            per_image_kib = (size - base_size) / 2**10 / len(images)
+            print(
+                f"{label + ':':<18}{seconds * 1000:7.0f} ms {size / 2**10:9.0f} KiB"
+                f"   per image {per_image_ms:6.1f} ms {per_image_kib:7.1f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PHOTOS)
@@ -0,0 +1,82 @@
+"""
+PDF text extraction benchmark
+Extracts the text of a set of PDFs in-process, one page after another (the
+previous behaviour), and through the process pool with stream_pdf_pages, and
+reports pages per second overall and per core.
+
+Usage (from the backend folder):
+    python -m scripts.bench_pdf_extraction [pdf ...]
+
+Without arguments a set of sample manuals is generated in a temporary folder.
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import PyPDF2
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from app.core.process_pool import get_process_pool, pool_size, run_in_process, shutdown_process_pool
+from app.assistant.pdf_text import count_pdf_pages
+from app.assistant.template_processor import stream_pdf_pages
+
+SAMPLE_DOCUMENTS = 8
+SAMPLE_PAGES = 60
+LINES_PER_PAGE = 50
+
+
+def make_samples(folder: Path) -> list[str]:
+    """Write sample maintenance manuals full of text"""
+    paths = []
+    for document in range(1, SAMPLE_DOCUMENTS + 1):
+        path = folder / f"manual_{document}.pdf"
+        pdf = canvas.Canvas(str(path), pagesize=A4)
+        for page in range(1, SAMPLE_PAGES + 1):
+            for line in range(LINES_PER_PAGE):
+                step = page * LINES_PER_PAGE + line
+                pdf.drawString(40, 800 - line * 15, f"{step}. Retirar el panel de acceso {step} y verificar el par de apriete.")
+            pdf.showPage()
+        pdf.save()
+        paths.append(str(path))
+    return paths
+
+
+def read_in_process(path: str) -> int:
+    with open(path, "rb") as file:
+        return sum(1 for page in PyPDF2.PdfReader(file).pages if page.extract_text() is not None)
+
+
+async def read_streamed(path: str) -> int:
+    return sum([1 async for _ in stream_pdf_pages(path)])
+
+
+async def main(paths: list[str]) -> None:
+    started = time.perf_counter()
+    pages = sum(read_in_process(path) for path in paths)
+    sequential = time.perf_counter() - started
+
+    # Start the pool processes before timing
+    get_process_pool()
+    await asyncio.gather(*(run_in_process(count_pdf_pages, paths[0]) for _ in range(pool_size())))
+
+    started = time.perf_counter()
+    streamed_pages = sum(await asyncio.gather(*(read_streamed(path) for path in paths)))
+    pooled = time.perf_counter() - started
+    shutdown_process_pool()
+
+    assert streamed_pages == pages
+    print(f"documents:        {len(paths)} ({pages} pages)")
+    print(f"in-process:       {pages / sequential:8.1f} pages/s ({sequential:.2f} s, 1 core)")
+    print(f"process pool:     {pages / pooled:8.1f} pages/s ({pooled:.2f} s, {pool_size()} processes)")
+    print(f"pool per core:    {pages / pooled / pool_size():8.1f} pages/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        asyncio.run(main(sys.argv[1:]))
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            asyncio.run(main(make_samples(Path(folder))))
@@ -0,0 +1,119 @@
+"""
+Full-text search benchmark
+Seeds chats and messages with Spanish maintenance vocabulary inside a
+transaction (rolled back at the end) and times the search API query for a
+rare term, a common term and a deep page of the common term, for a
+mantenimiento user and for an administrador.
+
+Usage (from the backend folder, against a migrated database):
+    python -m scripts.bench_search [messages]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import app.main  # noqa: F401  Registers every model before the mappers are configured
+from app.core.config import settings
+from app.user.user import User
+from app.user.schemas import UserRole
+from app.search.service import search
+
+DEFAULT_MESSAGES = 1_000_000
+USERS = 20
+CHATS = 20_000
+RUNS = 5
+DEEP_PAGES = 5
+
+WORDS = [
+    "revisar", "bomba", "hidráulica", "tren", "aterrizaje", "frenos", "presión", "válvula", "sello",
+    "filtro", "combustible", "motor", "turbina", "álabe", "inspección", "boroscopia", "fuga", "aceite",
+    "neumático", "desgaste", "par", "apriete", "cableado", "sensor", "temperatura", "indicación", "cabina",
+    "flap", "actuador", "compuerta", "puerta", "carga", "ventilación", "oxígeno", "extintor", "batería",
+]
+RARE_WORD = "delaminado"
+
+SEED_SQL = [
+    """
+    INSERT INTO users (username, email, hashed_password, role)
+    SELECT 'bench_search_' || g, 'bench_search_' || g || '@example.com', 'x', 'mantenimiento'
+    FROM generate_series(1, :users) AS g
+    """,
+    """
+    INSERT INTO chats (user_id, title, created_at, last_activity_at)
+    SELECT u.id, 'Incidencia ' || (CAST(:words AS text[]))[1 + g % :word_count] || ' ' || g, now(), now()
+    FROM generate_series(1, :chats) AS g
+    JOIN users u ON u.username = 'bench_search_' || (1 + g % :users)
+    """,
+    """
+    INSERT INTO messages (chat_id, role, content, has_image, created_at)
+    SELECT c.id, CASE WHEN g % 2 = 0 THEN 'ASSISTANT' ELSE 'USER' END::messagerole,
+           concat_ws(' ',
+               'Se debe', (CAST(:words AS text[]))[1 + g % :word_count], (CAST(:words AS text[]))[1 + (g / :word_count) % :word_count],
+               'antes de', (CAST(:words AS text[]))[1 + (g / (:word_count * :word_count)) % :word_count], 'del', (CAST(:words AS text[]))[1 + (g / 7) % :word_count],
+               CASE WHEN g % 20000 = 0 THEN :rare END, 'según el manual, tarea ' || g
+           ),
+           false, now() - (g || ' seconds')::interval
+    FROM generate_series(1, :messages) AS g
+    JOIN chats c ON c.id = (SELECT min(id) FROM chats WHERE title LIKE 'Incidencia %') + g % :chats
+    """,
+]
+
+
+async def timed(db: AsyncSession, user: User, query: str, pages: int = 1) -> tuple[float, int]:
+    """Median time of fetching `pages` pages of a search, and the results of the last page"""
+    times = []
+    for _ in range(RUNS):
+        cursor = None
+        started = time.perf_counter()
+        for _ in range(pages):
+            results, cursor, _ = await search(db, user, query, cursor=cursor)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), len(results)
+
+
+async def main(messages: int) -> None:
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            started = time.perf_counter()
+            params = {
+                "users": USERS, "chats": CHATS, "messages": messages, "words": WORDS, "word_count": len(WORDS), "rare": RARE_WORD
+            }
+            for statement in SEED_SQL:
+                await conn.execute(text(statement), params)
+            for table in ("users", "chats", "messages"):
+                await conn.execute(text(f"ANALYZE {table}"))
+            # Merge the rows just written into the GIN index, as autovacuum would
+            for index in ("ix_chats_search_vector", "ix_messages_search_vector"):
+                await conn.execute(text(f"SELECT gin_clean_pending_list('{index}')"))
+            print(f"seeded:           {messages} messages in {CHATS} chats in {time.perf_counter() - started:.0f} s")
+
+            operario_id = (await conn.execute(
+                select(User.id).where(User.username == "bench_search_1")
+            )).scalar_one()
+            users = {
+                "mantenimiento": User(id=operario_id, role=UserRole.MANTENIMIENTO.value),
+                "administrador": User(id=operario_id, role=UserRole.ADMINISTRADOR.value),
+            }
+            async with AsyncSession(bind=conn) as db:
+                for role, user in users.items():
+                    for label, query, pages in (
+                        ("rare term", RARE_WORD, 1),
+                        ("common term", "bomba", 1),
+                        (f"common, {DEEP_PAGES} pages", "bomba", DEEP_PAGES),
+                        ("phrase", '"filtro combustible" -motor', 1),
+                    ):
+                        seconds, count = await timed(db, user, query, pages)
+                        print(f"{role:<14} {label + ':':<18}{seconds * 1000:8.1f} ms ({count} results)")
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MESSAGES))
@@ -0,0 +1,106 @@
+"""
+send_message database benchmark
+Sends messages through the real endpoint with the LLM replaced by an instant
+stub and reports, per turn, the number of SQL statements and the time spent
+waiting on the database.
+
+Usage (from the backend folder, against a migrated database):
+    python -m scripts.bench_send_message [turns]
+
+Needs httpx (listed in requirements.txt) to call the app in-process.
+
+The benchmark user and chat are deleted at the end.
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+from sqlalchemy import event, delete, select
+
+from app.main import app
+from app.core import database
+from app.core.security import create_access_token
+from app.assistant.service import gemini_service
+from app.assistant.chat.chat import Chat
+from app.assistant.message.message import Message
+from app.user.user import User
+
+
+class StatementTimer:
+    """Counts statements and accumulates their execution time on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        self.seconds = 0.0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["bench_started"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.seconds += time.perf_counter() - conn.info.pop("bench_started")
+
+    def reset(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+async def stub_chat(message: str, history: list[dict], chat_context: dict | None = None) -> str:
+    return "Respuesta de prueba"
+
+
+async def main(turns: int) -> None:
+    database.engine.echo = False
+    gemini_service.chat = stub_chat
+    timer = StatementTimer(database.engine)
+
+    async with database.AsyncSessionLocal() as db:
+        name = f"bench_{uuid.uuid4().hex[:8]}"
+        user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+
+    token = create_access_token({"sub": str(user.id)})
+    transport = httpx.ASGITransport(app=app)
+    statements, db_ms, total_ms = [], [], []
+
+    try:
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://bench",
+            headers={"Authorization": f"Bearer {token}"}
+        ) as client:
+            response = await client.post("/api/chats/", data={"chat_data": json.dumps({"title": "Benchmark"})})
+            chat_id = response.json()["id"]
+
+            for turn in range(turns):
+                timer.reset()
+                started = time.perf_counter()
+                response = await client.post(f"/api/chats/{chat_id}/messages", data={"content": f"Mensaje {turn}"})
+                response.raise_for_status()
+                total_ms.append((time.perf_counter() - started) * 1000)
+                statements.append(timer.count)
+                db_ms.append(timer.seconds * 1000)
+    finally:
+        async with database.AsyncSessionLocal() as db:
+            chat_ids = select(Chat.id).where(Chat.user_id == user.id)
+            await db.execute(delete(Message).where(Message.chat_id.in_(chat_ids)))
+            await db.execute(delete(Chat).where(Chat.user_id == user.id))
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
+        await database.engine.dispose()
+
+    print(f"turns:               {turns}")
+    print(f"statements per turn: {statistics.mean(statements):.1f}")
+    print(f"DB time per turn:    {statistics.mean(db_ms):.2f} ms (median {statistics.median(db_ms):.2f} ms)")
+    print(f"request per turn:    {statistics.mean(total_ms):.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
@@ -0,0 +1,276 @@
+"""
+Query plan regression check
+Seeds a local PostgreSQL database, runs EXPLAIN on the hot ORM queries used by
+the routers and fails if any of them falls back to a sequential scan or a sort.
+
+Usage (from the backend folder, against a migrated database):
+    python -m scripts.check_query_plans
+
+All seed data is written inside a transaction that is rolled back at the end.
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import select, update, func, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.pagination import DEFAULT_PAGE_SIZE, encode_cursor, keyset_page
+from app.user.user import User
+from app.user.schemas import UserRole
+from app.assistant.chat.chat import Chat
+from app.assistant.chat.ownership import select_with_owned_chat, owned_chat_exists, lock_owned_chat
+from app.assistant.message.message import Message
+from app.assistant.step.step import Step
+from app.assistant.step.progress import step_progress_statement
+from app.maintenance_history.models import MaintenanceHistory, HistoryPart
+from app.maintenance_history.parts import scoped_parts_query
+from app.search.service import search_matches, search_tsquery
+from app.maintenance_history.service import (
+    scoped_histories_query, oficinista_page_candidates_query, aircraft_timeline_query
+)
+
+SEED_USERS = 50
+CHATS_PER_USER = 100
+MESSAGES_PER_CHAT = 40
+STEPS_PER_CHAT = 10
+PARTS_PER_HISTORY = 3
+
+# Plan nodes that mean the query is not served by an index range scan
+FORBIDDEN_NODES = {"Seq Scan", "Sort", "Incremental Sort"}
+
+SEED_SQL = [
+    """
+    INSERT INTO users (username, email, hashed_password, role)
+    SELECT 'plan_user_' || g, 'plan_user_' || g || '@example.com', 'x', 'mantenimiento'
+    FROM generate_series(1, :users) AS g
+    """,
+    """
+    INSERT INTO chats (user_id, title, created_at, last_activity_at)
+    SELECT u.id, 'Chat ' || g, now() - (g || ' minutes')::interval, now() - (g || ' minutes')::interval
+    FROM users u, generate_series(1, :chats_per_user) AS g
+    WHERE u.username LIKE 'plan_user_%'
+    """,
+    """
+    INSERT INTO messages (chat_id, role, content, has_image, created_at)
+    SELECT c.id, CASE WHEN g % 2 = 0 THEN 'ASSISTANT' ELSE 'USER' END::messagerole,
+           'Mensaje ' || g, false, c.created_at + (g || ' seconds')::interval
+    FROM chats c
+    JOIN users u ON u.id = c.user_id AND u.username LIKE 'plan_user_%'
+    CROSS JOIN generate_series(1, :messages_per_chat) AS g
+    """,
+    """
+    INSERT INTO steps (chat_id, step_number, title, is_completed, created_at)
+    SELECT c.id, g, 'Paso ' || g, g <= :steps_per_chat / 2, c.created_at
+    FROM chats c
+    JOIN users u ON u.id = c.user_id AND u.username LIKE 'plan_user_%'
+    CROSS JOIN generate_series(1, :steps_per_chat) AS g
+    """,
+    """
+    INSERT INTO maintenance_histories (chat_id, user_id, title, summary, aircraft_info, created_at)
+    SELECT c.id, c.user_id, 'Histórico ' || c.id, 'Resumen',
+           jsonb_build_object('registration', 'EC-' || (c.id % 40), 'model', 'A32' || (c.id % 4)), c.created_at
+    FROM chats c
+    JOIN users u ON u.id = c.user_id AND u.username LIKE 'plan_user_%'
+    """,
+    """
+    INSERT INTO history_parts (history_id, user_id, position, part_number, part_name, quantity, aircraft_model, registration, used_at)
+    SELECT h.id, h.user_id, g, 'PN-' || (h.id % 200 + g), 'Pieza', 1, 'A320', 'EC-' || (h.id % 40), h.created_at
+    FROM maintenance_histories h
+    JOIN users u ON u.id = h.user_id AND u.username LIKE 'plan_user_%'
+    CROSS JOIN generate_series(1, :parts_per_history) AS g
+    """,
+]
+
+ANALYZED_TABLES = ["users", "chats", "messages", "steps", "maintenance_histories", "history_parts"]
+
+# With a few rows per key a bitmap scan plus an in-memory sort is cheaper than an
+# ordered index scan, so costs alone would hide missing indexes. Penalising these
+# plan types makes the planner pick them only when no index path exists at all.
+PLANNER_SETTINGS = ["enable_seqscan", "enable_sort", "enable_bitmapscan"]
+
+# Queries whose plan is known to need a sort and is reported without failing
+KNOWN_VIOLATIONS: set[str] = set()
+
+
+def build_queries(user_id: int, chat_id: int) -> dict:
+    """Hot ORM queries, mirroring the statements issued by the routers"""
+    cursor = encode_cursor(datetime.utcnow(), 2**31 - 1)
+    return {
+        "chat ownership check": (
+            select(Chat).where(Chat.id == chat_id, Chat.user_id == user_id)
+        ),
+        "get_chat messages": (
+            select(Chat, Message)
+            .join(Message, Message.chat_id == Chat.id)
+            .where(Chat.id == chat_id, Chat.user_id == user_id)
+            .order_by(Message.created_at.asc())
+        ),
+        "list_messages page": (
+            select(Chat, Message)
+            .join(Message, Message.chat_id == Chat.id)
+            .where(
+                Chat.id == chat_id,
+                Chat.user_id == user_id,
+                tuple_(Message.created_at, Message.id) < (datetime.utcnow(), 2**31 - 1)
+            )
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(51)
+        ),
+        "list_chats": keyset_page(
+            select(Chat).where(Chat.user_id == user_id),
+            Chat.last_activity_at, Chat.id, cursor, DEFAULT_PAGE_SIZE
+        ),
+        "list_steps": (
+            select(Step)
+            .where(Step.chat_id == chat_id, owned_chat_exists(chat_id, user_id))
+            .order_by(Step.step_number)
+        ),
+        "get_current_step": (
+            select_with_owned_chat(chat_id, user_id, Step, Step.id == Chat.current_step_id)
+        ),
+        "complete_step": (
+            update(Step)
+            .where(Step.id == 1, Step.chat_id == chat_id, lock_owned_chat(chat_id, user_id))
+            .values(is_completed=True)
+            .returning(*Step.__table__.c)
+        ),
+        "refresh_step_progress": step_progress_statement(chat_id),
+        "send_message lookup": (
+            select_with_owned_chat(chat_id, user_id, Step, Step.id == Chat.current_step_id, chat_entity=Chat)
+        ),
+        "histories page (mantenimiento)": keyset_page(
+            scoped_histories_query(User(id=user_id, role=UserRole.MANTENIMIENTO.value)),
+            MaintenanceHistory.created_at, MaintenanceHistory.id, cursor, DEFAULT_PAGE_SIZE
+        ),
+        "histories page (administrador)": keyset_page(
+            scoped_histories_query(User(id=user_id, role=UserRole.ADMINISTRADOR.value)),
+            MaintenanceHistory.created_at, MaintenanceHistory.id, cursor, DEFAULT_PAGE_SIZE
+        ),
+        "histories page (oficinista)": keyset_page(
+            oficinista_page_candidates_query(User(id=user_id, role=UserRole.OFICINISTA.value), cursor, DEFAULT_PAGE_SIZE),
+            MaintenanceHistory.created_at, MaintenanceHistory.id, cursor, DEFAULT_PAGE_SIZE
+        ),
+        "admin list_users page": keyset_page(
+            select(User), User.created_at, User.id, cursor, DEFAULT_PAGE_SIZE
+        ),
+        "get_history_by_chat": (
+            select(MaintenanceHistory)
+            .where(
+                MaintenanceHistory.chat_id == chat_id,
+                MaintenanceHistory.user_id == user_id
+            )
+            .order_by(MaintenanceHistory.created_at.desc(), MaintenanceHistory.id.desc())
+            .limit(1)
+        ),
+        "aircraft timeline (registration)": aircraft_timeline_query(
+            User(id=user_id, role=UserRole.ADMINISTRADOR.value), "ec-7", None, cursor, DEFAULT_PAGE_SIZE
+        ),
+        "aircraft timeline (model)": aircraft_timeline_query(
+            User(id=user_id, role=UserRole.ADMINISTRADOR.value), None, "a321", cursor, DEFAULT_PAGE_SIZE
+        ),
+        "aircraft timeline (mantenimiento)": aircraft_timeline_query(
+            User(id=user_id, role=UserRole.MANTENIMIENTO.value), "EC-7", None, cursor, DEFAULT_PAGE_SIZE
+        ),
+        # Rows matched by a search before ranking
+        **{
+            f"search matches ({kind}, {role.value})": search_matches(User(id=user_id, role=role.value), search_tsquery("fuga hidráulica"), (kind,))[0]
+            for kind in ("chat", "message", "history")
+            for role in (UserRole.MANTENIMIENTO, UserRole.ADMINISTRADOR)
+        },
+        # Rows read by get_parts_usage before grouping
+        "parts usage rows (part number)": (
+            scoped_parts_query(User(id=user_id, role=UserRole.ADMINISTRADOR.value), HistoryPart.quantity, HistoryPart.history_id)
+            .where(HistoryPart.part_number == "PN-42", HistoryPart.used_at >= datetime(2026, 1, 1))
+        ),
+        "parts usage rows (aircraft model)": (
+            scoped_parts_query(User(id=user_id, role=UserRole.ADMINISTRADOR.value), HistoryPart.quantity, HistoryPart.history_id)
+            .where(HistoryPart.aircraft_model == "A320", HistoryPart.used_at >= datetime.utcnow())
+        ),
+        "parts usage rows (mantenimiento)": (
+            scoped_parts_query(User(id=user_id, role=UserRole.MANTENIMIENTO.value), HistoryPart.quantity, HistoryPart.history_id)
+            .where(HistoryPart.used_at >= datetime(2026, 1, 1))
+        ),
+    }
+
+
+def _walk_plan(node: dict):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk_plan(child)
+
+
+def find_violations(plan: dict) -> list[str]:
+    """Return a description of every forbidden node in the plan"""
+    violations = []
+    for node in _walk_plan(plan):
+        if node["Node Type"] in FORBIDDEN_NODES:
+            relation = node.get("Relation Name")
+            violations.append(f"{node['Node Type']} on {relation}" if relation else node["Node Type"])
+    return violations
+
+
+async def main() -> int:
+    engine = create_async_engine(settings.DATABASE_URL)
+    failures = 0
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            params = {
+                "users": SEED_USERS,
+                "chats_per_user": CHATS_PER_USER,
+                "messages_per_chat": MESSAGES_PER_CHAT,
+                "steps_per_chat": STEPS_PER_CHAT,
+                "parts_per_history": PARTS_PER_HISTORY,
+            }
+            for statement in SEED_SQL:
+                await conn.execute(text(statement), params)
+            for table in ANALYZED_TABLES:
+                await conn.execute(text(f"ANALYZE {table}"))
+            for setting in PLANNER_SETTINGS:
+                await conn.execute(text(f"SET LOCAL {setting} = off"))
+
+            row = (await conn.execute(
+                select(Chat.user_id, Chat.id)
+                .join(User, User.id == Chat.user_id)
+                .where(User.username == "plan_user_1")
+                .limit(1)
+            )).first()
+            user_id, chat_id = row
+
+            for name, query in build_queries(user_id, chat_id).items():
+                sql = str(query.compile(
+                    dialect=postgresql.dialect(),
+                    compile_kwargs={"literal_binds": True}
+                ))
+                result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+                explain = result.scalar()
+                if isinstance(explain, str):
+                    explain = json.loads(explain)
+                violations = find_violations(explain[0]["Plan"])
+
+                if violations and name in KNOWN_VIOLATIONS:
+                    print(f"known {name}: {', '.join(violations)}")
+                elif violations:
+                    failures += 1
+                    print(f"FAIL  {name}: {', '.join(violations)}")
+                else:
+                    print(f"ok    {name}")
+        finally:
+            await transaction.rollback()
+
+    await engine.dispose()
+
+    if failures:
+        print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} not served by an index")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -3,7 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { isAuthenticated } from '../../auth/services/authService';
 import { getCurrentUser } from '../../profile/services/userService';
 import {
-  getUsers,
+  getAllUsers,
   createUser,
   updateUserAdmin,
   deleteUser,
@@ -44,7 +44,7 @@ function AdminPanel() {
       setError('');
       const [userData, usersData] = await Promise.all([
         getCurrentUser(),
-        getUsers()
+        getAllUsers()
       ]);
       
       // Check if user is admin
@@ -23,13 +23,13 @@ export async function initializeAdmin(userData) {
 }
 
 /**
- * Get all users (admin only)
- * @param {Object} filters - {skip?, limit?, role?, division?, is_active?}
- * @returns {Promise<Array>}
+ * Get one page of users (admin only), newest first
+ * @param {Object} filters - {cursor?, limit?, role?, division?, is_active?}
+ * @returns {Promise<{users: Array, nextCursor: string|null}>}
  */
 export async function getUsers(filters = {}) {
     const params = new URLSearchParams();
-    if (filters.skip !== undefined) params.append('skip', filters.skip);
+    if (filters.cursor) params.append('cursor', filters.cursor);
     if (filters.limit !== undefined) params.append('limit', filters.limit);
     if (filters.role) params.append('role', filters.role);
     if (filters.division) params.append('division', filters.division);
@@ -45,7 +45,24 @@ export async function getUsers(filters = {}) {
         throw new Error(error.detail || 'Failed to fetch users');
     }
 
-    return await response.json();
+    const data = await response.json();
+    return { users: data.users, nextCursor: data.next_cursor };
+}
+
+/**
+ * Get every user matching the filters (admin only), following the page cursors
+ * @param {Object} filters - {role?, division?, is_active?}
+ * @returns {Promise<Array>}
+ */
+export async function getAllUsers(filters = {}) {
+    const users = [];
+    let cursor = null;
+    do {
+        const page = await getUsers({ ...filters, cursor, limit: 200 });
+        users.push(...page.users);
+        cursor = page.nextCursor;
+    } while (cursor);
+    return users;
 }
 
 /**
@@ -1,8 +1,8 @@
 import { useState, useEffect, useRef, useLayoutEffect } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
 import { getChat, sendMessage, updateChatTitle, deleteChat } from '../services/chatService';
-import { getSteps, getCurrentStep, completeStep, uncompleteStep } from '../services/stepService';
-import { generateHistory } from '../../histories/services/historiesService';
+import { getSteps, getCurrentStep, completeStep, uncompleteStep, getTemplateStatus, retryTemplate } from '../services/stepService';
+import { generateHistory, getHistoryJob } from '../../histories/services/historiesService';
 import { isAuthenticated } from '../../auth/services/authService';
 import ChatHeader from '../components/ChatHeader';
 import MessageBubble from '../components/MessageBubble';
@@ -12,6 +12,13 @@ import ImageModal from '../components/ImageModal';
 import TypingIndicator from '../components/TypingIndicator';
 import './ChatPage.css';
 
+const TEMPLATE_POLL_INTERVAL_MS = 2000;
+const TEMPLATE_POLL_MAX_ATTEMPTS = 300; // 10 minutes, past the server's stale cutoff
+const HISTORY_POLL_INTERVAL_MS = 2000;
+const HISTORY_POLL_MAX_ATTEMPTS = 330; // 11 minutes, past the server's stale cutoff
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 function ChatPage() {
   const { chatId } = useParams();
   const navigate = useNavigate();
@@ -36,17 +43,27 @@ function ChatPage() {
   const [headerHeight, setHeaderHeight] = useState(60);
   const headerRef = useRef(null);
   const [topPadding, setTopPadding] = useState(100);
+  const [templateError, setTemplateError] = useState('');
+  const [retryingTemplate, setRetryingTemplate] = useState(false);
 
   const messagesEndRef = useRef(null);
   const fileInputRef = useRef(null);
   const stepCardWrapperRef = useRef(null);
+  // Template status polling of the chat on screen; stopped when the chat changes
+  const templatePollRef = useRef({ timer: null, cancelled: false });
 
   useEffect(() => {
     if (!isAuthenticated()) {
       navigate('/login');
       return;
     }
+    const templatePoll = { timer: null, cancelled: false };
+    templatePollRef.current = templatePoll;
     fetchChat();
+    return () => {
+      templatePoll.cancelled = true;
+      clearTimeout(templatePoll.timer);
+    };
   }, [chatId, navigate]);
 
   useEffect(() => {
@@ -132,10 +149,68 @@ function ChatPage() {
     loadImages();
   }, [messages.length]);
 
+  const fetchSteps = async () => {
+    console.log('🔍 Fetching current step for chat', chatId);
+    try {
+      const step = await getCurrentStep(chatId);
+      console.log('✅ Current step fetched:', step);
+      setCurrentStep(step);
+      
+      // Also fetch all steps to know if we can go back
+      const allSteps = await getSteps(chatId);
+      console.log('📋 All steps fetched:', allSteps);
+      setSteps(allSteps.steps || []);
+    } catch (err) {
+      console.log('❌ No current step or error fetching step:', err);
+    }
+  };
+
+  const waitForTemplate = async (pollChatId, attempt = 1) => {
+    const templatePoll = templatePollRef.current;
+    try {
+      const templateStatus = await getTemplateStatus(pollChatId);
+      if (templatePoll.cancelled) return;
+      if (['pending', 'processing'].includes(templateStatus.status)) {
+        if (attempt >= TEMPLATE_POLL_MAX_ATTEMPTS) {
+          setTemplateError('La extracción de pasos está tardando demasiado. Vuelve a abrir la conversación más tarde.');
+          return;
+        }
+        templatePoll.timer = setTimeout(() => waitForTemplate(pollChatId, attempt + 1), TEMPLATE_POLL_INTERVAL_MS);
+        return;
+      }
+      if (templateStatus.status === 'failed') {
+        console.log('❌ Step extraction failed:', templateStatus.error);
+        setTemplateError(`No se pudieron extraer los pasos de la plantilla: ${templateStatus.error || 'error desconocido'}`);
+        return;
+      }
+      setTemplateError('');
+      await fetchSteps();
+    } catch (err) {
+      console.log('❌ Error fetching template status:', err);
+      if (!templatePoll.cancelled) {
+        setTemplateError('Error al consultar el estado de la plantilla');
+      }
+    }
+  };
+
+  const handleRetryTemplate = async () => {
+    try {
+      setRetryingTemplate(true);
+      await retryTemplate(chatId);
+      setTemplateError('');
+      waitForTemplate(chatId);
+    } catch (err) {
+      setTemplateError(err.message || 'Error al reintentar la extracción de pasos');
+    } finally {
+      setRetryingTemplate(false);
+    }
+  };
+
   const fetchChat = async () => {
     try {
       setLoading(true);
       setError('');
+      setTemplateError('');
       const chatData = await getChat(chatId);
       setChat(chatData);
       setMessages(chatData.messages || []);
@@ -145,18 +220,11 @@ function ChatPage() {
       
       // Fetch current step if chat has template
       if (chatData.instruction_template_filename) {
-        console.log('🔍 Fetching current step for chat', chatId);
-        try {
-          const step = await getCurrentStep(chatId);
-          console.log('✅ Current step fetched:', step);
-          setCurrentStep(step);
-          
-          // Also fetch all steps to know if we can go back
-          const allSteps = await getSteps(chatId);
-          console.log('📋 All steps fetched:', allSteps);
-          setSteps(allSteps.steps || []);
-        } catch (err) {
-          console.log('❌ No current step or error fetching step:', err);
+        if (['pending', 'processing', 'failed'].includes(chatData.template_status)) {
+          // Steps are still being extracted in the background, or the extraction failed
+          waitForTemplate(chatId);
+        } else {
+          await fetchSteps();
         }
       } else {
         console.log('⚠️ No template filename, skipping step fetch');
@@ -293,11 +361,22 @@ function ChatPage() {
       setGeneratingHistory(true);
       setError('');
       console.log('📡 Calling generateHistory API with chatId:', chatId);
-      const result = await generateHistory(chatId);
-      console.log('✅ History generated successfully:', result);
+      // Generation runs in the background; follow the job until it ends
+      let job = await generateHistory(chatId);
+      for (let attempt = 1; ['pending', 'processing'].includes(job.status); attempt++) {
+        if (attempt > HISTORY_POLL_MAX_ATTEMPTS) {
+          throw new Error('El histórico está tardando demasiado. Consulta la sección de Históricos más tarde.');
+        }
+        await sleep(HISTORY_POLL_INTERVAL_MS);
+        job = await getHistoryJob(job.id);
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Error al generar el histórico');
+      }
+      console.log('✅ History generated successfully:', job);
       alert(`Histórico generado exitosamente. Puedes verlo en la sección de Históricos.`);
     } catch (err) {
-      const errorMsg = err.response?.data?.detail || 'Error al generar el histórico';
+      const errorMsg = err.message || 'Error al generar el histórico';
       setError(errorMsg);
       console.error('❌ Error generating history:', err);
     } finally {
@@ -461,6 +540,19 @@ function ChatPage() {
         </div>
       )}
 
+      {templateError && (
+        <div className="template-error">
+          <span>{templateError}</span>
+          <button
+            className="template-retry-button"
+            onClick={handleRetryTemplate}
+            disabled={retryingTemplate}
+          >
+            {retryingTemplate ? 'Reintentando...' : 'Reintentar'}
+          </button>
+        </div>
+      )}
+
       <ChatInputForm
         inputMessage={inputMessage}
         setInputMessage={setInputMessage}
@@ -1,11 +1,13 @@
 import { authenticatedFetch, getApiUrl } from '../../../utils/api';
 
 /**
- * Get all chats for the current user
- * @returns {Promise<Array>}
+ * Get one page of the current user's chats, most recently active first
+ * @param {string|null} cursor - next_cursor of the previous page (optional)
+ * @returns {Promise<{chats: Array, nextCursor: string|null}>}
  */
-export async function getChats() {
-    const response = await authenticatedFetch(getApiUrl('/chats/'), {
+export async function getChats(cursor = null) {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await authenticatedFetch(getApiUrl(`/chats/${query}`), {
         method: 'GET',
     });
 
@@ -15,7 +17,7 @@ export async function getChats() {
     }
 
     const data = await response.json();
-    return data.chats;
+    return { chats: data.chats, nextCursor: data.next_cursor };
 }
 
 /**
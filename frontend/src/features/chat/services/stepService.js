@@ -77,3 +77,60 @@ export async function uncompleteStep(chatId, stepId) {
     return await response.json();
 }
 
+
+/**
+ * Get the progress of the step extraction from the chat's template
+ * @param {number} chatId
+ * @returns {Promise<Object>} { chat_id, status, error, step_count }
+ */
+export async function getTemplateStatus(chatId) {
+    const response = await authenticatedFetch(getApiUrl(`/chats/${chatId}/template-status`), {
+        method: 'GET',
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.detail || 'Failed to fetch template status');
+    }
+
+    return await response.json();
+}
+
+/**
+ * Extract the steps of the chat's template again after a failed extraction
+ * @param {number} chatId
+ * @returns {Promise<Object>} { chat_id, status, error, step_count }
+ */
+export async function retryTemplate(chatId) {
+    const response = await authenticatedFetch(getApiUrl(`/chats/${chatId}/template-retry`), {
+        method: 'POST',
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.detail || 'Failed to retry template extraction');
+    }
+
+    return await response.json();
+}
+
+/**
+ * Complete or uncomplete several steps at once
+ * @param {number} chatId
+ * @param {boolean} completed
+ * @param {Object} selection - { step_ids } or { from_step, to_step } (step numbers, inclusive)
+ * @returns {Promise<Object>} { steps, updated, current_step_number }
+ */
+export async function updateStepsBatch(chatId, completed, selection) {
+    const response = await authenticatedFetch(getApiUrl(`/chats/${chatId}/steps/batch`), {
+        method: 'PATCH',
+        body: JSON.stringify({ completed, ...selection }),
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.detail || 'Failed to update steps');
+    }
+
+    return await response.json();
+}
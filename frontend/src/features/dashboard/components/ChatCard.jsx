@@ -15,6 +15,11 @@ function ChatCard({ chat, onClick, formatDate }) {
         <span className="chat-messages-count">
           {chat.message_count} mensajes
         </span>
+        {chat.progress_percent !== null && chat.progress_percent !== undefined && (
+          <span className="chat-progress" title={`${chat.completed_steps} de ${chat.total_steps} pasos`}>
+            {chat.progress_percent}% completado
+          </span>
+        )}
         <span className="chat-icon">💬</span>
       </div>
     </div>
@@ -18,6 +18,8 @@ function DashboardPage() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [isModalOpen, setIsModalOpen] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (!isAuthenticated()) {
@@ -36,7 +38,8 @@ function DashboardPage() {
         getChats()
       ]);
       setUser(userData);
-      setChats(chatsData);
+      setChats(chatsData.chats);
+      setNextCursor(chatsData.nextCursor);
     } catch (err) {
       setError('Error al cargar los datos');
       console.error('Error fetching data:', err);
@@ -45,6 +48,21 @@ function DashboardPage() {
     }
   };
 
+  const loadMoreChats = async () => {
+    try {
+      setLoadingMore(true);
+      setError('');
+      const page = await getChats(nextCursor);
+      setChats(prev => [...prev, ...page.chats]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError('Error al cargar más conversaciones');
+      console.error('Error fetching chats:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleLogout = () => {
     logout();
     navigate('/');
@@ -109,16 +127,27 @@ function DashboardPage() {
             {loading ? (
               <LoadingSpinner message="Cargando conversaciones..." />
             ) : chats.length > 0 ? (
-              <div className="chats-list">
-                {chats.map(chat => (
-                  <ChatCard
-                    key={chat.id}
-                    chat={chat}
-                    onClick={handleChatClick}
-                    formatDate={formatDate}
-                  />
-                ))}
-              </div>
+              <>
+                <div className="chats-list">
+                  {chats.map(chat => (
+                    <ChatCard
+                      key={chat.id}
+                      chat={chat}
+                      onClick={handleChatClick}
+                      formatDate={formatDate}
+                    />
+                  ))}
+                </div>
+                {nextCursor && (
+                  <button
+                    className="load-more-btn"
+                    onClick={loadMoreChats}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? 'Cargando...' : 'Cargar más conversaciones'}
+                  </button>
+                )}
+              </>
             ) : (
               <div className="empty-state">
                 <div className="empty-state-icon">💬</div>
@@ -16,6 +16,8 @@ function HistoriesPage() {
   const [selectedHistory, setSelectedHistory] = useState(null);
   const [user, setUser] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (!isAuthenticated()) {
@@ -34,7 +36,8 @@ function HistoriesPage() {
         getHistories()
       ]);
       setUser(userData);
-      setHistories(historiesData);
+      setHistories(historiesData.histories);
+      setNextCursor(historiesData.nextCursor);
     } catch (err) {
       setError('Error al cargar los históricos');
       console.error('Error fetching histories:', err);
@@ -43,12 +46,27 @@ function HistoriesPage() {
     }
   };
 
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      setError('');
+      const page = await getHistories(nextCursor);
+      setHistories(prev => [...prev, ...page.histories]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      setError('Error al cargar más históricos');
+      console.error('Error fetching histories:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDelete = async (historyId) => {
     if (!window.confirm('¿Eliminar este histórico?')) return;
 
     try {
       await deleteHistory(historyId);
-      setHistories(histories.filter(h => h.id !== historyId));
+      setHistories(prev => prev.filter(h => h.id !== historyId));
       if (selectedHistory?.id === historyId) {
         setSelectedHistory(null);
       }
@@ -57,9 +75,9 @@ function HistoriesPage() {
     }
   };
 
-  const handleExportPDF = async (historyId, title) => {
+  const handleExportPDF = async (historyId, title, includeImages = false) => {
     try {
-      const blob = await exportHistoryPDF(historyId);
+      const blob = await exportHistoryPDF(historyId, includeImages);
       
       // Create download URL
       const url = window.URL.createObjectURL(blob);
@@ -187,6 +205,17 @@ function HistoriesPage() {
                   ))}
                 </div>
               )}
+
+              {/* The search filters the loaded histories; older ones come page by page */}
+              {nextCursor && (
+                <button
+                  className="load-more-btn"
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                >
+                  {loadingMore ? 'Cargando...' : 'Cargar más históricos'}
+                </button>
+              )}
             </>
           )}
         </div>
@@ -208,6 +237,14 @@ function HistoriesPage() {
               📄
             </button>
             
+            <button 
+              className="modal-export-btn modal-export-images-btn" 
+              onClick={() => handleExportPDF(selectedHistory.id, selectedHistory.title, true)}
+              title="Exportar a PDF con fotos"
+            >
+              📷
+            </button>
+            
             <div className="modal-header">
               <h1>{selectedHistory.title}</h1>
               <p className="modal-date">{formatDate(selectedHistory.created_at)}</p>
@@ -13,19 +13,35 @@ export const generateHistory = async (chatId) => {
     return await response.json();
 };
 
-export const getHistories = async () => {
-    const response = await authenticatedFetch(getApiUrl('/histories'), {
+export const getHistoryJob = async (jobId) => {
+    const response = await authenticatedFetch(getApiUrl(`/history-jobs/${jobId}`), {
         method: 'GET',
     });
 
     if (!response.ok) {
         const error = await response.json();
-        throw new Error(error.detail || 'Failed to fetch histories');
+        throw new Error(error.detail || 'Failed to fetch history job');
     }
 
     return await response.json();
 };
 
+// One page of histories, newest first; pass nextCursor back to get the following one
+export const getHistories = async (cursor = null) => {
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+    const response = await authenticatedFetch(getApiUrl(`/histories${query}`), {
+        method: 'GET',
+    });
+
+    if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.detail || 'Failed to fetch histories');
+    }
+
+    const data = await response.json();
+    return { histories: data.histories, nextCursor: data.next_cursor };
+};
+
 export const getHistory = async (historyId) => {
     const response = await authenticatedFetch(getApiUrl(`/histories/${historyId}`), {
         method: 'GET',
@@ -63,8 +79,9 @@ export const deleteHistory = async (historyId) => {
     }
 };
 
-export const exportHistoryPDF = async (historyId) => {
-    const response = await authenticatedFetch(getApiUrl(`/histories/${historyId}/pdf`), {
+export const exportHistoryPDF = async (historyId, includeImages = false) => {
+    const query = includeImages ? '?include_images=true' : '';
+    const response = await authenticatedFetch(getApiUrl(`/histories/${historyId}/pdf${query}`), {
         method: 'GET',
     });
 